@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Compara a vazão dos workers sync, gthread e gevent nas rotas do cliente sob
+carga limitada por I/O.
+
+Cada consulta ao banco recebe uma latência artificial (benchmarks/latency_app.py),
+como a de um banco remoto. N clientes logados pedem em laço /client/home,
+/client/menu, /client/search e /client/cart durante alguns segundos.
+
+Uso:
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/concurrency.py \\
+        [--workers 2] [--clients 32] [--seconds 10] [--latency-ms 20]
+
+Observação: com SQLite, o gevent só coopera durante a latência simulada; em
+produção use PostgreSQL (psycopg2 é cooperativo via psycogreen).
+"""
+
+import argparse
+import http.cookiejar
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = ["/client/home", "/client/menu", "/client/search?q=pi", "/client/cart"]
+PROFILES = {
+    "sync": {"GUNICORN_WORKER_CLASS": "sync"},
+    "gthread": {"GUNICORN_WORKER_CLASS": "gthread", "GUNICORN_THREADS": "16"},
+    "gevent": {"GUNICORN_WORKER_CLASS": "gevent", "GUNICORN_WORKER_CONNECTIONS": "100"},
+}
+USERNAME, PASSWORD = "bench", "bench123"
+
+
+def seed():
+    """Cria tabelas, um cliente e alguns produtos, se ainda não existirem."""
+    from src.main import create_app
+    from src.database import db
+    from src.models.user import User
+    from src.models.product import Category, Product
+    from src.services.search import rebuild_index
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if not User.query.filter_by(username=USERNAME).first():
+            user = User(username=USERNAME, email="bench@example.com", cpf="111.111.111-11")
+            user.set_password(PASSWORD)
+            db.session.add(user)
+        if not Category.query.first():
+            category = Category(name="Pizzas")
+            db.session.add(category)
+            db.session.flush()
+            for i in range(30):
+                db.session.add(Product(name=f"Pizza {i}", description="Molho, queijo e orégano",
+                                       price=30 + i, category_id=category.id))
+        db.session.commit()
+        with db.engine.begin() as connection:
+            rebuild_index(connection)
+
+
+def _wait_ready(port, timeout=30):
+    start = time.time()
+    while time.time() - start < timeout:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/login", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("servidor não respondeu a tempo")
+
+
+def _client(port):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    data = urllib.parse.urlencode({"username": USERNAME, "password": PASSWORD}).encode()
+    opener.open(f"http://127.0.0.1:{port}/login", data=data, timeout=30).read()
+    return opener
+
+
+def run_load(port, clients, seconds):
+    # Login (hash de senha, caro em CPU) acontece antes de o relógio começar
+    openers = [None] * clients
+
+    def login(index):
+        openers[index] = _client(port)
+
+    _run_threads(login, clients)
+
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(index):
+        opener, i = openers[index], index
+        while time.perf_counter() < deadline:
+            route = ROUTES[i % len(ROUTES)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                opener.open(f"http://127.0.0.1:{port}{route}", timeout=30).read()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    _run_threads(loop, clients)
+    return latencies, errors[0]
+
+
+def _run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_profile(name, args, port):
+    env = dict(os.environ, PYTHONPATH=ROOT, BENCH_DB_LATENCY_MS=str(args.latency_ms),
+               WEB_CONCURRENCY=str(args.workers), **PROFILES[name])
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+               "--bind", f"127.0.0.1:{port}", "benchmarks.latency_app:app"]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port)
+        latencies, errors = run_load(port, args.clients, args.seconds)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+    print(f"{name:<8} {len(latencies) / args.seconds:8.1f} req/s   "
+          f"p50 {statistics.median(latencies) * 1000 if latencies else 0:7.1f} ms   "
+          f"p95 {p95 * 1000:7.1f} ms   erros {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--profiles", default="sync,gthread,gevent")
+    args = parser.parse_args()
+
+    seed()
+    print(f"{args.workers} workers, {args.clients} clientes, {args.latency_ms:.0f} ms por consulta")
+    for name in args.profiles.split(","):
+        run_profile(name, args, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Mede a previsão de demanda (src/services/forecast.py) em dois anos de itens
+sintéticos e compara com o mesmo cálculo feito linha a linha em Python.
+
+Só o cálculo é medido (sem banco): as colunas são geradas já como arrays,
+como as que history.sold_items entrega.
+
+Uso:
+    python benchmarks/forecast.py [--items 1000000] [--products 120] [--weeks 104]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.services.forecast import smooth, weekly_matrix  # noqa: E402
+from src.services.menu import DINNER_STARTS_AT_HOUR  # noqa: E402
+
+
+def synthetic(items, products, weeks, last_day):
+    rng = np.random.default_rng(42)
+    start = np.datetime64(last_day - timedelta(weeks=weeks) + timedelta(days=1), "us")
+    # Almoço entre 11h e 14h, jantar entre 18h e 22h
+    days = rng.integers(0, weeks * 7, items).astype("timedelta64[D]")
+    hours = np.where(rng.random(items) < 0.6, rng.integers(11, 14, items), rng.integers(18, 22, items))
+    times = start + days + hours.astype("timedelta64[h]") + rng.integers(0, 3600, items).astype("timedelta64[s]")
+    product_ids = rng.zipf(1.3, items) % products + 1
+    quantities = rng.integers(1, 4, items).astype(np.float64)
+    return product_ids, times, quantities
+
+
+def loop_version(product_ids, times, quantities, last_day, weeks, alpha):
+    """O mesmo cálculo com dicionários e laços, como seria sem NumPy."""
+    cells = {}
+    first_week = {}
+    for product_id, at, quantity in zip(product_ids.tolist(), times.tolist(), quantities.tolist()):
+        days_back = (last_day - at.date()).days
+        if not 0 <= days_back < weeks * 7:
+            continue
+        week = weeks - 1 - days_back // 7
+        period = 1 if at.hour >= DINNER_STARTS_AT_HOUR else 0
+        key = (product_id, week, at.weekday(), period)
+        cells[key] = cells.get(key, 0) + quantity
+        first_week[product_id] = min(first_week.get(product_id, weeks), week)
+
+    level = {}
+    for product_id, first in first_week.items():
+        for weekday in range(7):
+            for period in range(2):
+                series = [cells.get((product_id, week, weekday, period), 0) for week in range(first, weeks)]
+                baseline = sum(series) / max(len(series), 1)
+                value = baseline
+                for week in range(weeks):
+                    x = cells.get((product_id, week, weekday, period), 0) if week >= first else baseline
+                    value = alpha * x + (1 - alpha) * value
+                level[(product_id, weekday, period)] = value
+    return level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=120)
+    parser.add_argument("--weeks", type=int, default=104)
+    parser.add_argument("--alpha", type=float, default=0.3)
+    args = parser.parse_args()
+
+    last_day = date.today() - timedelta(days=1)
+    product_ids, times, quantities = synthetic(args.items, args.products, args.weeks, last_day)
+    print(f"{args.items} itens, {args.products} produtos, {args.weeks} semanas")
+
+    started = time.perf_counter()
+    products, matrix = weekly_matrix(product_ids, times, quantities, last_day, args.weeks)
+    baseline, level = smooth(matrix, args.alpha)
+    vectorized = time.perf_counter() - started
+    print(f"  NumPy:        {vectorized:.2f}s")
+
+    started = time.perf_counter()
+    expected = loop_version(product_ids, times.astype(datetime), quantities, last_day, args.weeks, args.alpha)
+    looped = time.perf_counter() - started
+    print(f"  laço Python:  {looped:.2f}s ({looped / vectorized:.0f}x mais lento)")
+
+    worst = max(abs(level[i, weekday, period] - expected[(int(product_id), weekday, period)])
+                for i, product_id in enumerate(products) for weekday in range(7) for period in range(2))
+    print(f"  maior diferença entre os dois: {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main()
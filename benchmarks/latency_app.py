@@ -0,0 +1,16 @@
+# App usado por benchmarks/concurrency.py: igual ao de produção, mas cada
+# consulta espera BENCH_DB_LATENCY_MS antes de executar, simulando a ida e volta
+# até um banco remoto. time.sleep é cooperativo sob gevent (monkey patch).
+import os
+import time
+from sqlalchemy import event
+from src.database import db
+from src.main import create_app
+
+LATENCY = float(os.getenv("BENCH_DB_LATENCY_MS", 20)) / 1000
+
+app = create_app()
+
+with app.app_context():
+    for engine in db.engines.values():
+        event.listen(engine, "before_cursor_execute", lambda *args: time.sleep(LATENCY))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Escritas concorrentes no SQLite: perfil padrão do driver x perfil de produção.
+
+Vários processos (como workers do gunicorn) criam pedidos ao mesmo tempo pelo
+mesmo caminho da rota de checkout: uma leitura (usuário logado) e depois
+orders.place_order. Outros processos rodam consultas de relatório em paralelo.
+Para cada perfil é usado um banco novo.
+
+Uso:
+    python benchmarks/sqlite_writes.py [--workers 16] [--orders 150] [--readers 8]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _app(database_path, tuned):
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    os.environ["SQLITE_TUNING"] = "1" if tuned else "0"
+    from src.main import create_app
+    return create_app()
+
+
+def seed(database_path, tuned):
+    from src.database import db
+    from src.models.user import User
+    from src.models.product import Category, Product
+
+    app = _app(database_path, tuned)
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@example.com", cpf="111.111.111-11")
+        user.set_password("bench123")
+        category = Category(name="Pizzas")
+        db.session.add_all([user, category])
+        db.session.flush()
+        for i in range(10):
+            db.session.add(Product(name=f"Pizza {i}", price=30 + i, category_id=category.id))
+        db.session.commit()
+        db.engine.dispose()
+
+
+def worker(database_path, tuned, orders, start_event, results):
+    from src.database import db
+    from src.models.user import User
+    from src.services import orders as order_service
+
+    app = _app(database_path, tuned)
+    ok = failed = 0
+    start_event.wait()
+    with app.app_context():
+        for i in range(orders):
+            try:
+                user = db.session.get(User, 1)  # como o user_loader da requisição
+                order_service.place_order(user.id, [(1 + i % 10, 2), (1 + (i + 3) % 10, 1)], "pix", "retirada")
+                ok += 1
+            except Exception as exc:
+                failed += 1
+                if failed == 1:
+                    print(f"  erro: {str(exc).splitlines()[0]}")
+            finally:
+                db.session.remove()
+    results.put((ok, failed))
+
+
+def reader(database_path, tuned, seconds, start_event, results):
+    from sqlalchemy import func
+    from src.database import db
+    from src.models.order import Order, OrderItem
+
+    app = _app(database_path, tuned)
+    reads = failed = 0
+    start_event.wait()
+    deadline = time.perf_counter() + seconds
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            try:
+                # Consulta de relatório do admin: pedidos e itens por produto
+                db.session.query(OrderItem.product_id, func.count(), func.sum(Order.total_amount)) \
+                    .join(Order).group_by(OrderItem.product_id).all()
+                reads += 1
+            except Exception:
+                failed += 1
+            finally:
+                db.session.remove()
+    results.put((reads, failed))
+
+
+def run(tuned, workers, orders, readers, read_seconds):
+    directory = tempfile.mkdtemp(prefix="sqlite-bench-")
+    database_path = os.path.join(directory, "bench.db")
+    seed(database_path, tuned)
+
+    context = multiprocessing.get_context("spawn")
+    start_event, results = context.Event(), context.Queue()
+    processes = [context.Process(target=worker, args=(database_path, tuned, orders, start_event, results))
+                 for _ in range(workers)]
+    read_results = context.Queue()
+    processes += [context.Process(target=reader, args=(database_path, tuned, read_seconds, start_event, read_results))
+                  for _ in range(readers)]
+    for process in processes:
+        process.start()
+    time.sleep(2)  # deixa todos os processos importarem o app
+    started = time.perf_counter()
+    start_event.set()
+    totals = [results.get() for _ in range(workers)]
+    elapsed = time.perf_counter() - started
+    read_totals = [read_results.get() for _ in range(readers)]
+    for process in processes:
+        process.join()
+
+    ok = sum(t[0] for t in totals)
+    failed = sum(t[1] for t in totals)
+    reads = sum(t[0] for t in read_totals)
+    label = "produção" if tuned else "padrão"
+    print(f"perfil {label:<9} {ok:6d} pedidos   {failed:5d} falhas   {ok / elapsed:8.1f} pedidos/s   "
+          f"{reads} leituras de relatório")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--orders", type=int, default=150, help="Pedidos por processo.")
+    parser.add_argument("--readers", type=int, default=8, help="Processos lendo relatórios ao mesmo tempo.")
+    parser.add_argument("--read-seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.workers} processos x {args.orders} pedidos, {args.readers} processos lendo relatórios")
+    run(False, args.workers, args.orders, args.readers, args.read_seconds)
+    failed = run(True, args.workers, args.orders, args.readers, args.read_seconds)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
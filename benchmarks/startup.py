@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Mede o tempo de inicialização da aplicação.
+
+Cada medição roda em um processo Python novo (imports frios):
+  - import:      `import src.main` (só bibliotecas: nada é criado na importação)
+  - create_app:  montagem completa do app (modelos, blueprints, extensões)
+  - 1a requisição: GET /login pelo test client
+  - gunicorn:    tempo até os N workers estarem prontos, com e sem preload_app
+
+Uso:
+    python benchmarks/startup.py [--runs 5] [--gunicorn] [--workers 4]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import time
+t0 = time.perf_counter()
+import src.main
+t1 = time.perf_counter()
+app = src.main.create_app()
+t2 = time.perf_counter()
+app.test_client().get("/login")
+t3 = time.perf_counter()
+print(t1 - t0, t2 - t1, t3 - t2)
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure_app(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", PROBE], cwd=ROOT, env=_env(), text=True)
+        samples.append([float(v) for v in output.split()[-3:]])
+    return {name: [s[i] for s in samples] for i, name in enumerate(("import", "create_app", "1a requisição"))}
+
+
+def measure_gunicorn(workers, preload):
+    """Segundos desde o início do gunicorn até todos os workers estarem prontos."""
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+               "--bind", "127.0.0.1:0", "--workers", str(workers)]
+    env = _env()
+    env["GUNICORN_PRELOAD"] = "1" if preload else "0"
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        ready = 0
+        for line in process.stderr:
+            # Mensagem registrada pelo hook post_worker_init do gunicorn.conf.py
+            if "pronto." in line:
+                ready += 1
+                if ready == workers:
+                    return time.perf_counter() - start
+        raise RuntimeError("gunicorn encerrou antes de todos os workers ficarem prontos")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _report(name, values):
+    print(f"{name:<22} mediana {statistics.median(values) * 1000:8.1f} ms   "
+          f"min {min(values) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--gunicorn", action="store_true", help="Mede também o boot do gunicorn.")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for name, values in measure_app(args.runs).items():
+        _report(name, values)
+
+    if args.gunicorn:
+        for preload in (False, True):
+            values = [measure_gunicorn(args.workers, preload) for _ in range(args.runs)]
+            _report(f"gunicorn preload={'on' if preload else 'off'}", values)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,10 @@ python -c "
 import os
 import sys
 sys.path.insert(0, os.path.dirname(__file__))
-from src.main import app, db
+from src.main import create_app, db
 from flask_migrate import upgrade
 
+app = create_app()
 with app.app_context():
     # Create tables if they don't exist
     db.create_all()
@@ -24,5 +25,11 @@ with app.app_context():
     except Exception as e:
         print(f'Migration error (this is normal for first deploy): {e}')
         print('Tables created successfully')
+
+    # Índice de busca do cardápio (idempotente)
+    from src.services.search import rebuild_index
+    with db.engine.begin() as connection:
+        rebuild_index(connection)
+    print('Search index rebuilt')
 "
 
@@ -9,7 +9,7 @@ import os
 # Adicionar o diretório src ao path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.main import app
+from src.main import create_app
 from src.database import db
 from src.models.user import User
 from src.models.product import Category, Product
@@ -20,6 +20,7 @@ from datetime import datetime, timedelta
 def create_test_data():
     """Criar dados de teste para o sistema"""
     
+    app = create_app()
     with app.app_context():
         # Criar tabelas se não existirem
         db.create_all()
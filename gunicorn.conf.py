@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+
+# Configuração do gunicorn (carregada automaticamente a partir da raiz do projeto).
+#
+# preload_app: o app é criado uma única vez no processo mestre (imports,
+# modelos, blueprints e cache do cardápio) e os workers nascem via fork já
+# prontos, o que encurta o boot e os cold starts do autoscaling.
+#
+# Conexões abertas no mestre não podem ser compartilhadas entre processos: o
+# mestre fecha o pool depois de aquecer o cache e cada worker descarta o pool
+# herdado logo após o fork.
+#
+# Tipos de worker (GUNICORN_WORKER_CLASS):
+#   sync    - uma requisição por processo (padrão);
+#   gthread - GUNICORN_THREADS requisições por processo, em threads;
+#   gevent  - até GUNICORN_WORKER_CONNECTIONS requisições por processo, em
+#             greenlets (exige PostgreSQL: o driver do SQLite bloqueia o loop).
+# O pool de conexões de cada worker é dimensionado pela concorrência
+# (DB_POOL_SIZE, lido em create_app), limitado por DB_POOL_MAX.
+
+wsgi_app = "src.wsgi:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.getenv("GUNICORN_THREADS", 8 if worker_class == "gthread" else 1))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))
+
+if worker_class == "gevent":
+    # O patch precisa acontecer antes de o mestre importar o app (preload_app),
+    # senão sockets, locks e o psycopg2 já carregados continuariam bloqueantes.
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+    concurrency = worker_connections
+elif worker_class == "gthread" or threads > 1:
+    concurrency = threads
+else:
+    concurrency = 1
+
+# Métricas do Prometheus somadas entre os workers (ver src/services/metrics.py).
+# O diretório precisa existir antes de o app (preload) importar o prometheus_client;
+# valores de execuções anteriores são apagados na primeira carga (não no reload).
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(tempfile.gettempdir(), "restaurante-metrics")
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+os.environ.setdefault("DB_POOL_SIZE", str(min(concurrency, int(os.getenv("DB_POOL_MAX", 20)))))
+
+
+def _engines(app):
+    from src.database import db
+    with app.app_context():
+        return list(db.engines.values())
+
+
+def when_ready(server):
+    from src.wsgi import app
+    from src.services.menu import warm_menu_cache
+
+    with app.app_context():
+        try:
+            warm_menu_cache()
+        except Exception:
+            # Banco ainda sem tabelas (primeiro deploy) não impede o boot
+            server.log.warning("Não foi possível aquecer o cache do cardápio.", exc_info=True)
+    for engine in _engines(app):
+        engine.dispose()
+
+    # O mestre não atende requisições: tira seus gauges "ao vivo" da soma
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(os.getpid())
+    # Nenhuma thread no mestre: os forks herdariam locks presos (cache,
+    # logging, pool do banco). O agendador roda nos workers.
+
+
+def post_fork(server, worker):
+    from src.wsgi import app
+
+    # close=False: não encerra conexões que pertencem ao mestre, só deixa de usá-las
+    for engine in _engines(app):
+        engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Cada worker aquece o próprio cache antes das viradas de período; só o que
+    # segura a trava expira cupons, limpa chaves e recalcula a previsão.
+    # SCHEDULER=0 desliga (ex.: quando "flask scheduler run" roda à parte).
+    if os.getenv("SCHEDULER", "1") != "0":
+        from src.wsgi import app
+        from src.services.scheduler import MaintenanceLock, Scheduler
+        Scheduler(app, maintenance=MaintenanceLock()).start()
+    worker.log.info("Worker %s pronto.", worker.pid)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
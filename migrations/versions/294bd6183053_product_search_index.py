@@ -0,0 +1,29 @@
+"""Product full-text search index.
+
+Revision ID: 294bd6183053
+Revises: c29831471724
+Create Date: 2026-10-19 09:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.services.search import INDEX_TABLE, TS_CONFIG, rebuild_index
+
+
+# revision identifiers, used by Alembic.
+revision = '294bd6183053'
+down_revision = 'c29831471724'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 no SQLite, tsvector + GIN no PostgreSQL; já popula com os produtos atuais
+    rebuild_index(op.get_bind())
+
+
+def downgrade():
+    op.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {TS_CONFIG}")
@@ -0,0 +1,26 @@
+"""Expense index on (location_id, date, expense_type) for the ledger and monthly summary.
+
+Revision ID: 3c7e9a1f5b42
+Revises: f4b8d2a6c913
+Create Date: 2026-10-19 23:02:41.118304
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7e9a1f5b42'
+down_revision = 'f4b8d2a6c913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # O novo índice cobre o antigo (mesmo prefixo) e deixa o resumo mês × tipo só no índice
+    op.create_index('ix_expense_location_date_type', 'expense', ['location_id', 'date', 'expense_type'], unique=False)
+    op.drop_index('ix_expense_location_date', table_name='expense')
+
+
+def downgrade():
+    op.create_index('ix_expense_location_date', 'expense', ['location_id', 'date'], unique=False)
+    op.drop_index('ix_expense_location_date_type', table_name='expense')
@@ -0,0 +1,43 @@
+"""Append-only log of order status transitions.
+
+Revision ID: 3f7a2c9e8d14
+Revises: 9c4e1f7a3b60
+Create Date: 2026-10-19 16:05:42.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a2c9e8d14'
+down_revision = '9c4e1f7a3b60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_events',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('from_status', sa.String(length=20), nullable=True),
+    sa.Column('to_status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('order_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_events_order_id'), ['order_id'], unique=False)
+
+    # Pedidos existentes: as transições passadas não foram guardadas, então cada
+    # pedido ganha um único evento com o status atual, na data de criação.
+    op.execute(
+        "INSERT INTO order_events (order_id, from_status, to_status, created_at) "
+        "SELECT id, NULL, status, created_at FROM orders ORDER BY id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('order_events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_events_order_id'))
+
+    op.drop_table('order_events')
@@ -0,0 +1,29 @@
+"""Versioned cache regions shared by all workers.
+
+Revision ID: 5d8a3f61c2b7
+Revises: 7b1e5c9d2a40
+Create Date: 2026-10-19 13:02:44.671530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8a3f61c2b7'
+down_revision = '7b1e5c9d2a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table('cache_versions',
+    sa.Column('region', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('region')
+    )
+    op.bulk_insert(cache_versions, [{'region': 'menu', 'version': 1}])
+
+
+def downgrade():
+    op.drop_table('cache_versions')
@@ -0,0 +1,73 @@
+"""Per-customer order summary and indexed client search.
+
+Revision ID: 5e9b1d7c4a28
+Revises: d81f5c3a6e27
+Create Date: 2026-10-19 19:32:11.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9b1d7c4a28'
+down_revision = 'd81f5c3a6e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('customer_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('lifetime_value', sa.Float(), nullable=False),
+    sa.Column('avg_ticket', sa.Float(), nullable=False),
+    sa.Column('last_order_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_customer_stats_order_count', 'customer_stats', ['order_count', 'user_id'], unique=False)
+    op.create_index('ix_customer_stats_lifetime_value', 'customer_stats', ['lifetime_value', 'user_id'], unique=False)
+    op.create_index('ix_customer_stats_avg_ticket', 'customer_stats', ['avg_ticket', 'user_id'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_customer_stats_last_order_at_desc', 'customer_stats',
+                        [sa.text('last_order_at DESC NULLS LAST'), sa.text('user_id DESC')], unique=False)
+    else:
+        op.create_index('ix_customer_stats_last_order_at', 'customer_stats', ['last_order_at', 'user_id'], unique=False)
+
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=False)
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=False)
+    op.create_index('ix_users_phone', 'users', ['phone'], unique=False)
+
+    # Resumo dos clientes existentes: pedidos e valor sem os cancelados
+    op.execute("""
+        INSERT INTO customer_stats (user_id, order_count, lifetime_value, avg_ticket, last_order_at)
+        SELECT u.id,
+               COALESCE(o.order_count, 0),
+               COALESCE(o.lifetime_value, 0),
+               CASE WHEN o.order_count > 0 THEN o.lifetime_value / o.order_count ELSE 0 END,
+               o.last_order_at
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id,
+                   SUM(CASE WHEN status <> 'cancelado' THEN 1 ELSE 0 END) AS order_count,
+                   SUM(CASE WHEN status <> 'cancelado' THEN total_amount ELSE 0 END) AS lifetime_value,
+                   MAX(created_at) AS last_order_at
+            FROM orders
+            GROUP BY user_id
+        ) o ON o.user_id = u.id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_users_phone', table_name='users')
+    op.drop_index('ix_users_email_lower', table_name='users')
+    op.drop_index('ix_users_username_lower', table_name='users')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_customer_stats_last_order_at_desc', table_name='customer_stats')
+    else:
+        op.drop_index('ix_customer_stats_last_order_at', table_name='customer_stats')
+    op.drop_index('ix_customer_stats_avg_ticket', table_name='customer_stats')
+    op.drop_index('ix_customer_stats_lifetime_value', table_name='customer_stats')
+    op.drop_index('ix_customer_stats_order_count', table_name='customer_stats')
+    op.drop_table('customer_stats')
@@ -0,0 +1,39 @@
+"""Order ETA statistics and partial index of open orders.
+
+Revision ID: 6b2d8e4f1a93
+Revises: 3f7a2c9e8d14
+Create Date: 2026-10-19 17:12:08.554017
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2d8e4f1a93'
+down_revision = '3f7a2c9e8d14'
+branch_labels = None
+depends_on = None
+
+OPEN_ORDERS = "status IN ('recebido', 'em_preparo')"
+
+
+def upgrade():
+    op.create_table('eta_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('stage', sa.String(length=20), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('mean_minutes', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('stage', 'category_id', 'period', name='uq_eta_stats_key')
+    )
+    op.create_index('ix_orders_open_status', 'orders', ['status'], unique=False,
+                    postgresql_where=sa.text(OPEN_ORDERS), sqlite_where=sa.text(OPEN_ORDERS))
+
+
+def downgrade():
+    op.drop_index('ix_orders_open_status', table_name='orders')
+    op.drop_table('eta_stats')
@@ -0,0 +1,38 @@
+"""Idempotency keys for order placement.
+
+Revision ID: 7b1e5c9d2a40
+Revises: e296c104a9a7
+Create Date: 2026-10-19 12:41:08.114902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1e5c9d2a40'
+down_revision = 'e296c104a9a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_requests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'idempotency_key', name='uq_order_requests_user_key')
+    )
+    with op.batch_alter_table('order_requests', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_requests_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order_requests', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_requests_created_at'))
+
+    op.drop_table('order_requests')
@@ -0,0 +1,67 @@
+"""Digit-only phone and CPF columns for customer lookup.
+
+Revision ID: 8a3f6c2d9e71
+Revises: 5e9b1d7c4a28
+Create Date: 2026-10-19 20:05:42.618307
+
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3f6c2d9e71'
+down_revision = '5e9b1d7c4a28'
+branch_labels = None
+depends_on = None
+
+CHUNK = 1000
+
+
+def _digits(value):
+    return re.sub(r"\D", "", value or "")
+
+
+def _phone(value):
+    number = _digits(value).lstrip("0")
+    if number.startswith("55") and len(number) in (12, 13):
+        number = number[2:]
+    return number
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('phone_digits', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('cpf_digits', sa.String(length=14), nullable=True))
+        batch_op.drop_index('ix_users_phone')
+        batch_op.create_index(batch_op.f('ix_users_phone_digits'), ['phone_digits'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_cpf_digits'), ['cpf_digits'], unique=False)
+
+    # Preenche em lotes por id (mesma normalização de src/models/user.py)
+    connection = op.get_bind()
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('phone', sa.String),
+                     sa.column('cpf', sa.String), sa.column('phone_digits', sa.String),
+                     sa.column('cpf_digits', sa.String))
+    update = (users.update().where(users.c.id == sa.bindparam('b_id'))
+              .values(phone_digits=sa.bindparam('b_phone'), cpf_digits=sa.bindparam('b_cpf')))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(users.c.id, users.c.phone, users.c.cpf)
+            .where(users.c.id > last_id).order_by(users.c.id).limit(CHUNK)
+        ).all()
+        if not rows:
+            break
+        connection.execute(update, [{'b_id': user_id, 'b_phone': _phone(phone) or None, 'b_cpf': _digits(cpf) or None}
+                                    for user_id, phone, cpf in rows])
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_cpf_digits'))
+        batch_op.drop_index(batch_op.f('ix_users_phone_digits'))
+        batch_op.create_index('ix_users_phone', ['phone'], unique=False)
+        batch_op.drop_column('cpf_digits')
+        batch_op.drop_column('phone_digits')
@@ -0,0 +1,39 @@
+"""Kitchen capacity per time slot and category.
+
+Revision ID: a4c7e2b9f305
+Revises: 6b2d8e4f1a93
+Create Date: 2026-10-19 18:03:51.207733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e2b9f305'
+down_revision = '6b2d8e4f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('slot_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('slot_start', sa.DateTime(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('used', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slot_start', 'category_id', name='uq_slot_reservations_slot')
+    )
+    op.add_column('categories', sa.Column('slot_capacity', sa.Integer(), nullable=True))
+    # No PostgreSQL a coluna se propaga para as partições mensais
+    op.add_column('orders', sa.Column('slot_start', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_column('slot_start')
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.drop_column('slot_capacity')
+
+    op.drop_table('slot_reservations')
@@ -0,0 +1,39 @@
+"""Per-product demand forecast by day and meal period.
+
+Revision ID: d81f5c3a6e27
+Revises: a4c7e2b9f305
+Create Date: 2026-10-19 18:47:30.913562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f5c3a6e27'
+down_revision = 'a4c7e2b9f305'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('demand_forecast',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('forecast_date', sa.Date(), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('baseline', sa.Float(), nullable=False),
+    sa.Column('generated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('forecast_date', 'period', 'product_id', name='uq_demand_forecast_key')
+    )
+    with op.batch_alter_table('demand_forecast', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_demand_forecast_forecast_date'), ['forecast_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('demand_forecast', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_demand_forecast_forecast_date'))
+
+    op.drop_table('demand_forecast')
@@ -0,0 +1,108 @@
+"""Monthly range partitioning of orders and order_items.
+
+Revision ID: e296c104a9a7
+Revises: 294bd6183053
+Create Date: 2026-10-19 10:02:17.846301
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+from src.services.partitions import add_months, create_partitions, month_start
+
+
+# revision identifiers, used by Alembic.
+revision = 'e296c104a9a7'
+down_revision = '294bd6183053'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Chave de partição dos itens: cópia do created_at do pedido
+    op.add_column('order_items', sa.Column('order_created_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE orders SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.execute("""
+        UPDATE order_items SET order_created_at = (
+            SELECT o.created_at FROM orders o WHERE o.id = order_items.order_id
+        )
+    """)
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # SQLite não tem particionamento; a coluna já basta para os modelos
+        return
+
+    op.execute("ALTER TABLE order_items RENAME TO order_items_legacy")
+    op.execute("ALTER TABLE orders RENAME TO orders_legacy")
+
+    op.execute("""
+        CREATE TABLE orders (LIKE orders_legacy INCLUDING DEFAULTS)
+        PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER TABLE orders ALTER COLUMN created_at SET NOT NULL")
+    op.execute("ALTER TABLE orders ADD PRIMARY KEY (id, created_at)")
+    op.execute("ALTER TABLE orders ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+
+    op.execute("""
+        CREATE TABLE order_items (LIKE order_items_legacy INCLUDING DEFAULTS)
+        PARTITION BY RANGE (order_created_at)
+    """)
+    op.execute("ALTER TABLE order_items ALTER COLUMN order_created_at SET NOT NULL")
+    op.execute("ALTER TABLE order_items ADD PRIMARY KEY (id, order_created_at)")
+    op.execute("ALTER TABLE order_items ADD FOREIGN KEY (product_id) REFERENCES products (id)")
+    op.execute("""
+        ALTER TABLE order_items ADD FOREIGN KEY (order_id, order_created_at)
+        REFERENCES orders (id, created_at)
+    """)
+    op.execute("ALTER SEQUENCE order_items_id_seq OWNED BY order_items.id")
+
+    # Partições do primeiro pedido existente até três meses à frente, mais uma
+    # partição padrão como rede de segurança caso a manutenção atrase.
+    first = bind.execute(sa.text("SELECT min(created_at) FROM orders_legacy")).scalar()
+    current = month_start(datetime.utcnow())
+    create_partitions(bind, month_start(first) if first else current, add_months(current, 3))
+    op.execute("CREATE TABLE orders_default PARTITION OF orders DEFAULT")
+    op.execute("CREATE TABLE order_items_default PARTITION OF order_items DEFAULT")
+
+    op.execute("INSERT INTO orders SELECT * FROM orders_legacy")
+    op.execute("INSERT INTO order_items SELECT * FROM order_items_legacy")
+
+    op.execute("CREATE INDEX ix_orders_created_at ON orders (created_at)")
+    op.execute("CREATE INDEX ix_orders_user_id ON orders (user_id)")
+    op.execute("CREATE INDEX ix_orders_status ON orders (status)")
+    op.execute("CREATE INDEX ix_order_items_order ON order_items (order_id, order_created_at)")
+    op.execute("CREATE INDEX ix_order_items_product_id ON order_items (product_id)")
+
+    op.execute("DROP TABLE order_items_legacy")
+    op.execute("DROP TABLE orders_legacy")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("CREATE TABLE orders_plain (LIKE orders INCLUDING DEFAULTS)")
+        op.execute("CREATE TABLE order_items_plain (LIKE order_items INCLUDING DEFAULTS)")
+        op.execute("INSERT INTO orders_plain SELECT * FROM orders")
+        op.execute("INSERT INTO order_items_plain SELECT * FROM order_items")
+
+        # As sequências pertencem às tabelas particionadas; solta antes do DROP
+        op.execute("ALTER SEQUENCE orders_id_seq OWNED BY NONE")
+        op.execute("ALTER SEQUENCE order_items_id_seq OWNED BY NONE")
+        op.execute("DROP TABLE order_items")
+        op.execute("DROP TABLE orders")
+
+        op.execute("ALTER TABLE orders_plain RENAME TO orders")
+        op.execute("ALTER TABLE order_items_plain RENAME TO order_items")
+        op.execute("ALTER TABLE orders ADD PRIMARY KEY (id)")
+        op.execute("ALTER TABLE orders ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+        op.execute("ALTER TABLE order_items ADD PRIMARY KEY (id)")
+        op.execute("ALTER TABLE order_items ADD FOREIGN KEY (order_id) REFERENCES orders (id)")
+        op.execute("ALTER TABLE order_items ADD FOREIGN KEY (product_id) REFERENCES products (id)")
+        op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+        op.execute("ALTER SEQUENCE order_items_id_seq OWNED BY order_items.id")
+
+    with op.batch_alter_table('order_items') as batch_op:
+        batch_op.drop_column('order_created_at')
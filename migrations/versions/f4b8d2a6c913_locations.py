@@ -0,0 +1,84 @@
+"""Restaurant locations and location_id on the tenant-scoped tables.
+
+Revision ID: f4b8d2a6c913
+Revises: 8a3f6c2d9e71
+Create Date: 2026-10-19 21:14:03.551920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2a6c913'
+down_revision = '8a3f6c2d9e71'
+branch_labels = None
+depends_on = None
+
+OPEN_ORDERS = "status IN ('recebido', 'em_preparo')"
+# Tabela → índice composto que começa pela unidade
+SCOPED = {
+    'products': ('ix_products_location_category', ['location_id', 'category_id']),
+    'orders': ('ix_orders_location_created_at', ['location_id', 'created_at']),
+    'expense': ('ix_expense_location_date', ['location_id', 'date']),
+    'employee': ('ix_employee_location_name', ['location_id', 'name']),
+    'promotion': ('ix_promotion_location_end_date', ['location_id', 'end_date']),
+    'coupon': ('ix_coupon_location_end_date', ['location_id', 'end_date']),
+    'slot_reservations': (None, None),
+}
+
+
+def upgrade():
+    locations = op.create_table('locations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('slug', sa.String(length=50), nullable=False),
+    sa.Column('address', sa.String(length=200), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slug')
+    )
+    # Todos os dados existentes ficam na unidade 1
+    op.bulk_insert(locations, [{'id': 1, 'name': 'Principal', 'slug': 'principal', 'is_active': True}])
+
+    # Recriado com a unidade na frente
+    op.drop_index('ix_orders_open_status', table_name='orders')
+
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table, (index_name, columns) in SCOPED.items():
+        # No PostgreSQL a coluna se propaga para as partições mensais de orders.
+        # O SQLite não aceita ADD COLUMN com chave estrangeira e valor padrão, e
+        # recriar as tabelas esbarraria nas chaves dos itens e pedidos: lá a
+        # coluna entra sem a restrição (o create_all de bases novas a cria).
+        op.add_column(table, sa.Column('location_id', sa.Integer(), server_default=sa.text('1'), nullable=False))
+        if not sqlite:
+            op.create_foreign_key(f'fk_{table}_location_id', table, 'locations', ['location_id'], ['id'])
+        if index_name:
+            op.create_index(index_name, table, columns, unique=False)
+
+    with op.batch_alter_table('slot_reservations', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_slot_reservations_slot', type_='unique')
+        batch_op.create_unique_constraint('uq_slot_reservations_slot', ['location_id', 'slot_start', 'category_id'])
+
+    op.create_index('ix_orders_open_status', 'orders', ['location_id', 'status'], unique=False,
+                    postgresql_where=sa.text(OPEN_ORDERS), sqlite_where=sa.text(OPEN_ORDERS))
+
+
+def downgrade():
+    op.drop_index('ix_orders_open_status', table_name='orders')
+
+    with op.batch_alter_table('slot_reservations', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_slot_reservations_slot', type_='unique')
+        batch_op.create_unique_constraint('uq_slot_reservations_slot', ['slot_start', 'category_id'])
+
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table, (index_name, columns) in SCOPED.items():
+        if index_name:
+            op.drop_index(index_name, table_name=table)
+        if not sqlite:
+            op.drop_constraint(f'fk_{table}_location_id', table, type_='foreignkey')
+        op.drop_column(table, 'location_id')
+
+    op.create_index('ix_orders_open_status', 'orders', ['status'], unique=False,
+                    postgresql_where=sa.text(OPEN_ORDERS), sqlite_where=sa.text(OPEN_ORDERS))
+    op.drop_table('locations')
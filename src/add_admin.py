@@ -1,7 +1,9 @@
-from src.main import app
+from src.main import create_app
 from src.database import db
 from src.models.user import User
 
+app = create_app()
+
 with app.app_context():
     admin_user = User.query.filter_by(username='admin').first()
     if not admin_user:
@@ -1,4 +1,173 @@
+import time
+from functools import wraps
+from threading import Lock
+from flask import current_app, has_request_context, session as flask_session
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
 
-db = SQLAlchemy()
+# ==============================================================================
+# ROTEAMENTO DE LEITURAS PARA A RÉPLICA
+# Quando DATABASE_REPLICA_URL está configurada, as views marcadas com
+# @replica_reads enviam seus SELECTs para a réplica. Escritas, leituras depois
+# de uma escrita (na mesma requisição ou logo após, para o mesmo usuário) e
+# réplicas atrasadas/indisponíveis continuam no primário.
+# ==============================================================================
+REPLICA_BIND = "replica"
 
+_lag_lock = Lock()
+_lag_cache = {}  # url da réplica -> (verificado_em, atraso_em_segundos)
+
+
+class RoutingSession(Session):
+    """Sessão que escolhe entre o primário e a réplica a cada consulta."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._can_use_replica(clause):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None and replica_is_fresh(replica):
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _can_use_replica(self, clause):
+        if not self.info.get("use_replica") or self.info.get("wrote") or self._flushing:
+            return False
+        # Só SELECTs vão para a réplica; session.connection() e DML ficam no primário
+        if clause is None or not getattr(clause, "is_select", False):
+            return False
+        if has_request_context() and flask_session.get("db_primary_until", 0) > time.time():
+            return False
+        return True
+
+
+# db.session é escopada pelo contexto de aplicação de cada requisição, que o
+# Flask guarda em contextvars: cada thread (gthread) ou greenlet (gevent) tem
+# a sua sessão, devolvida ao pool no teardown da requisição.
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_dml_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _stick_to_primary(session):
+    # Depois de gravar, o mesmo usuário lê do primário por alguns segundos
+    # (ex.: atualizar o status e voltar para a lista de pedidos).
+    if session.info.pop("wrote", False) and has_request_context() and REPLICA_BIND in current_app.config.get("SQLALCHEMY_BINDS", {}):
+        window = current_app.config.get("REPLICA_READ_AFTER_WRITE_SECONDS", 5)
+        flask_session["db_primary_until"] = time.time() + window
+
+
+def replica_reads(view):
+    """Marca uma view somente leitura (relatórios) para ler da réplica, se houver."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        db.session.info["use_replica"] = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            db.session.info.pop("use_replica", None)
+    return wrapper
+
+
+def replica_lag(engine):
+    """Atraso da réplica em segundos (0 quando não há replicação a medir)."""
+    if engine.dialect.name != "postgresql":
+        # Dois arquivos SQLite em desenvolvimento: não há replicação a medir
+        return 0.0
+    with engine.connect() as connection:
+        lag = connection.execute(text("""
+            SELECT CASE
+                WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+            END
+        """)).scalar()
+        return float(lag or 0)
+
+
+def replica_is_fresh(engine):
+    """A réplica está dentro do atraso tolerado? O resultado vale por alguns segundos."""
+    config = current_app.config
+    max_lag = config.get("REPLICA_MAX_LAG_SECONDS", 10)
+    interval = config.get("REPLICA_LAG_CHECK_INTERVAL", 5)
+    key = str(engine.url)
+    now = time.monotonic()
+
+    with _lag_lock:
+        cached = _lag_cache.get(key)
+    if cached is None or now - cached[0] > interval:
+        try:
+            lag = replica_lag(engine)
+        except Exception:
+            current_app.logger.warning("Réplica indisponível; lendo do primário.", exc_info=True)
+            lag = float("inf")
+        cached = (now, lag)
+        with _lag_lock:
+            _lag_cache[key] = cached
+    return cached[1] <= max_lag
+
+
+# ==============================================================================
+# PERFIL DO SQLITE PARA PRODUÇÃO (instalações pequenas, um único servidor)
+# WAL deixa leitores e um escritor trabalharem juntos; busy_timeout faz quem
+# chega esperar pelo lock em vez de falhar com "database is locked". O driver
+# deixa de abrir transações por conta própria para que possamos emitir
+# BEGIN IMMEDIATE nas transações de escrita (ver begin_write).
+# ==============================================================================
+SQLITE_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("cache_size", -64000),  # em KiB: 64 MB
+    ("foreign_keys", "ON"),
+    ("temp_store", "MEMORY"),
+)
+
+
+def configure_sqlite(engine, busy_timeout_ms=10000, pragmas=SQLITE_PRAGMAS):
+    """Aplica o perfil de produção em cada nova conexão SQLite do engine."""
+    if engine.dialect.name != "sqlite" or event.contains(engine, "begin", _sqlite_begin):
+        return
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        # Primeiro o busy_timeout, para que os demais PRAGMAs também esperem pelo lock
+        cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    event.listen(engine, "begin", _sqlite_begin)
+
+
+def _sqlite_begin(connection):
+    mode = connection.get_execution_options().get("sqlite_begin", "DEFERRED")
+    connection.exec_driver_sql(f"BEGIN {mode}")
+
+
+def begin_write():
+    """Começa uma transação curta de escrita na sessão.
+
+    No SQLite, BEGIN IMMEDIATE pega o lock de escrita já no início (esperando até
+    busy_timeout), em vez de falhar ao tentar promover uma transação de leitura.
+    A transação de leitura em andamento (ex.: carregar o usuário logado) é desfeita
+    antes, o que expira os objetos já carregados. Alterações do ORM ainda não gravadas
+    levantam RuntimeError: quem chama deve gravá-las (commit) antes ou depois.
+    """
+    session = db.session()
+    if session.new or session.dirty or session.deleted:
+        raise RuntimeError("begin_write() chamado com alterações pendentes na sessão.")
+    if session.in_transaction():
+        session.rollback()
+    session.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
@@ -6,33 +6,50 @@ from flask_mail import Mail
 from flask_migrate import Migrate
 from dotenv import load_dotenv
 
-# Carrega variáveis de ambiente do arquivo .env (apenas em desenvolvimento)
-load_dotenv()
-
 # ==============================================================================
 # CORREÇÃO 1: INICIALIZAR EXTENSÕES SEM O APP
 # Inicializamos as extensões aqui, mas as conectamos ao app dentro da função create_app.
+# Importar este módulo não tem efeitos colaterais: .env, modelos e blueprints
+# só são carregados quando create_app() é chamada.
 # ==============================================================================
-from src.database import db
+from src.database import db, configure_sqlite
 login_manager = LoginManager()
 mail = Mail()
 migrate = Migrate()
 
-# Importar modelos aqui para que o Alembic (Migrate) possa encontrá-los
-from src.models.user import User
-from src.models.product import Category, Product, ProductAvailability, IngredientOption
-from src.models.order import Order, OrderItem
-from src.models.employee import Employee, TimeRecord
-from src.models.promotion import Promotion, Coupon
-from src.models.expense import Expense
+
+def _import_models():
+    # Importar modelos aqui para que o Alembic (Migrate) possa encontrá-los
+    import src.models.location
+    import src.models.user
+    import src.models.product
+    import src.models.order
+    import src.models.employee
+    import src.models.promotion
+    import src.models.expense
+    import src.models.cache_version
+    import src.models.report_job
+    import src.models.eta_stat
+    import src.models.kitchen_slot
+    import src.models.demand_forecast
+    import src.models.customer_stats
 
 
 # ==============================================================================
 # CORREÇÃO 2: A FUNÇÃO "APPLICATION FACTORY" (create_app)
 # Todo o código de configuração do app é movido para dentro desta função.
 # ==============================================================================
-def create_app():
-    """Cria e configura uma instância da aplicação Flask."""
+def create_app(config=None):
+    """Cria e configura uma instância da aplicação Flask.
+
+    `config`: valores que sobrescrevem a configuração lida do ambiente
+    (ex.: banco temporário nos testes).
+    """
+    # Carrega variáveis de ambiente do arquivo .env (apenas em desenvolvimento)
+    load_dotenv()
+    _import_models()
+    from src.models.user import User
+
     app = Flask(__name__, static_folder='static')
 
     # Configurações usando variáveis de ambiente
@@ -44,10 +61,70 @@ def create_app():
     if database_url and database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
     
-    app.config["SQLALCHEMY_DATABASE_URI"] = database_url or f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    config = config or {}
+    # Lido antes das opções do pool, que dependem do tipo de banco
+    app.config["SQLALCHEMY_DATABASE_URI"] = config.get("SQLALCHEMY_DATABASE_URI") or database_url or f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+
+    engine_options = {}
+    # No PostgreSQL, pedidos e itens são particionados por mês (ver
+    # src/services/partitions.py); junções e agregações partição a partição
+    # deixam o planner descartar meses fora do filtro de created_at.
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        engine_options["connect_args"] = {"options": "-c enable_partitionwise_join=on -c enable_partitionwise_aggregate=on"}
+    # Pool por processo dimensionado pela concorrência do worker (threads ou
+    # greenlets; ver gunicorn.conf.py). Quem passar do limite espera pool_timeout.
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        pool_size = int(os.getenv("DB_POOL_SIZE", 5))
+        engine_options.update(
+            pool_size=pool_size,
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", pool_size // 2)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
+    if engine_options:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options
+
+    # Réplica de leitura opcional para relatórios do admin (ver src/database.py)
+    replica_url = os.getenv("DATABASE_REPLICA_URL")
+    if replica_url:
+        if replica_url.startswith("postgres://"):
+            replica_url = replica_url.replace("postgres://", "postgresql://", 1)
+        app.config["SQLALCHEMY_BINDS"] = {"replica": replica_url}
+    app.config["ORDER_ARCHIVE_DIR"] = os.getenv("ORDER_ARCHIVE_DIR", os.path.join(os.path.dirname(__file__), 'database', 'archive'))
+    app.config["REPLICA_MAX_LAG_SECONDS"] = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 10))
+    app.config["REPLICA_READ_AFTER_WRITE_SECONDS"] = float(os.getenv("REPLICA_READ_AFTER_WRITE_SECONDS", 5))
+    app.config["TRAFFIC_CAPTURE_FILE"] = os.getenv("TRAFFIC_CAPTURE_FILE")
+    app.config["TRAFFIC_CAPTURE_SAMPLE"] = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", 1.0))
+    app.config["SCHEDULER_WARMUP_LEAD"] = int(os.getenv("SCHEDULER_WARMUP_LEAD", 60))
+    app.config["REPORT_WORKERS"] = int(os.getenv("REPORT_WORKERS", 2))
+    app.config["REPORT_CACHE_MINUTES"] = int(os.getenv("REPORT_CACHE_MINUTES", 15))
+    app.config["ETA_KITCHEN_PARALLEL"] = int(os.getenv("ETA_KITCHEN_PARALLEL", 3))
+    app.config["KITCHEN_SLOT_MINUTES"] = int(os.getenv("KITCHEN_SLOT_MINUTES", 15))
+    app.config["KITCHEN_SLOT_ORDERS"] = int(os.getenv("KITCHEN_SLOT_ORDERS", 0))
+    app.config["KITCHEN_SLOT_LOOKAHEAD"] = int(os.getenv("KITCHEN_SLOT_LOOKAHEAD", 8))
+    app.config["QUERY_COUNT_HEADER"] = os.getenv("QUERY_COUNT_HEADER", "0") == "1"
+
+    # Configuração do Flask-Mail
+    app.config["MAIL_SERVER"] = os.getenv("MAIL_SERVER", "smtp.googlemail.com")
+    app.config["MAIL_PORT"] = int(os.getenv("MAIL_PORT", 587))
+    app.config["MAIL_USE_TLS"] = os.getenv("MAIL_USE_TLS", "True").lower() == "true"
+    app.config["MAIL_USERNAME"] = os.getenv("MAIL_USERNAME")
+    app.config["MAIL_PASSWORD"] = os.getenv("MAIL_PASSWORD")
+
+    # Sobrescritas explícitas valem mais que o ambiente (o Flask-Mail e o
+    # SQLAlchemy leem a configuração no init_app, logo abaixo)
+    app.config.update(config)
 
     # Conecta as extensões ao app
     db.init_app(app)
+
+    # Perfil de produção do SQLite (WAL, busy_timeout, BEGIN IMMEDIATE nas
+    # escritas); SQLITE_TUNING=0 volta ao comportamento padrão do driver.
+    if os.getenv("SQLITE_TUNING", "1") != "0":
+        with app.app_context():
+            for engine in db.engines.values():
+                configure_sqlite(engine, busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 10000)))
     login_manager.init_app(app)
     mail.init_app(app)
     migrate.init_app(app, db)
@@ -59,20 +136,83 @@ def create_app():
     def load_user(user_id):
         return User.query.get(int(user_id))
 
-    # Configuração do Flask-Mail
-    app.config["MAIL_SERVER"] = os.getenv("MAIL_SERVER", "smtp.googlemail.com")
-    app.config["MAIL_PORT"] = int(os.getenv("MAIL_PORT", 587))
-    app.config["MAIL_USE_TLS"] = os.getenv("MAIL_USE_TLS", "True").lower() == "true"
-    app.config["MAIL_USERNAME"] = os.getenv("MAIL_USERNAME")
-    app.config["MAIL_PASSWORD"] = os.getenv("MAIL_PASSWORD")
-
     # Importar e registrar Blueprints (rotas)
     from src.routes.auth import auth_bp
     from src.routes.admin import admin_bp
     from src.routes.client import client_bp
+    from src.routes.ops import ops_bp
+    from src.routes.api import api_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(client_bp)
+    app.register_blueprint(ops_bp)
+    app.register_blueprint(api_bp)
+
+    # Métricas do Prometheus (latência por endpoint, pool de conexões, cache)
+    from src.services import metrics
+    metrics.init_app(app)
+
+    # Invalidação dos caches em memória entre workers (tabela cache_versions)
+    from src.services import cache
+    cache.init_app(app)
+
+    # Unidades do restaurante: filtro por location_id em todas as consultas do ORM
+    from src.services import locations
+    locations.init_app(app)
+
+    # Índice de busca do cardápio (sincronização e comando "flask search-reindex")
+    from src.services import search
+    search.init_app(app)
+
+    # Log de transições de status dos pedidos (tabela order_events)
+    from src.services import order_events
+    order_events.init_app(app)
+
+    # Previsão de demanda por produto para o preparo ("flask forecast run")
+    from src.services.forecast import forecast_cli
+    app.cli.add_command(forecast_cli)
+
+    # Previsão do tempo dos pedidos, aprendida com as transições de status
+    from src.services import eta
+    eta.init_app(app)
+
+    # Resumo de pedidos por cliente e lista paginada do admin ("flask customers rebuild")
+    from src.services import customers
+    customers.init_app(app)
+    app.cli.add_command(customers.customers_cli)
+
+    # Capacidade da cozinha por horário (reserva no checkout)
+    from src.services import kitchen
+    kitchen.init_app(app)
+
+    # Manutenção das partições mensais de pedidos ("flask partitions ...")
+    from src.services.partitions import partitions_cli
+    app.cli.add_command(partitions_cli)
+
+    # Manutenção de pedidos ("flask orders prune-keys")
+    from src.services.orders import orders_cli
+    app.cli.add_command(orders_cli)
+
+    # Manutenção do SQLite ("flask sqlite checkpoint|optimize")
+    from src.services.sqlite_maintenance import sqlite_cli
+    app.cli.add_command(sqlite_cli)
+
+    # Arquivo colunar de pedidos antigos e relatórios históricos ("flask history ...")
+    from src.services.history import history_cli
+    app.cli.add_command(history_cli)
+
+    # Relatórios do painel executados em segundo plano ("flask reports worker")
+    from src.services import reports
+    reports.init_app(app)
+
+    # Aquecimento do cardápio e expiração de cupons nas viradas ("flask scheduler run")
+    from src.services.scheduler import scheduler_cli
+    app.cli.add_command(scheduler_cli)
+
+    # Captura de tráfego anonimizada e "flask traffic replay" (desligada por padrão)
+    from src.services import traffic
+    traffic.init_app(app)
+    app.cli.add_command(traffic.traffic_cli)
 
     # Rota principal
     @app.route('/')
@@ -102,7 +242,19 @@ def create_app():
 
     return app
 
-app = create_app()
+
+# ==============================================================================
+# INSTÂNCIA PADRÃO SOB DEMANDA
+# `from src.main import app` (scripts antigos, "flask --app src.main") cria o app
+# no primeiro acesso; o gunicorn usa src/wsgi.py.
+# ==============================================================================
+def __getattr__(name):
+    if name == "app":
+        app = create_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # ==============================================================================
 # CORREÇÃO 4: PROTEGER A EXECUÇÃO DO APP
@@ -111,5 +263,3 @@ app = create_app()
 if __name__ == '__main__':
     app = create_app()
     app.run(host='0.0.0.0', port=5000, debug=True)
-
-
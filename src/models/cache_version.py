@@ -0,0 +1,11 @@
+from src.database import db
+
+class CacheVersion(db.Model):
+    """Versão de cada região de cache; sobe a cada commit que altera seus modelos."""
+    __tablename__ = "cache_versions"
+
+    region = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.region}={self.version}>"
@@ -0,0 +1,26 @@
+from src.database import db
+
+class CustomerStats(db.Model):
+    """Resumo dos pedidos de um cliente, mantido a cada pedido e cancelamento (ver src/services/customers.py)."""
+    __tablename__ = "customer_stats"
+    # Um índice por ordenação da lista de clientes; o id desempata a paginação
+    __table_args__ = (
+        db.Index("ix_customer_stats_order_count", "order_count", "user_id"),
+        db.Index("ix_customer_stats_lifetime_value", "lifetime_value", "user_id"),
+        db.Index("ix_customer_stats_avg_ticket", "avg_ticket", "user_id"),
+        # Sem pedido (nulo) vai para o fim da lista "recentes": o SQLite já percorre assim o
+        # índice comum, de trás para frente; o PostgreSQL precisa do índice em DESC NULLS LAST
+        db.Index("ix_customer_stats_last_order_at", "last_order_at", "user_id").ddl_if(
+            callable_=lambda ddl, target, bind, **kw: kw["dialect"].name != "postgresql"),
+        db.Index("ix_customer_stats_last_order_at_desc",
+                 db.desc(db.text("last_order_at")).nulls_last(), db.desc(db.text("user_id"))).ddl_if(dialect="postgresql"),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)  # sem cancelados
+    lifetime_value = db.Column(db.Float, nullable=False, default=0)
+    avg_ticket = db.Column(db.Float, nullable=False, default=0)
+    last_order_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<CustomerStats {self.user_id} {self.order_count} {self.lifetime_value:.2f}>"
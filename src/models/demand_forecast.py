@@ -0,0 +1,20 @@
+from datetime import datetime
+import pytz
+from src.database import db
+
+class DemandForecast(db.Model):
+    """Quantidade prevista de um produto em um dia e período (ver src/services/forecast.py)."""
+    __tablename__ = "demand_forecast"
+    __table_args__ = (db.UniqueConstraint("forecast_date", "period", "product_id", name="uq_demand_forecast_key"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    forecast_date = db.Column(db.Date, nullable=False, index=True)
+    period = db.Column(db.String(10), nullable=False)  # Almoço, Jantar
+    # Sem chave estrangeira: a previsão é recalculada todo dia e não deve impedir excluir produtos
+    product_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Float, nullable=False)  # suavização exponencial semanal
+    baseline = db.Column(db.Float, nullable=False)  # média sazonal (mesmo dia da semana e período)
+    generated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.utc))
+
+    def __repr__(self):
+        return f"<DemandForecast {self.forecast_date} {self.period} {self.product_id} {self.quantity:.1f}>"
@@ -1,7 +1,10 @@
 from datetime import datetime
 from src.database import db
+from src.models.location import LocationScoped
+
+class Employee(LocationScoped, db.Model):
+    __table_args__ = (db.Index("ix_employee_location_name", "location_id", "name"),)
 
-class Employee(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
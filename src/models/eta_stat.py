@@ -0,0 +1,23 @@
+from datetime import datetime
+import pytz
+from src.database import db
+
+class EtaStat(db.Model):
+    """Média móvel da duração de uma etapa do pedido (ver src/services/eta.py).
+
+    Uma linha por (etapa, categoria, período); categoria 0 = todas as categorias.
+    """
+    __tablename__ = "eta_stats"
+    __table_args__ = (db.UniqueConstraint("stage", "category_id", "period", name="uq_eta_stats_key"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    stage = db.Column(db.String(20), nullable=False)  # preparo, entrega
+    category_id = db.Column(db.Integer, nullable=False, default=0)
+    period = db.Column(db.String(10), nullable=False)  # Almoço, Jantar
+    samples = db.Column(db.Integer, nullable=False, default=0)
+    mean_minutes = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.utc),
+                           onupdate=lambda: datetime.now(pytz.utc))
+
+    def __repr__(self):
+        return f"<EtaStat {self.stage} {self.category_id} {self.period} {self.mean_minutes:.1f}>"
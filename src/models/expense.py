@@ -1,6 +1,11 @@
 from src.database import db
+from src.models.location import LocationScoped
+
+class Expense(LocationScoped, db.Model):
+    # Lista por data e resumo mês × tipo (src/services/expenses.py) localizam as linhas da
+    # unidade e do período pelo índice; o valor (amount) ainda é lido da tabela
+    __table_args__ = (db.Index("ix_expense_location_date_type", "location_id", "date", "expense_type"),)
 
-class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(120), nullable=False)
     amount = db.Column(db.Float, nullable=False)
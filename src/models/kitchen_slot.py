@@ -0,0 +1,18 @@
+from src.database import db
+from src.models.location import LocationScoped
+
+class SlotReservation(LocationScoped, db.Model):
+    """Capacidade já reservada em um horário da cozinha (ver src/services/kitchen.py).
+
+    Uma linha por (unidade, horário, categoria); categoria 0 conta pedidos, não itens.
+    """
+    __tablename__ = "slot_reservations"
+    __table_args__ = (db.UniqueConstraint("location_id", "slot_start", "category_id", name="uq_slot_reservations_slot"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    slot_start = db.Column(db.DateTime, nullable=False)
+    category_id = db.Column(db.Integer, nullable=False)
+    used = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SlotReservation {self.slot_start} {self.category_id} {self.used}>"
@@ -0,0 +1,48 @@
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import declared_attr
+from src.database import db
+
+# Unidade criada pela migração (e pelo create_all); dona de todos os dados anteriores
+DEFAULT_LOCATION_ID = 1
+
+
+class Location(db.Model):
+    """Unidade do restaurante; produtos, pedidos, despesas etc. pertencem a uma (ver src/services/locations.py)."""
+    __tablename__ = "locations"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(50), unique=True, nullable=False)
+    address = db.Column(db.String(200), nullable=True)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+
+    def __repr__(self):
+        return f"<Location {self.slug}>"
+
+
+@event.listens_for(Location.__table__, "after_create")
+def _create_default_location(target, connection, **kw):
+    connection.execute(target.insert().values(id=DEFAULT_LOCATION_ID, name="Principal", slug="principal"))
+
+
+def current_location_id():
+    """Unidade da requisição (ou de `locations.scoped`); None fora delas, quando nada é filtrado."""
+    return g.get("location_id") if has_app_context() else None
+
+
+def _location_for_insert():
+    return current_location_id() or DEFAULT_LOCATION_ID
+
+
+class LocationScoped:
+    """Mixin das tabelas separadas por unidade.
+
+    As consultas do ORM recebem `location_id = unidade atual` automaticamente, e
+    linhas novas (inclusive por INSERT em lote) nascem na unidade atual.
+    """
+
+    @declared_attr
+    def location_id(cls):
+        return db.Column(db.Integer, db.ForeignKey("locations.id"), nullable=False, default=_location_for_insert,
+                         server_default=db.text(str(DEFAULT_LOCATION_ID)))
@@ -1,9 +1,23 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
+from sqlalchemy import event
 from src.database import db
+from src.models.location import LocationScoped
 
-class Order(db.Model):
+class Order(LocationScoped, db.Model):
     __tablename__ = "orders"
+    # No PostgreSQL a tabela é particionada por mês de created_at, então a chave
+    # primária física é (id, created_at); a restrição abaixo permite que os itens
+    # referenciem o par também no SQLite.
+    # Índice parcial só com os pedidos em aberto: contar a fila da cozinha de uma
+    # unidade custa o tamanho da fila, não o do histórico.
+    __table_args__ = (
+        db.UniqueConstraint("id", "created_at", name="uq_orders_id_created_at"),
+        db.Index("ix_orders_location_created_at", "location_id", "created_at"),
+        db.Index("ix_orders_open_status", "location_id", "status",
+                 postgresql_where=db.text("status IN ('recebido', 'em_preparo')"),
+                 sqlite_where=db.text("status IN ('recebido', 'em_preparo')")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -12,21 +26,34 @@ class Order(db.Model):
     payment_method = db.Column(db.String(20), nullable=False)
     delivery_type = db.Column(db.String(20), nullable=False)
     delivery_address = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(pytz.utc))
-    estimated_time = db.Column(db.Integer, default=30)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.utc))
+    # Horário de preparo reservado no checkout (UTC; None sem limite de capacidade)
+    slot_start = db.Column(db.DateTime, nullable=True)
+    estimated_time = db.Column(db.Integer, default=30)  # minutos desde created_at (src/services/eta.py)
 
     user = db.relationship("User", backref="orders")
     items = db.relationship("OrderItem", backref="order", lazy=True)
 
+    @property
+    def estimated_ready_at(self):
+        """Horário previsto de conclusão (retirada: pronto; entrega: entregue)."""
+        return self.created_at + timedelta(minutes=self.estimated_time or 0)
+
     def __repr__(self):
         return f"<Order {self.id}>"
 
 
 class OrderItem(db.Model):
     __tablename__ = "order_items"
+    # Itens ficam na mesma partição mensal do pedido; a junção pelo par
+    # (order_id, order_created_at) permite partition-wise join no PostgreSQL.
+    __table_args__ = (
+        db.ForeignKeyConstraint(["order_id", "order_created_at"], ["orders.id", "orders.created_at"]),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
+    order_id = db.Column(db.Integer, nullable=False)
+    order_created_at = db.Column(db.DateTime, nullable=True)
     product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
@@ -35,3 +62,52 @@ class OrderItem(db.Model):
 
     def __repr__(self):
         return f"<OrderItem {self.id}>"
+
+
+class OrderRequest(db.Model):
+    """Chave de idempotência enviada pelo checkout, ligada ao pedido que ela criou.
+
+    Fica fora de `orders` porque, com a tabela particionada, um índice único
+    precisaria incluir created_at. Sem chave estrangeira para o pedido, para não
+    travar o arquivamento de partições e do histórico.
+    """
+    __tablename__ = "order_requests"
+    __table_args__ = (db.UniqueConstraint("user_id", "idempotency_key", name="uq_order_requests_user_key"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    idempotency_key = db.Column(db.String(64), nullable=False)
+    order_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.utc), index=True)
+
+    def __repr__(self):
+        return f"<OrderRequest {self.idempotency_key}>"
+
+
+class OrderEvent(db.Model):
+    """Transição de status de um pedido, gravada na mesma transação da mudança.
+
+    Tabela só de inserção, lida por cursor (id) em src/services/order_events.py.
+    Sem chave estrangeira para o pedido, como em OrderRequest: o arquivamento
+    leva pedidos e eventos juntos para o arquivo histórico.
+    """
+    __tablename__ = "order_events"
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False, index=True)
+    from_status = db.Column(db.String(20), nullable=True)  # None na criação do pedido
+    to_status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.utc))
+
+    def __repr__(self):
+        return f"<OrderEvent {self.order_id} {self.from_status}->{self.to_status}>"
+
+
+@event.listens_for(OrderItem, "before_insert")
+def _copy_order_created_at(mapper, connection, target):
+    # Mantém a chave de partição do item igual à do pedido, mesmo quando o item
+    # é criado só com order_id.
+    if target.order_created_at is None:
+        order = target.order or db.session.get(Order, target.order_id)
+        if order is not None:
+            target.order_created_at = order.created_at
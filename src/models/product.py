@@ -1,19 +1,23 @@
 
 from src.database import db
+from src.models.location import LocationScoped
 
 class Category(db.Model):
     __tablename__ = "categories"
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
+    # Itens desta categoria que a cozinha prepara por horário (None = sem limite; ver src/services/kitchen.py)
+    slot_capacity = db.Column(db.Integer, nullable=True)
     products = db.relationship("Product", backref="category", lazy=True)
 
     def __repr__(self):
         return f"<Category {self.name}>"
 
 
-class Product(db.Model):
+class Product(LocationScoped, db.Model):
     __tablename__ = "products"
+    __table_args__ = (db.Index("ix_products_location_category", "location_id", "category_id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
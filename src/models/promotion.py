@@ -1,7 +1,10 @@
 from datetime import datetime
 from src.database import db
+from src.models.location import LocationScoped
+
+class Promotion(LocationScoped, db.Model):
+    __table_args__ = (db.Index("ix_promotion_location_end_date", "location_id", "end_date"),)
 
-class Promotion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -14,7 +17,9 @@ class Promotion(db.Model):
     def __repr__(self):
         return f"<Promotion {self.name}>"
 
-class Coupon(db.Model):
+class Coupon(LocationScoped, db.Model):
+    __table_args__ = (db.Index("ix_coupon_location_end_date", "location_id", "end_date"),)
+
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(20), unique=True, nullable=False)
     discount_type = db.Column(db.String(20), nullable=False)  # percentage, fixed
@@ -0,0 +1,24 @@
+from datetime import datetime
+import pytz
+from src.database import db
+
+class ReportJob(db.Model):
+    """Relatório pedido no painel e executado fora da requisição (ver src/services/reports.py)."""
+    __tablename__ = "report_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    params = db.Column(db.Text, nullable=False)  # JSON normalizado
+    # Hash de tipo + parâmetros: pedidos idênticos reaproveitam o mesmo resultado
+    params_hash = db.Column(db.String(64), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default="pendente")  # pendente, executando, concluido, erro
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text, nullable=True)  # JSON: {"columns": [...], "rows": [...]}
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.utc))
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ReportJob {self.id} {self.kind} {self.status}>"
@@ -1,9 +1,25 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+import re
 import secrets
+from sqlalchemy.orm import validates
 from src.database import db
 
+
+def digits_only(value):
+    """Só os dígitos de um telefone ou CPF digitado com máscara ("(11) 9 8765-4321" → "11987654321")."""
+    return re.sub(r"\D", "", value or "")
+
+
+def normalize_phone(value):
+    """Dígitos do telefone sem o código do país e sem o zero de longa distância."""
+    number = digits_only(value).lstrip("0")
+    if number.startswith("55") and len(number) in (12, 13):
+        number = number[2:]
+    return number
+
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'  # <- ESSENCIAL para evitar conflito com palavra reservada
 
@@ -16,6 +32,26 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     reset_token = db.Column(db.String(100), unique=True)
     reset_token_expiration = db.Column(db.DateTime)
+    # Cópias só com dígitos, preenchidas ao gravar phone/cpf: busca do caixa e checagem de CPF
+    # repetido no cadastro. O índice não é único: cadastros antigos repetem o CPF com outra máscara
+    phone_digits = db.Column(db.String(20), nullable=True, index=True)
+    cpf_digits = db.Column(db.String(14), nullable=True, index=True)
+
+    # Busca de clientes por prefixo, sem diferenciar maiúsculas (admin.clients)
+    __table_args__ = (
+        db.Index("ix_users_username_lower", db.func.lower(username)),
+        db.Index("ix_users_email_lower", db.func.lower(email)),
+    )
+
+    @validates("phone")
+    def _set_phone(self, key, value):
+        self.phone_digits = normalize_phone(value) or None
+        return value
+
+    @validates("cpf")
+    def _set_cpf(self, key, value):
+        self.cpf_digits = digits_only(value) or None
+        return value
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -30,6 +66,28 @@ class User(UserMixin, db.Model):
         db.session.commit()
         return self.reset_token
 
+    @staticmethod
+    def conflicts(username, email, cpf):
+        """Quais de "username", "email" e "cpf" já estão cadastrados (uma consulta, pelos índices).
+
+        Sem LIMIT: vários usuários podem ter o mesmo cpf_digits e não podem esconder o
+        dono do username ou do email.
+        """
+        cpf_digits = digits_only(cpf)
+        rows = db.session.execute(
+            db.select(User.username, User.email, User.cpf_digits)
+            .where(db.or_(User.username == username, User.email == email, User.cpf_digits == cpf_digits))
+        ).all()
+        taken = set()
+        for row in rows:
+            if row.username == username:
+                taken.add("username")
+            if row.email == email:
+                taken.add("email")
+            if cpf_digits and row.cpf_digits == cpf_digits:
+                taken.add("cpf")
+        return taken
+
     @staticmethod
     def verify_reset_token(token):
         user = User.query.filter_by(reset_token=token).first()
@@ -1,15 +1,21 @@
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, Response, g
 from flask_login import login_required, current_user
-from src.models.user import User
 from src.models.product import Category, Product, ProductAvailability, IngredientOption
 from src.models.order import Order, OrderItem
 from src.models.employee import Employee, TimeRecord
 from src.models.promotion import Promotion, Coupon
 from src.models.expense import Expense
-from src.database import db
+from src.models.report_job import ReportJob
+from src.database import db, replica_reads
+from src.services import catalog, customers, forecast, history, locations, order_events, reports
+from src.services import expenses as expense_service, orders as order_service
+import io
+import json
 from datetime import datetime, timedelta
 from sqlalchemy import func, cast, Date
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 import pytz
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -22,6 +28,7 @@ def require_admin():
 
 @admin_bp.route("/dashboard")
 @login_required
+@replica_reads
 def dashboard():
     # Estatísticas gerais
     brazil_tz = pytz.timezone("America/Sao_Paulo")
@@ -67,10 +74,8 @@ def dashboard():
 
     estimated_profit = profit_query or 0
 
-    # Despesas mensais
-    monthly_expenses = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.date >= month_ago_utc
-    ).scalar() or 0
+    # Despesas mensais (em cache até a próxima alteração de despesa)
+    monthly_expenses = expense_service.total_since((now_brazil - timedelta(days=30)).date())
 
     # Custo estimado dos produtos vendidos
     estimated_product_cost = db.session.query(
@@ -93,7 +98,8 @@ def dashboard():
                          estimated_profit=estimated_profit,
                          monthly_expenses=monthly_expenses,
                          final_balance=final_balance,
-                         estimated_product_cost=estimated_product_cost)
+                         estimated_product_cost=estimated_product_cost,
+                         prep_plan=forecast.prep_plan(datetime.now(pytz.timezone(history.LOCAL_TZ)).date()))
 
 # Em src/routes/admin.py
 
@@ -190,6 +196,73 @@ def toggle_product_availability(product_id):
     flash(f"Disponibilidade do produto '{product.name}' atualizada para {'disponível' if product.is_available else 'indisponível'}.", "success")
     return redirect(url_for("admin.products"))
 
+# --- IMPORTAÇÃO/EXPORTAÇÃO E OPERAÇÕES EM LOTE DO CATÁLOGO ---
+
+@admin_bp.route("/products/export")
+@login_required
+@replica_reads
+def export_products():
+    fmt = request.args.get("format", "csv")
+    rows = catalog.export_catalog()
+    if fmt == "json":
+        body, mimetype = json.dumps(rows, ensure_ascii=False, indent=2), "application/json"
+    else:
+        fmt, body, mimetype = "csv", catalog.catalog_to_csv(rows), "text/csv"
+    return Response(body, mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=catalogo.{fmt}"})
+
+@admin_bp.route("/products/import", methods=["POST"])
+@login_required
+def import_products():
+    # O arquivo enviado é validado e comparado com o banco. No dry-run mostramos
+    # o diff; a confirmação reenvia as linhas já normalizadas (campo "payload").
+    payload = request.form.get("payload")
+    upload = request.files.get("catalog_file")
+    try:
+        if payload:
+            rows = catalog.parse_catalog(io.StringIO(payload), "json")
+        elif upload and upload.filename:
+            fmt = "json" if upload.filename.lower().endswith(".json") else "csv"
+            rows = catalog.parse_catalog(upload.stream, fmt)
+        else:
+            flash("Selecione um arquivo CSV ou JSON para importar.", "warning")
+            return redirect(url_for("admin.products"))
+        plan = catalog.plan_import(rows)
+    except catalog.CatalogImportError as e:
+        flash(f"Erro na importação: {e}", "danger")
+        return redirect(url_for("admin.products"))
+
+    if request.form.get("dry_run"):
+        return render_template("admin/catalog_import.html",
+                               plan=plan,
+                               summary=catalog.plan_summary(plan),
+                               payload=json.dumps(rows, ensure_ascii=False))
+
+    summary = catalog.apply_import(plan)
+    flash(f"Catálogo importado: {summary['products_created']} produto(s) criado(s), "
+          f"{summary['products_updated']} atualizado(s), {summary['categories_created']} categoria(s) nova(s).", "success")
+    return redirect(url_for("admin.products"))
+
+@admin_bp.route("/products/bulk", methods=["POST"])
+@login_required
+def bulk_update_products():
+    product_ids = request.form.getlist("product_ids", type=int)
+    action = request.form.get("action")
+    value = request.form.get("value")
+
+    if not product_ids:
+        flash("Selecione pelo menos um produto.", "warning")
+        return redirect(url_for("admin.products"))
+
+    try:
+        updated = catalog.bulk_update_products(product_ids, action, value)
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("admin.products"))
+
+    flash(f"{updated} produto(s) atualizado(s).", "success")
+    return redirect(url_for("admin.products"))
+
 # --- SEÇÃO DE CATEGORIAS ATUALIZADA ---
 
 @admin_bp.route("/categories")
@@ -239,6 +312,10 @@ def edit_category(category_id):
         return redirect(url_for("admin.categories"))
 
     category.name = new_name
+    if "slot_capacity" in request.form:
+        # Vazio = sem limite de itens por horário (src/services/kitchen.py)
+        slot_capacity = request.form.get("slot_capacity", "").strip()
+        category.slot_capacity = int(slot_capacity) if slot_capacity.isdigit() and int(slot_capacity) > 0 else None
     db.session.commit()
     flash("Categoria atualizada com sucesso!", "success")
     return redirect(url_for("admin.categories"))
@@ -262,6 +339,7 @@ def delete_category(category_id):
 
 @admin_bp.route("/orders")
 @login_required
+@replica_reads
 def orders():
     status_filter = request.args.get("status", "all")
     period_filter = request.args.get("period", "all")
@@ -269,7 +347,11 @@ def orders():
     brazil_tz = pytz.timezone("America/Sao_Paulo")
     now_brazil = datetime.now(brazil_tz)
     
-    query = Order.query
+    # Cliente, itens, produtos e categorias que o template mostra, sem uma consulta por pedido
+    query = Order.query.options(
+        joinedload(Order.user),
+        selectinload(Order.items).selectinload(OrderItem.product).joinedload(Product.category),
+    )
     
     if period_filter == "today":
         today_start_utc = now_brazil.replace(hour=0, minute=0, second=0, microsecond=0).astimezone(pytz.utc)
@@ -313,6 +395,31 @@ def update_order_status(order_id):
     flash(f"Status do pedido #{order_id} atualizado para {new_status}", "success")
     return redirect(url_for("admin.orders"))
 
+@admin_bp.route("/orders/bulk_status", methods=["POST"])
+@login_required
+def bulk_update_order_status():
+    """Muda o status de vários pedidos numa requisição (JSON: order_ids, status), sem recarregar a página."""
+    payload = request.get_json(silent=True) or {}
+    status = payload.get("status")
+    try:
+        order_ids = [int(order_id) for order_id in payload.get("order_ids") or []]
+    except (TypeError, ValueError):
+        return jsonify(error="Lista de pedidos inválida."), 400
+    if not order_ids:
+        return jsonify(error="Selecione pelo menos um pedido."), 400
+
+    try:
+        transitions = order_service.bulk_set_status(order_ids, status)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    updated = [order_id for order_id, _, _ in transitions]
+    return jsonify({
+        "status": status,
+        "updated": [{"id": order_id, "from_status": from_status} for order_id, from_status, _ in transitions],
+        "skipped": sorted(set(order_ids) - set(updated)),
+    })
+
 @admin_bp.route("/employees")
 @login_required
 def employees():
@@ -471,14 +578,57 @@ def delete_coupon(coupon_id):
 @admin_bp.route("/clients")
 @login_required
 def clients():
-    clients = User.query.filter_by(is_admin=False).all()
-    return render_template("admin/clients.html", clients=clients)
+    sort = request.args.get("sort", customers.DEFAULT_SORT)
+    q = request.args.get("q", "").strip()
+    rows, next_cursor = customers.page(sort, request.args.get("after"), q)
+    return render_template("admin/clients.html", rows=rows, next_cursor=next_cursor,
+                           sort=sort if sort in customers.SORTS else customers.DEFAULT_SORT, q=q)
+
+@admin_bp.route("/locations")
+@login_required
+def locations_page():
+    return render_template("admin/locations.html", locations=locations.all_locations(),
+                           current_location_id=g.location_id)
+
+@admin_bp.route("/locations/add", methods=["POST"])
+@login_required
+def add_location():
+    name = request.form.get("name", "").strip()
+    if not name:
+        flash("Informe o nome da unidade.", "danger")
+        return redirect(url_for("admin.locations_page"))
+    try:
+        locations.add_location(name, request.form.get("address") or None)
+    except IntegrityError:
+        db.session.rollback()
+        flash("Já existe uma unidade com esse nome.", "danger")
+        return redirect(url_for("admin.locations_page"))
+    flash("Unidade adicionada com sucesso!", "success")
+    return redirect(url_for("admin.locations_page"))
+
+@admin_bp.route("/locations/<int:location_id>/select", methods=["POST"])
+@login_required
+def select_location(location_id):
+    if locations.choose(location_id):
+        flash("Unidade alterada. O painel agora mostra só os dados dela.", "success")
+    else:
+        flash("Unidade não encontrada ou inativa.", "danger")
+    return redirect(url_for("admin.dashboard"))
 
 @admin_bp.route("/expenses")
 @login_required
 def expenses():
-    expenses = Expense.query.order_by(Expense.date.desc()).all()
-    return render_template("admin/expenses.html", expenses=expenses)
+    expense_type = request.args.get("type") or None
+    rows, next_cursor = expense_service.page(request.args.get("after"), expense_type)
+    return render_template("admin/expenses.html", expenses=rows, next_cursor=next_cursor,
+                           expense_type=expense_type, expense_types=reports.EXPENSE_TYPES)
+
+@admin_bp.route("/api/expenses/summary")
+@login_required
+def expenses_summary():
+    """Totais de despesas por mês e tipo, com a variação sobre o mês anterior (?months=12)."""
+    months = min(max(request.args.get("months", expense_service.SUMMARY_MONTHS, type=int), 1), 60)
+    return jsonify(expense_service.recent_summary(months=months))
 
 @admin_bp.route("/expenses/add", methods=["POST"])
 @login_required
@@ -636,3 +786,68 @@ def get_product_availability(product_id):
         'current_time': current_time
     })
 
+
+@admin_bp.route("/api/order_events")
+@login_required
+def order_events_feed():
+    """Transições de status desde o cursor `after` (id do último evento recebido)."""
+    after = request.args.get("after", 0, type=int)
+    limit = min(request.args.get("limit", 500, type=int), 1000)
+    events = order_events.events_since(after, limit)
+    return jsonify({
+        "events": events,
+        "next": events[-1]["id"] if events else after,
+    })
+
+
+@admin_bp.route("/api/customers/lookup")
+@login_required
+def customer_lookup():
+    """Clientes pelo telefone ou CPF (com ou sem máscara), para pedidos no balcão e por telefone."""
+    return jsonify({"customers": customers.lookup(request.args.get("q", ""))})
+
+
+# --- RELATÓRIOS EM SEGUNDO PLANO ---
+
+@admin_bp.route("/reports", methods=["GET", "POST"])
+@login_required
+def reports_page():
+    if request.method == "POST":
+        kind = request.form.get("kind")
+        try:
+            params = reports.normalize_params(kind, request.form)
+        except reports.ReportError as e:
+            flash(str(e), "danger")
+            return redirect(url_for("admin.reports_page"))
+        job, reused = reports.submit(kind, params, current_user.id)
+        if reused:
+            flash("Um relatório idêntico já foi pedido; mostrando o mesmo resultado.", "info")
+        return redirect(url_for("admin.report_detail", job_id=job.id))
+
+    jobs = ReportJob.query.order_by(ReportJob.id.desc()).limit(20).all()
+    return render_template("admin/reports.html", jobs=jobs, report_types=reports.REPORTS,
+                           granularities=history.GRANULARITIES)
+
+@admin_bp.route("/reports/<int:job_id>")
+@login_required
+def report_detail(job_id):
+    job = ReportJob.query.get_or_404(job_id)
+    columns, rows = reports.result_rows(job) if job.status == "concluido" else ([], [])
+    return render_template("admin/report_detail.html", job=job, title=reports.REPORTS[job.kind][0],
+                           params=json.loads(job.params), columns=columns, rows=rows)
+
+@admin_bp.route("/reports/<int:job_id>/status")
+@login_required
+def report_status(job_id):
+    job = ReportJob.query.get_or_404(job_id)
+    return jsonify({"status": job.status, "progress": job.progress, "error": job.error})
+
+@admin_bp.route("/reports/<int:job_id>/download")
+@login_required
+def download_report(job_id):
+    job = ReportJob.query.get_or_404(job_id)
+    if job.status != "concluido":
+        flash("O relatório ainda não está pronto.", "warning")
+        return redirect(url_for("admin.report_detail", job_id=job_id))
+    return Response(reports.result_csv(job), mimetype="text/csv",
+                    headers={"Content-Disposition": f"attachment; filename=relatorio-{job.kind}-{job.id}.csv"})
@@ -0,0 +1,31 @@
+import os
+from flask import Blueprint, Response, jsonify, request
+from src.services.menu import PERIODS, WEEKDAYS, current_period, menu_document
+
+# API JSON pública para os totens de autoatendimento e o app.
+#
+# GET /api/menu devolve o cardápio do período atual (ou de ?day=...&period=...)
+# com ETag e Cache-Control públicos: o proxy local e os totens reaproveitam a
+# resposta, e revalidações com If-None-Match recebem 304 sem tocar no cardápio.
+
+api_bp = Blueprint("api", __name__, url_prefix="/api")
+
+MENU_MAX_AGE = int(os.getenv("MENU_API_MAX_AGE", 60))
+
+
+@api_bp.route("/menu")
+def menu():
+    current_day, current_time = current_period()
+    day = request.args.get("day", current_day)
+    period = request.args.get("period", current_time)
+    if day not in WEEKDAYS or period not in PERIODS:
+        return jsonify(error="Dia ou período inválido.", days=WEEKDAYS, periods=PERIODS), 400
+
+    body, etag = menu_document(day, period)
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = MENU_MAX_AGE
+    # Durante a revalidação, o proxy pode servir a cópia anterior por mais um tempo
+    response.cache_control.stale_while_revalidate = MENU_MAX_AGE * 5
+    return response.make_conditional(request)
@@ -44,6 +44,9 @@ def register():
 
         #cpf_validator = CPF()                                               ESSA LINHA FOI COMENTADA PARA TESTE DEZATIVANDO A AUTENTICAÇÃO DE CPF
 
+        # Nome, email e CPF já cadastrados, numa consulta só
+        taken = User.conflicts(username, email, cpf) if username and email else set()
+
         # Validações
         if not username or len(username) < 3:
             flash("Nome de usuário deve ter pelo menos 3 caracteres", "danger")
@@ -53,15 +56,15 @@ def register():
             flash("Telefone inválido", "danger")
         #elif not cpf or not cpf_validator.validate(cpf):                             ESSA LINHA FOI COMENTADA PARA TESTE DEZATIVANDO A AUTENTICAÇÃO DE CPF
             flash("CPF inválido", "danger")
-        elif User.query.filter_by(cpf=cpf).first():
+        elif "cpf" in taken:
             flash("CPF já cadastrado", "danger")
         elif not password or len(password) < 6:
             flash("Senha deve ter pelo menos 6 caracteres", "danger")
         elif password != confirm_password:
             flash("As senhas não coincidem", "danger")
-        elif User.query.filter_by(username=username).first():
+        elif "username" in taken:
             flash("Nome de usuário já existe", "danger")
-        elif User.query.filter_by(email=email).first():
+        elif "email" in taken:
             flash("Email já registrado", "danger")
         else:
             new_user = User(
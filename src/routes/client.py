@@ -1,99 +1,100 @@
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session, g
 from flask_login import login_required, current_user
 from src.models.user import User
 from src.models.product import Category, Product, ProductAvailability, IngredientOption
 from src.models.order import Order, OrderItem
 from src.models.promotion import Coupon
 from src.database import db
+from src.services.menu import current_period, menu_snapshot
+from src.services.search import search_product_ids
+from src.services.metrics import record_order_placed
+from src.services import kitchen, locations, orders
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+import uuid
 
 client_bp = Blueprint("client", __name__, url_prefix="/client")
 
+# Itens e produtos dos pedidos em duas consultas (IN), não uma por item
+ORDER_ITEMS = selectinload(Order.items).selectinload(OrderItem.product)
+
 @client_bp.route("/home")
 @login_required
 def home():
     # Produtos em destaque (últimos 6 produtos)
     featured_products = Product.query.filter_by(is_available=True).limit(6).all()
-    categories = Category.query.all()
-    return render_template("client/home.html", featured_products=featured_products, categories=categories)
+    # Contagem de produtos na própria consulta, em vez de carregar category.products no template
+    categories = db.session.query(
+        Category, func.count(Product.id).label("product_count")
+    ).outerjoin(Product, Category.id == Product.category_id).group_by(Category.id).order_by(Category.id).all()
+    units = [location for location in locations.all_locations() if location.is_active]
+    return render_template("client/home.html", featured_products=featured_products, categories=categories,
+                           units=units, current_location_id=g.location_id)
+
+@client_bp.route("/location/<int:location_id>", methods=["POST"])
+@login_required
+def choose_location(location_id):
+    if location_id != g.location_id and locations.choose(location_id):
+        # Os produtos do carrinho são da unidade anterior
+        session["cart"] = {}
+        flash("Unidade alterada. O cardápio e o carrinho agora são desta unidade.", "success")
+    return redirect(url_for("client.home"))
 
 # Em seu arquivo de rotas (client_bp)
 
 @client_bp.route("/menu")
 @login_required
 def menu():
-    # Imports e obtenção de data/hora permanecem os mesmos
-    from datetime import datetime
     category_id = request.args.get("category", type=int)
-    
-    current_weekday = datetime.now().weekday()
-    weekdays = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
-    current_day = weekdays[current_weekday]
-    
-    current_hour = datetime.now().hour
-    current_time = "Almoço" if current_hour < 15 else "Jantar"
-    
-    # A busca inicial de produtos permanece a mesma
-    if category_id:
-        products_query = Product.query.filter_by(category_id=category_id, is_available=True)
-    else:
-        products_query = Product.query.filter_by(is_available=True)
-    
-    # Usar options(joinedload(...)) é mais eficiente para carregar dados relacionados
-    # e ajuda a evitar o problema de `product.category` ser None.
-    from sqlalchemy.orm import joinedload
-    products = products_query.options(joinedload(Product.category)).all()
-
-    # --- INÍCIO DA CORREÇÃO ---
+    search_query = request.args.get("q", "").strip()
+    current_day, current_time = current_period()
 
-    processed_products = [] # Renomeado de available_products para maior clareza
-    for product in products:
-        availabilities = ProductAvailability.query.filter_by(product_id=product.id).all()
-        
-        is_available_now = True
-        price_adjustment = 0
-        
-        if availabilities:
-            is_available_now = False
-            for availability in availabilities:
-                if (availability.day_of_week == current_day or availability.day_of_week == "Todos") and \
-                   (availability.time_of_day == current_time or availability.time_of_day == "Dia Todo"):
-                    is_available_now = True
-                    price_adjustment = availability.price_adjustment
-                    break
-        
-        if is_available_now:
-            ingredient_options = IngredientOption.query.filter_by(product_id=product.id).all()
-            
-            # **A MUDANÇA PRINCIPAL ESTÁ AQUI**
-            # Em vez de modificar 'product', criamos um dicionário com os dados para o template.
-            product_data = {
-                "id": product.id,
-                "name": product.name,
-                "description": product.description,
-                "image_url": product.image_url,
-                "price": product.price,
-                "category": product.category, # O objeto de categoria inteiro é passado
-                "current_price": product.price + price_adjustment,
-                "price_adjustment": price_adjustment,
-                "ingredient_options": ingredient_options
-            }
-            processed_products.append(product_data)
+    # O cardápio do período vem pronto do cache (ver src/services/menu.py);
+    # aqui só aplicamos os filtros de busca e de categoria.
+    snapshot = menu_snapshot(current_day, current_time)
+    processed_products = snapshot["products"]
+    if search_query:
+        processed_products = _search_snapshot(snapshot, search_query, limit=50)
+    if category_id:
+        processed_products = [p for p in processed_products if p["category_id"] == category_id]
 
-    # --- FIM DA CORREÇÃO ---
-    
-    categories = Category.query.all()
-    
-    # Passamos a nova lista de dicionários para o template
+    # Passamos a lista de dicionários para o template
     return render_template("client/menu.html", 
-                         products=processed_products, # A lista corrigida
-                         categories=categories, 
+                         products=processed_products,
+                         categories=snapshot["categories"], 
                          selected_category=category_id,
+                         search_query=search_query,
                          current_day=current_day,
                          current_time=current_time)
 
 
+def _search_snapshot(snapshot, query, limit):
+    # O índice devolve os ids em ordem de relevância; preço e disponibilidade do
+    # período vêm do cardápio em cache.
+    by_id = {p["id"]: p for p in snapshot["products"]}
+    return [by_id[pid] for pid in search_product_ids(query, limit) if pid in by_id]
+
+
+@client_bp.route("/search")
+@login_required
+def search():
+    """Busca do cardápio para o autocompletar (JSON)."""
+    query = request.args.get("q", "").strip()
+    limit = min(request.args.get("limit", 8, type=int), 20)
+    if len(query) < 2:
+        return jsonify([])
+
+    snapshot = menu_snapshot(*current_period())
+    return jsonify([{
+        "id": p["id"],
+        "name": p["name"],
+        "category": p["category"]["name"] if p["category"] else None,
+        "current_price": p["current_price"],
+    } for p in _search_snapshot(snapshot, query, limit)])
+
+
 @client_bp.route("/add_to_cart", methods=["POST"])
 @login_required
 def add_to_cart():
@@ -257,12 +258,27 @@ def checkout():
             })
             total += item_total
     
-    return render_template("client/checkout.html", cart_items=cart_items, total=total)
+    # Horários de preparo com capacidade (só aparecem se a cozinha tiver limites)
+    category_quantities = {}
+    for item in cart_items:
+        category_id = item["product"].category_id
+        category_quantities[category_id] = category_quantities.get(category_id, 0) + item["quantity"]
+    order_needs = kitchen.needs(category_quantities)
+    slots = [(slot.isoformat(), kitchen.slot_label(slot)) for slot in kitchen.free_slots(order_needs)] if order_needs else []
+
+    return render_template("client/checkout.html", cart_items=cart_items, total=total,
+                           idempotency_key=uuid.uuid4().hex, slots=slots, kitchen_limited=bool(order_needs))
 
 @client_bp.route("/place_order", methods=["POST"])
 @login_required
 def place_order():
+    # Gerada no checkout: reenvios do mesmo formulário devolvem o mesmo pedido
+    idempotency_key = (request.form.get("idempotency_key") or "")[:64] or None
     if "cart" not in session or not session["cart"]:
+        # Duplo clique ou retry depois do checkout: o carrinho já foi esvaziado
+        existing_id = orders.existing_order_id(current_user.id, idempotency_key)
+        if existing_id is not None:
+            return redirect(url_for("client.order_tracking", order_id=existing_id))
         flash("Seu carrinho está vazio!")
         return redirect(url_for("client.menu"))
     
@@ -271,86 +287,54 @@ def place_order():
     delivery_type = request.form.get("delivery_type")
     delivery_address = request.form.get("delivery_address") if delivery_type == "entrega" else None
     coupon_code = request.form.get("coupon_code")
-    
-    # Calcular total
-    total = 0
-    order_items = []
-    
-    for cart_key, cart_item in session["cart"].items():
-        if isinstance(cart_item, dict):
-            product_id = cart_item.get("product_id")
-            quantity = cart_item.get("quantity", 0)
-            product = Product.query.get(product_id)
-            if not product:
-                flash(f"Produto com ID inválido: {product_id}", "danger")
-                continue
-        if product:
-            item_total = product.price * quantity
-            total += item_total
-            order_items.append({
-                "product": product,
-                "quantity": quantity,
-                "unit_price": product.price
-            })
-    
-    # Aplicar cupom se fornecido
-    discount = 0
-    if coupon_code:
-        coupon = Coupon.query.filter_by(code=coupon_code, is_active=True).first()
-        if coupon and coupon.used_count < coupon.usage_limit and total >= coupon.min_order_value:
-            if coupon.discount_type == "percentage":
-                discount = total * (coupon.discount_value / 100)
-            else:
-                discount = coupon.discount_value
-            
-            total -= discount
-            coupon.used_count += 1
-    
-    # Criar pedido
-    order = Order(
-        user_id=current_user.id,
-        total_amount=total,
-        payment_method=payment_method,
-        delivery_type=delivery_type,
-        delivery_address=delivery_address
-    )
-    db.session.add(order)
-    db.session.flush()  # Para obter o ID do pedido
-    
-    # Adicionar itens do pedido
-    for item in order_items:
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=item["product"].id,
-            quantity=item["quantity"],
-            unit_price=item["unit_price"]
+    try:
+        slot = datetime.fromisoformat(request.form.get("slot") or "")
+    except ValueError:
+        slot = None
+    
+    try:
+        order_id, created = orders.place_order(
+            current_user.id,
+            orders.cart_lines(session["cart"]),
+            payment_method,
+            delivery_type,
+            delivery_address=delivery_address,
+            coupon_code=coupon_code,
+            idempotency_key=idempotency_key,
+            slot=slot,
         )
-        db.session.add(order_item)
-    
-    db.session.commit()
+    except orders.EmptyOrderError:
+        flash("Nenhum produto válido no carrinho!", "danger")
+        return redirect(url_for("client.cart"))
+    except kitchen.KitchenFullError:
+        flash("A cozinha está lotada nos próximos horários. Tente novamente em alguns minutos.", "warning")
+        return redirect(url_for("client.checkout"))
     
     # Limpar carrinho
     session.pop("cart", None)
     
-    flash(f"Pedido #{order.id} realizado com sucesso!")
-    return redirect(url_for("client.order_tracking", order_id=order.id))
+    if created:
+        record_order_placed()
+        flash(f"Pedido #{order_id} realizado com sucesso!")
+    return redirect(url_for("client.order_tracking", order_id=order_id))
 
 @client_bp.route("/order_tracking/<int:order_id>")
 @login_required
 def order_tracking(order_id):
-    order = Order.query.filter_by(id=order_id, user_id=current_user.id).first_or_404()
-    return render_template("client/order_tracking.html", order=order)
+    order = Order.query.options(ORDER_ITEMS).filter_by(id=order_id, user_id=current_user.id).first_or_404()
+    slot_label = kitchen.slot_label(order.slot_start) if order.slot_start else None
+    return render_template("client/order_tracking.html", order=order, slot_label=slot_label)
 
 @client_bp.route("/order_history")
 @login_required
 def order_history():
-    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
+    orders = Order.query.options(ORDER_ITEMS).filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
     return render_template("client/order_history.html", orders=orders)
 
 @client_bp.route("/repeat_order/<int:order_id>")
 @login_required
 def repeat_order(order_id):
-    order = Order.query.filter_by(id=order_id, user_id=current_user.id).first_or_404()
+    order = Order.query.options(ORDER_ITEMS).filter_by(id=order_id, user_id=current_user.id).first_or_404()
     
     # Limpar carrinho atual
     session["cart"] = {}
@@ -0,0 +1,41 @@
+import os
+from flask import Blueprint, Response, abort, jsonify, request
+from sqlalchemy import text
+from src.database import db
+from src.services import metrics
+
+# Sondas para a plataforma (sem login, sem sessão e sem templates):
+#   /healthz - o processo está de pé;
+#   /readyz  - o banco responde a um SELECT 1 dentro do tempo limite;
+#   /metrics - métricas no formato do Prometheus.
+
+ops_bp = Blueprint("ops", __name__)
+
+READY_TIMEOUT_MS = 2000
+
+
+@ops_bp.route("/healthz")
+def healthz():
+    return jsonify(status="ok")
+
+
+@ops_bp.route("/readyz")
+def readyz():
+    try:
+        with db.engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                # SET LOCAL vale só para esta transação; a conexão volta limpa ao pool
+                connection.execute(text(f"SET LOCAL statement_timeout = {READY_TIMEOUT_MS}"))
+            connection.execute(text("SELECT 1"))
+    except Exception as exc:
+        return jsonify(status="indisponivel", error=exc.__class__.__name__), 503
+    return jsonify(status="ok")
+
+
+@ops_bp.route("/metrics")
+def metrics_endpoint():
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        abort(401)
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
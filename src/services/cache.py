@@ -0,0 +1,182 @@
+import time
+from functools import wraps
+from threading import RLock
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.database import db
+from src.models.cache_version import CacheVersion
+from src.models.location import current_location_id
+from src.services.metrics import record_cache
+
+# Cache em memória do processo, organizado por regiões versionadas (ex.: "menu").
+#
+# Cada região declara os modelos de que depende. Um commit que altera algum
+# deles (pela sessão ou por INSERT/UPDATE/DELETE em lote do ORM) incrementa a
+# versão da região na tabela `cache_versions`, na mesma transação. Cada worker
+# lê as versões (uma consulta pequena, no máximo uma vez por requisição) e
+# descarta entradas de versão antiga, então todos convergem na requisição
+# seguinte à alteração sem recarregar tabelas inteiras.
+#
+# As entradas são separadas por unidade (src/services/locations.py): a chave
+# inclui a unidade da requisição, então o cardápio de uma não aparece na outra.
+DEFAULT_TTL = 300
+
+_regions = {}
+_region_models = {}
+_lock = RLock()
+_versions_warned = False
+
+
+def region(name, ttl=DEFAULT_TTL, models=()):
+    """Memoriza o resultado da função na região `name` pela unidade atual e pelos argumentos posicionais.
+
+    `models`: classes cujas alterações invalidam a região em todos os workers.
+    """
+    _region_models.setdefault(name, set()).update(models)
+
+    def decorator(func):
+        def store(key, version, now, args):
+            value = func(*args)
+            with _lock:
+                _regions.setdefault(name, {})[key] = (now + ttl, version, value)
+            return value
+
+        @wraps(func)
+        def wrapper(*args):
+            key = (func.__qualname__, current_location_id()) + args
+            version = current_version(name)
+            now = time.monotonic()
+            with _lock:
+                entry = _regions.setdefault(name, {}).get(key)
+            if entry and entry[0] > now and entry[1] == version:
+                record_cache(name, True)
+                return entry[2]
+
+            record_cache(name, False)
+            return store(key, version, now, args)
+
+        def refresh(*args):
+            """Recalcula e guarda a entrada agora, com o TTL contado a partir deste momento."""
+            return store((func.__qualname__, current_location_id()) + args, current_version(name), time.monotonic(), args)
+
+        wrapper.refresh = refresh
+        return wrapper
+    return decorator
+
+
+def invalidate(*names):
+    """Descarta as entradas locais das regiões informadas (só neste processo)."""
+    with _lock:
+        for name in names:
+            _regions.pop(name, None)
+
+
+def regions_for(model_class):
+    return {name for name, models in _region_models.items() if model_class in models}
+
+
+# --- Versões ------------------------------------------------------------------------
+
+def _read_versions():
+    global _versions_warned
+    try:
+        # Conexão própria no primário: não interfere na transação da sessão
+        with db.engine.connect() as connection:
+            return dict(connection.execute(select(CacheVersion.region, CacheVersion.version)).all())
+    except Exception:
+        if not _versions_warned:
+            current_app.logger.warning("Tabela cache_versions indisponível; usando apenas o TTL do cache.", exc_info=True)
+            _versions_warned = True
+        return {}
+
+
+def current_versions():
+    """Versões de todas as regiões, lidas uma única vez por requisição."""
+    if not has_request_context():
+        return _read_versions()
+    if "_cache_versions" not in g:
+        g._cache_versions = _read_versions()
+    return g._cache_versions
+
+
+def current_version(name):
+    return current_versions().get(name, 0)
+
+
+def bump(session, *names):
+    """Agenda o incremento das regiões no próximo commit da sessão.
+
+    Só é preciso chamar à mão para escritas fora do ORM (SQL textual).
+    """
+    session.info.setdefault("cache_dirty", set()).update(names)
+
+
+def _bump_versions(connection, names):
+    rows = [{"region": name, "version": 1} for name in sorted(names)]
+    table = CacheVersion.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(table).values(rows)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.region], set_={"version": table.c.version + 1}))
+        return
+    for row in rows:
+        updated = connection.execute(table.update().where(table.c.region == row["region"])
+                                     .values(version=table.c.version + 1))
+        if not updated.rowcount:
+            connection.execute(table.insert().values(row))
+
+
+# --- Eventos da sessão --------------------------------------------------------------
+
+def init_app(app):
+    """Registra os eventos que incrementam as versões quando os modelos mudam."""
+    if not event.contains(db.session, "after_flush", _collect_flush):
+        event.listen(db.session, "after_flush", _collect_flush)
+        event.listen(db.session, "do_orm_execute", _collect_bulk)
+        event.listen(db.session, "before_commit", _bump_on_commit)
+        event.listen(db.session, "after_commit", _invalidate_local)
+        event.listen(db.session, "after_rollback", _discard)
+
+
+def _collect_flush(session, flush_context):
+    names = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        names |= regions_for(type(obj))
+    if names:
+        bump(session, *names)
+
+
+def _collect_bulk(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        names = regions_for(mapper.class_)
+        if names:
+            bump(orm_execute_state.session, *names)
+
+
+def _bump_on_commit(session):
+    # O flush final do commit ainda não aconteceu; sem ele as alterações
+    # pendentes não passariam por _collect_flush.
+    session.flush()
+    names = session.info.pop("cache_dirty", None)
+    if names:
+        _bump_versions(session.connection(), names)
+        session.info["cache_bumped"] = names
+
+
+def _invalidate_local(session):
+    names = session.info.pop("cache_bumped", None)
+    if names:
+        invalidate(*names)
+        if has_request_context():
+            g.pop("_cache_versions", None)
+
+
+def _discard(session):
+    session.info.pop("cache_dirty", None)
+    session.info.pop("cache_bumped", None)
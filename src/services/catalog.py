@@ -0,0 +1,476 @@
+import csv
+import io
+import json
+import math
+from sqlalchemy import select, insert, update, delete, func, not_
+from src.database import db
+from src.models.product import Category, Product, ProductAvailability, IngredientOption
+from src.services import search
+
+# Importação/exportação do catálogo e operações em lote sobre produtos.
+#
+# Formato canônico de uma linha (JSON ou CSV):
+#   id, name, category, description, price, cost, image_url, is_available,
+#   availabilities, ingredient_options
+# No CSV as listas são codificadas como "Segunda|Almoço|2.00;Todos|Jantar|0"
+# e "Queijo Extra|3.00|0;Sem Cebola|0|1" (nome|ajuste|removível).
+# Uma coluna de lista ausente deixa as regras existentes intactas; presente e
+# vazia remove todas as regras do produto. Do mesmo modo, descrição, preço,
+# custo, imagem e disponibilidade só são comparados quando a coluna existe no
+# arquivo (um CSV só com id, nome, categoria e preço não apaga descrições).
+
+CSV_FIELDS = ["id", "name", "category", "description", "price", "cost", "image_url",
+              "is_available", "availabilities", "ingredient_options"]
+PRODUCT_FIELDS = ["name", "description", "price", "cost", "image_url", "is_available", "category_id"]
+# Colunas opcionais do arquivo e o valor usado em produtos novos quando faltam
+OPTIONAL_FIELDS = {"description": None, "price": None, "cost": None, "image_url": None, "is_available": True}
+BULK_ACTIONS = ("reprice", "availability", "category")
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+# --- Leitura e normalização ----------------------------------------------------
+
+def _to_float(value, field, line, required=False):
+    if value is None or str(value).strip() == "":
+        if required:
+            raise CatalogImportError(f"Linha {line}: campo '{field}' é obrigatório.")
+        return None
+    try:
+        return float(str(value).replace(",", "."))
+    except ValueError:
+        raise CatalogImportError(f"Linha {line}: valor inválido para '{field}': {value!r}.")
+
+
+def _to_bool(value, default=True):
+    if value is None or str(value).strip() == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "sim", "s", "yes", "y")
+
+
+def _normalize_row(raw, line):
+    name = (raw.get("name") or "").strip()
+    category = (raw.get("category") or "").strip()
+    if not name:
+        raise CatalogImportError(f"Linha {line}: o nome do produto é obrigatório.")
+    if not category:
+        raise CatalogImportError(f"Linha {line}: a categoria do produto é obrigatória.")
+
+    product_id = raw.get("id")
+    try:
+        product_id = int(product_id) if product_id not in (None, "") else None
+    except ValueError:
+        raise CatalogImportError(f"Linha {line}: id inválido: {product_id!r}.")
+
+    row = {
+        "id": product_id,
+        "name": name,
+        "category": category,
+        "availabilities": None,
+        "ingredient_options": None,
+    }
+    if "description" in raw:
+        row["description"] = (raw["description"] or "").strip() or None
+    if "price" in raw:
+        row["price"] = _to_float(raw["price"], "price", line, required=True)
+    if "cost" in raw:
+        row["cost"] = _to_float(raw["cost"], "cost", line)
+    if "image_url" in raw:
+        row["image_url"] = (raw["image_url"] or "").strip() or None
+    if "is_available" in raw:
+        row["is_available"] = _to_bool(raw["is_available"])
+
+    if raw.get("availabilities") is not None:
+        row["availabilities"] = []
+        for item in raw["availabilities"]:
+            day, time_of_day = (item.get("day_of_week") or "").strip(), (item.get("time_of_day") or "").strip()
+            if not day or not time_of_day:
+                raise CatalogImportError(f"Linha {line}: disponibilidade sem dia ou horário.")
+            row["availabilities"].append({
+                "day_of_week": day,
+                "time_of_day": time_of_day,
+                "price_adjustment": _to_float(item.get("price_adjustment"), "price_adjustment", line) or 0.0,
+            })
+
+    if raw.get("ingredient_options") is not None:
+        row["ingredient_options"] = []
+        for item in raw["ingredient_options"]:
+            option_name = (item.get("name") or "").strip()
+            if not option_name:
+                raise CatalogImportError(f"Linha {line}: ingrediente opcional sem nome.")
+            row["ingredient_options"].append({
+                "name": option_name,
+                "price_adjustment": _to_float(item.get("price_adjustment"), "price_adjustment", line) or 0.0,
+                "is_removable": _to_bool(item.get("is_removable"), default=False),
+            })
+
+    return row
+
+
+def _split_list(value, keys):
+    items = []
+    for chunk in (value or "").split(";"):
+        if not chunk.strip():
+            continue
+        parts = [part.strip() for part in chunk.split("|")]
+        items.append(dict(zip(keys, parts)))
+    return items
+
+
+def parse_catalog(stream, fmt):
+    """Lê um arquivo CSV ou JSON e devolve as linhas no formato canônico."""
+    text = stream.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8-sig")
+
+    if fmt == "json":
+        try:
+            raw_rows = json.loads(text)
+        except ValueError as exc:
+            raise CatalogImportError(f"JSON inválido: {exc}")
+        if isinstance(raw_rows, dict):
+            raw_rows = raw_rows.get("products", [])
+        if not isinstance(raw_rows, list):
+            raise CatalogImportError("O JSON deve conter uma lista de produtos.")
+    elif fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        fields = reader.fieldnames or []
+        raw_rows = []
+        for raw in reader:
+            if "availabilities" in fields:
+                raw["availabilities"] = _split_list(raw.get("availabilities"), ["day_of_week", "time_of_day", "price_adjustment"])
+            if "ingredient_options" in fields:
+                raw["ingredient_options"] = _split_list(raw.get("ingredient_options"), ["name", "price_adjustment", "is_removable"])
+            raw_rows.append(raw)
+    else:
+        raise CatalogImportError(f"Formato não suportado: {fmt}.")
+
+    rows = [_normalize_row(raw, line) for line, raw in enumerate(raw_rows, start=1)]
+
+    seen = set()
+    for line, row in enumerate(rows, start=1):
+        key = row["id"] or row["name"].lower()
+        if key in seen:
+            raise CatalogImportError(f"Linha {line}: produto '{row['name']}' repetido no arquivo.")
+        seen.add(key)
+    return rows
+
+
+# --- Planejamento (dry-run) -------------------------------------------------------
+
+def plan_import(rows):
+    """Compara as linhas com o banco e devolve o plano de alterações, sem gravar nada.
+
+    O estado atual é lido em quatro consultas (categorias, produtos,
+    disponibilidades e ingredientes), independentemente do tamanho do arquivo.
+    """
+    categories = {name.lower(): (cat_id, name) for cat_id, name in db.session.execute(select(Category.id, Category.name))}
+    category_names = {cat_id: name for cat_id, name in categories.values()}
+    existing = {}
+    by_name = {}
+    for product in db.session.execute(select(Product.id, *[getattr(Product, f) for f in PRODUCT_FIELDS])).mappings():
+        existing[product["id"]] = dict(product)
+        by_name.setdefault(product["name"].lower(), product["id"])
+
+    plan = {
+        "new_categories": [],
+        "product_inserts": [],
+        "product_updates": [],
+        "availability_inserts": [],
+        "availability_updates": [],
+        "availability_deletes": [],
+        "option_inserts": [],
+        "option_updates": [],
+        "option_deletes": [],
+        "unchanged": 0,
+    }
+
+    matched = []
+    for line, row in enumerate(rows, start=1):
+        category_key = row["category"].lower()
+        if category_key not in categories:
+            categories[category_key] = (None, row["category"])
+            plan["new_categories"].append(row["category"])
+        category_id = categories[category_key][0]
+
+        values = {f: row[f] for f in PRODUCT_FIELDS if f in row}
+        product_id = row["id"] if row["id"] in existing else by_name.get(row["name"].lower())
+
+        if product_id is None:
+            if row.get("price") is None:
+                raise CatalogImportError(f"Linha {line}: o preço é obrigatório para o produto novo '{row['name']}'.")
+            values = dict(OPTIONAL_FIELDS, **values)
+            plan["product_inserts"].append(dict(values, category=row["category"],
+                                                availabilities=row["availabilities"] or [],
+                                                ingredient_options=row["ingredient_options"] or []))
+            continue
+
+        current = existing[product_id]
+        changes = {f: (current[f], v) for f, v in values.items() if current[f] != v}
+        if category_id != current["category_id"]:
+            changes["category"] = (category_names.get(current["category_id"]), row["category"])
+        if changes:
+            plan["product_updates"].append({"id": product_id, "name": row["name"], "category": row["category"], "changes": changes})
+        matched.append((product_id, row))
+
+    _plan_children(plan, matched)
+
+    touched = {item["id"] for item in plan["product_updates"]}
+    for key in ("availability_inserts", "availability_updates", "availability_deletes",
+                "option_inserts", "option_updates", "option_deletes"):
+        touched.update(item["product_id"] for item in plan[key])
+    plan["unchanged"] = len({product_id for product_id, _ in matched} - touched)
+    return plan
+
+
+def _plan_children(plan, matched):
+    availability_ids = [pid for pid, row in matched if row["availabilities"] is not None]
+    option_ids = [pid for pid, row in matched if row["ingredient_options"] is not None]
+
+    current_availabilities = {}
+    if availability_ids:
+        for a in ProductAvailability.query.filter(ProductAvailability.product_id.in_(availability_ids)):
+            current_availabilities.setdefault(a.product_id, {})[(a.day_of_week, a.time_of_day)] = a
+
+    current_options = {}
+    if option_ids:
+        for o in IngredientOption.query.filter(IngredientOption.product_id.in_(option_ids)):
+            current_options.setdefault(o.product_id, {})[o.name.lower()] = o
+
+    for product_id, row in matched:
+        if row["availabilities"] is not None:
+            current = dict(current_availabilities.get(product_id, {}))
+            for item in row["availabilities"]:
+                found = current.pop((item["day_of_week"], item["time_of_day"]), None)
+                if found is None:
+                    plan["availability_inserts"].append(dict(item, product_id=product_id))
+                elif (found.price_adjustment or 0.0) != item["price_adjustment"]:
+                    plan["availability_updates"].append({"id": found.id, "product_id": product_id,
+                                                         "price_adjustment": item["price_adjustment"]})
+            plan["availability_deletes"].extend({"id": a.id, "product_id": product_id} for a in current.values())
+
+        if row["ingredient_options"] is not None:
+            current = dict(current_options.get(product_id, {}))
+            for item in row["ingredient_options"]:
+                found = current.pop(item["name"].lower(), None)
+                if found is None:
+                    plan["option_inserts"].append(dict(item, product_id=product_id))
+                elif ((found.price_adjustment or 0.0), bool(found.is_removable), found.name) != \
+                        (item["price_adjustment"], item["is_removable"], item["name"]):
+                    plan["option_updates"].append(dict(item, id=found.id, product_id=product_id))
+            plan["option_deletes"].extend({"id": o.id, "product_id": product_id} for o in current.values())
+
+
+def plan_summary(plan):
+    """Contagens do plano, para exibição no dry-run e nas mensagens flash."""
+    new_product_availabilities = sum(len(p["availabilities"]) for p in plan["product_inserts"])
+    new_product_options = sum(len(p["ingredient_options"]) for p in plan["product_inserts"])
+    return {
+        "categories_created": len(plan["new_categories"]),
+        "products_created": len(plan["product_inserts"]),
+        "products_updated": len(plan["product_updates"]),
+        "products_unchanged": plan["unchanged"],
+        "availabilities_created": len(plan["availability_inserts"]) + new_product_availabilities,
+        "availabilities_updated": len(plan["availability_updates"]),
+        "availabilities_deleted": len(plan["availability_deletes"]),
+        "options_created": len(plan["option_inserts"]) + new_product_options,
+        "options_updated": len(plan["option_updates"]),
+        "options_deleted": len(plan["option_deletes"]),
+    }
+
+
+# --- Aplicação ---------------------------------------------------------------------
+
+def apply_import(plan):
+    """Grava o plano em lote, numa única transação, e invalida o cardápio uma vez.
+
+    Cada tipo de alteração vira um único INSERT/UPDATE/DELETE em lote
+    (executemany ou IN (...)), e não um commit por produto.
+    """
+    try:
+        category_ids = {name.lower(): cat_id for cat_id, name in db.session.execute(select(Category.id, Category.name))}
+        if plan["new_categories"]:
+            created = db.session.execute(
+                insert(Category).returning(Category.id, Category.name, sort_by_parameter_order=True),
+                [{"name": name} for name in plan["new_categories"]],
+            )
+            category_ids.update({name.lower(): cat_id for cat_id, name in created})
+
+        availability_inserts = list(plan["availability_inserts"])
+        option_inserts = list(plan["option_inserts"])
+
+        # Escritas em lote não passam pelos eventos do ORM; avisamos o índice de busca
+        reindex_ids = {item["id"] for item in plan["product_updates"]}
+        reindex_ids.update(item["product_id"] for key in ("option_inserts", "option_updates", "option_deletes")
+                           for item in plan[key])
+
+        if plan["product_inserts"]:
+            new_products = plan["product_inserts"]
+            created_ids = db.session.execute(
+                insert(Product).returning(Product.id, sort_by_parameter_order=True),
+                [dict({f: p[f] for f in PRODUCT_FIELDS if f != "category_id"},
+                      category_id=category_ids[p["category"].lower()]) for p in new_products],
+            ).scalars().all()
+            reindex_ids.update(created_ids)
+            for product_id, product in zip(created_ids, new_products):
+                availability_inserts.extend(dict(a, product_id=product_id) for a in product["availabilities"])
+                option_inserts.extend(dict(o, product_id=product_id) for o in product["ingredient_options"])
+
+        if plan["product_updates"]:
+            rows = []
+            for item in plan["product_updates"]:
+                values = {f: new for f, (_, new) in item["changes"].items() if f != "category"}
+                values["category_id"] = category_ids[item["category"].lower()]
+                values["id"] = item["id"]
+                rows.append(values)
+            _bulk_update(Product, rows)
+
+        if plan["availability_deletes"]:
+            db.session.execute(delete(ProductAvailability)
+                               .where(ProductAvailability.id.in_([a["id"] for a in plan["availability_deletes"]]))
+                               .execution_options(synchronize_session=False))
+        if plan["option_deletes"]:
+            db.session.execute(delete(IngredientOption)
+                               .where(IngredientOption.id.in_([o["id"] for o in plan["option_deletes"]]))
+                               .execution_options(synchronize_session=False))
+
+        if plan["availability_updates"]:
+            _bulk_update(ProductAvailability, [{"id": a["id"], "price_adjustment": a["price_adjustment"]}
+                                               for a in plan["availability_updates"]])
+        if plan["option_updates"]:
+            _bulk_update(IngredientOption, [{k: o[k] for k in ("id", "name", "price_adjustment", "is_removable")}
+                                            for o in plan["option_updates"]])
+
+        if availability_inserts:
+            db.session.execute(insert(ProductAvailability), availability_inserts)
+        if option_inserts:
+            db.session.execute(insert(IngredientOption), option_inserts)
+
+        search.mark_dirty(db.session, reindex_ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return plan_summary(plan)
+
+
+def _bulk_update(model, rows):
+    # O UPDATE em lote por chave primária do ORM agrupa linhas com as mesmas
+    # colunas num único executemany.
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for group in groups.values():
+        db.session.execute(update(model), group)
+
+
+# --- Exportação --------------------------------------------------------------------
+
+def export_catalog():
+    """Catálogo completo no formato canônico (quatro consultas no total)."""
+    categories = dict(db.session.execute(select(Category.id, Category.name)).all())
+
+    availabilities = {}
+    for a in ProductAvailability.query.order_by(ProductAvailability.id):
+        availabilities.setdefault(a.product_id, []).append({
+            "day_of_week": a.day_of_week,
+            "time_of_day": a.time_of_day,
+            "price_adjustment": a.price_adjustment or 0.0,
+        })
+    options = {}
+    for o in IngredientOption.query.order_by(IngredientOption.id):
+        options.setdefault(o.product_id, []).append({
+            "name": o.name,
+            "price_adjustment": o.price_adjustment or 0.0,
+            "is_removable": bool(o.is_removable),
+        })
+
+    rows = []
+    for product in Product.query.order_by(Product.id):
+        rows.append({
+            "id": product.id,
+            "name": product.name,
+            "category": categories.get(product.category_id),
+            "description": product.description,
+            "price": product.price,
+            "cost": product.cost,
+            "image_url": product.image_url,
+            "is_available": bool(product.is_available),
+            "availabilities": availabilities.get(product.id, []),
+            "ingredient_options": options.get(product.id, []),
+        })
+    return rows
+
+
+def catalog_to_csv(rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        row = dict(row)
+        row["is_available"] = int(row["is_available"])
+        row["availabilities"] = ";".join(
+            f"{a['day_of_week']}|{a['time_of_day']}|{a['price_adjustment']:.2f}" for a in row["availabilities"])
+        row["ingredient_options"] = ";".join(
+            f"{o['name']}|{o['price_adjustment']:.2f}|{int(o['is_removable'])}" for o in row["ingredient_options"])
+        writer.writerow(row)
+    return out.getvalue()
+
+
+# --- Operações em lote na lista de produtos ------------------------------------------
+
+def bulk_update_products(product_ids, action, value):
+    """Aplica uma alteração a vários produtos com um único UPDATE.
+
+    - reprice: `value` é o percentual (ex.: 10 ou -5);
+    - availability: `value` é "on", "off" ou "toggle";
+    - category: `value` é o id da categoria de destino.
+
+    Retorna o número de produtos alterados.
+    """
+    if not product_ids:
+        return 0
+    if action not in BULK_ACTIONS:
+        raise ValueError(f"Ação em lote desconhecida: {action}")
+
+    if action == "reprice":
+        try:
+            percent = float(str(value).strip().replace(",", "."))
+        except (TypeError, ValueError):
+            percent = None
+        if value is None or percent is None or not math.isfinite(percent):
+            raise ValueError("Informe o percentual de reajuste como número (ex.: 10 ou -5).")
+        factor = 1 + percent / 100
+        if factor <= 0:
+            raise ValueError("O reajuste não pode zerar ou negativar os preços.")
+        values = {"price": func.round(Product.price * factor, 2)}
+    elif action == "availability":
+        if value == "toggle":
+            values = {"is_available": not_(Product.is_available)}
+        elif value in ("on", "off"):
+            values = {"is_available": value == "on"}
+        else:
+            raise ValueError(f"Valor de disponibilidade inválido: {value}")
+    else:
+        try:
+            category_id = int(value)
+        except (TypeError, ValueError):
+            raise ValueError("Escolha a categoria de destino.")
+        category = db.session.get(Category, category_id)
+        if category is None:
+            raise ValueError("Categoria de destino não encontrada.")
+        values = {"category_id": category.id}
+
+    result = db.session.execute(
+        update(Product)
+        .where(Product.id.in_(product_ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,307 @@
+import base64
+import json
+import re
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, bindparam, case, event, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.database import db
+from src.models.customer_stats import CustomerStats
+from src.models.order import Order
+from src.models.user import User, digits_only, normalize_phone
+from src.services import order_events
+
+# Resumo por cliente para a lista do admin (tabela customer_stats).
+#
+#   order_count / lifetime_value: pedidos não cancelados e a soma dos totais;
+#   avg_ticket: lifetime_value / order_count (0 sem pedidos);
+#   last_order_at: data do pedido mais recente, cancelado ou não.
+#
+# A linha nasce zerada junto com o usuário e é ajustada pelas transições de
+# order_events, na mesma transação: pedido novo soma, cancelamento subtrai e
+# um pedido reaberto soma de novo. O ajuste é um único upsert com as
+# diferenças ("order_count + n"), então checkouts simultâneos do mesmo cliente
+# não perdem contagem.
+#
+# A lista (admin.clients) pagina por chave: cada página continua a partir do
+# (valor, id) do último cliente da anterior, pelos índices de customer_stats,
+# sem OFFSET e sem contar a tabela. A busca usa prefixo de nome e email
+# (índices em lower(username) e lower(email)) ou, se só tiver números, de
+# telefone e CPF.
+#
+# Telefone e CPF são gravados como digitados ("(11) 9 8765-4321", "+55 11...");
+# as colunas users.phone_digits e users.cpf_digits guardam só os dígitos,
+# com índice, para o caixa achar o cliente pelo que ele disser ao telefone
+# (`lookup`, rota admin.customer_lookup).
+#
+#   flask customers rebuild           # recalcula a tabela a partir dos pedidos
+#   flask customers backfill-digits   # preenche phone_digits/cpf_digits em lotes
+
+customers_cli = AppGroup("customers", help="Resumo dos clientes.")
+
+PAGE_SIZE = 50
+LOOKUP_LIMIT = 10
+LOOKUP_MIN_DIGITS = 4
+BACKFILL_CHUNK = 1000
+
+# Busca só com números e máscara ("(11) 98765", "123.456") vai para telefone/CPF
+_NUMBER = re.compile(r"[\d\s().+/-]*\d[\d\s().+/-]*")
+
+# ordenação → (coluna, decrescente)
+SORTS = {
+    "recentes": (CustomerStats.last_order_at, True),
+    "pedidos": (CustomerStats.order_count, True),
+    "valor": (CustomerStats.lifetime_value, True),
+    "ticket": (CustomerStats.avg_ticket, True),
+    "nome": (func.lower(User.username), False),
+}
+DEFAULT_SORT = "recentes"
+
+
+def init_app(app):
+    if not event.contains(User, "after_insert", _create_stats):
+        event.listen(User, "after_insert", _create_stats)
+    order_events.subscribe(_on_transitions)
+
+
+def _create_stats(mapper, connection, target):
+    connection.execute(insert(CustomerStats).values(
+        user_id=target.id, order_count=0, lifetime_value=0, avg_ticket=0))
+
+
+# --- Manutenção incremental ---------------------------------------------------------------
+
+def _deltas(connection, transitions):
+    """{user_id: [pedidos, valor, último pedido]} a somar em customer_stats."""
+    signs = {}
+    for order_id, from_status, to_status in transitions:
+        if from_status is None:
+            sign = 0 if to_status == "cancelado" else 1
+            signs[order_id] = (signs.get(order_id, (0, True))[0] + sign, True)
+        elif (to_status == "cancelado") != (from_status == "cancelado"):
+            previous, created = signs.get(order_id, (0, False))
+            signs[order_id] = (previous + (-1 if to_status == "cancelado" else 1), created)
+    if not signs:
+        return {}
+    deltas = {}
+    rows = connection.execute(
+        select(Order.id, Order.user_id, Order.total_amount, Order.created_at).where(Order.id.in_(list(signs)))
+    )
+    for order_id, user_id, total, created_at in rows:
+        sign, created = signs[order_id]
+        delta = deltas.setdefault(user_id, [0, 0.0, None])
+        delta[0] += sign
+        delta[1] += sign * total
+        if created and (delta[2] is None or created_at > delta[2]):
+            delta[2] = created_at
+    return deltas
+
+
+def _apply(connection, deltas):
+    if not deltas:
+        return
+    table = CustomerStats.__table__
+    rows = [{"user_id": user_id, "order_count": count, "lifetime_value": value,
+             "avg_ticket": value / count if count > 0 else 0, "last_order_at": last}
+            for user_id, (count, value, last) in deltas.items()]
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+        count = table.c.order_count + upsert.excluded.order_count
+        value = table.c.lifetime_value + upsert.excluded.lifetime_value
+        connection.execute(upsert.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={"order_count": count,
+                  "lifetime_value": value,
+                  "avg_ticket": case((count > 0, value / count), else_=0),
+                  "last_order_at": case(
+                      (upsert.excluded.last_order_at.is_(None), table.c.last_order_at),
+                      (table.c.last_order_at.is_(None), upsert.excluded.last_order_at),
+                      (upsert.excluded.last_order_at > table.c.last_order_at, upsert.excluded.last_order_at),
+                      else_=table.c.last_order_at)}), rows)
+        return
+    for row in rows:
+        count = table.c.order_count + row["order_count"]
+        value = table.c.lifetime_value + row["lifetime_value"]
+        values = {"order_count": count, "lifetime_value": value,
+                  "avg_ticket": case((count > 0, value / count), else_=0)}
+        if row["last_order_at"] is not None:
+            values["last_order_at"] = func.coalesce(
+                case((table.c.last_order_at > row["last_order_at"], table.c.last_order_at)), row["last_order_at"])
+        if not connection.execute(table.update().where(table.c.user_id == row["user_id"]).values(values)).rowcount:
+            connection.execute(table.insert().values(row))
+
+
+def _on_transitions(connection, transitions, at):
+    """Assinante de order_events: pedidos criados, cancelados e reabertos."""
+    _apply(connection, _deltas(connection, transitions))
+
+
+def rebuild():
+    """Recalcula customer_stats inteira a partir dos pedidos; devolve quantos clientes."""
+    placed = (
+        select(Order.user_id,
+               func.sum(case((Order.status != "cancelado", 1), else_=0)).label("order_count"),
+               func.sum(case((Order.status != "cancelado", Order.total_amount), else_=0)).label("lifetime_value"),
+               func.max(Order.created_at).label("last_order_at"))
+        .group_by(Order.user_id)
+        .subquery()
+    )
+    count = func.coalesce(placed.c.order_count, 0)
+    value = func.coalesce(placed.c.lifetime_value, 0)
+    db.session.execute(CustomerStats.__table__.delete())
+    db.session.execute(insert(CustomerStats).from_select(
+        ["user_id", "order_count", "lifetime_value", "avg_ticket", "last_order_at"],
+        select(User.id, count, value, case((count > 0, value / count), else_=0), placed.c.last_order_at)
+        .outerjoin(placed, placed.c.user_id == User.id)))
+    db.session.commit()
+    return db.session.execute(select(func.count()).select_from(CustomerStats)).scalar()
+
+
+# --- Lista do admin -----------------------------------------------------------------------
+
+def _encode(value, user_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, user_id]).encode()).decode()
+
+
+def _decode(cursor, sort):
+    try:
+        value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if value is not None and sort == "recentes":
+            value = datetime.fromisoformat(value)
+        return value, int(user_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _next_prefix(prefix):
+    """Menor texto maior que todos os que começam com `prefix` (fim do intervalo da busca)."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _prefix(column, prefix):
+    return and_(column >= prefix, column < _next_prefix(prefix))
+
+
+def _search(q):
+    q = q.strip().lower()
+    if _NUMBER.fullmatch(q):
+        conditions = [_prefix(User.cpf_digits, digits_only(q))]
+        if normalize_phone(q):
+            conditions.append(_prefix(User.phone_digits, normalize_phone(q)))
+        return or_(*conditions)
+    return or_(_prefix(func.lower(User.username), q), _prefix(func.lower(User.email), q))
+
+
+def _after(column, descending, key, value, user_id):
+    """Condição "vem depois de (value, user_id)" na ordem da lista.
+
+    Nas ordenações decrescentes os nulos (clientes sem pedido) ficam no fim.
+    """
+    if not descending:
+        return or_(column > value, and_(column == value, key > user_id))
+    if value is None:
+        return and_(column.is_(None), key < user_id)
+    after = or_(column < value, and_(column == value, key < user_id))
+    return or_(after, column.is_(None)) if column.nullable else after
+
+
+def page(sort=DEFAULT_SORT, after=None, q=None, limit=PAGE_SIZE):
+    """(linhas, cursor da próxima página ou None); cada linha é (User, CustomerStats)."""
+    if sort not in SORTS:
+        sort = DEFAULT_SORT
+    column, descending = SORTS[sort]
+    # Desempate pela coluna que está no mesmo índice da ordenação
+    key = User.id if sort == "nome" else CustomerStats.user_id
+    query = (select(User, CustomerStats)
+             .join(CustomerStats, CustomerStats.user_id == User.id)
+             .where(User.is_admin.is_(False)))
+    if q and q.strip():
+        query = query.where(_search(q))
+    position = _decode(after, sort) if after else None
+    if position is not None:
+        query = query.where(_after(column, descending, key, *position))
+    if descending and column.nullable:
+        query = query.order_by(column.desc().nulls_last(), key.desc())
+    elif descending:
+        query = query.order_by(column.desc(), key.desc())
+    else:
+        query = query.order_by(column, key)
+
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last_user, last_stats = rows[-1]
+    value = last_user.username.lower() if sort == "nome" else getattr(last_stats, column.key)
+    return rows, _encode(value, last_user.id)
+
+
+def lookup(q, limit=LOOKUP_LIMIT):
+    """Clientes com telefone ou CPF começando pelos dígitos de `q`; os exatos vêm primeiro."""
+    number, phone = digits_only(q), normalize_phone(q)
+    if len(number) < LOOKUP_MIN_DIGITS:
+        return []
+    # CPF completo: só igualdade (um CPF nunca é prefixo de outro)
+    conditions = [User.cpf_digits == number if len(number) == 11 else _prefix(User.cpf_digits, number)]
+    exact = [User.cpf_digits == number]
+    if phone:
+        conditions.append(_prefix(User.phone_digits, phone))
+        exact.append(User.phone_digits == phone)
+    # Ordena no banco antes do LIMIT: muitos prefixos não podem esconder o cliente exato
+    rows = db.session.execute(
+        select(User, CustomerStats)
+        .join(CustomerStats, CustomerStats.user_id == User.id)
+        .where(or_(*conditions), User.is_admin.is_(False))
+        .order_by(case((or_(*exact), 0), else_=1), CustomerStats.last_order_at.desc().nulls_last(), User.id)
+        .limit(limit)
+    ).all()
+    return [{
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "phone": user.phone,
+        "cpf": user.cpf,
+        "exact": user.phone_digits == phone or user.cpf_digits == number,
+        "order_count": stats.order_count,
+        "last_order_at": stats.last_order_at.isoformat() if stats.last_order_at else None,
+    } for user, stats in rows]
+
+
+def backfill_digits(chunk=BACKFILL_CHUNK):
+    """Preenche phone_digits e cpf_digits de quem ainda não tem, em lotes de `chunk` por id.
+
+    Cada lote é uma transação curta, sem travar a tabela toda. Devolve quantos usuários atualizou.
+    """
+    table = User.__table__
+    pending = or_(table.c.cpf_digits.is_(None), and_(table.c.phone.isnot(None), table.c.phone_digits.is_(None)))
+    update = (table.update().where(table.c.id == bindparam("b_id"))
+              .values(phone_digits=bindparam("b_phone"), cpf_digits=bindparam("b_cpf")))
+    last_id, total = 0, 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.phone, table.c.cpf)
+            .where(table.c.id > last_id, pending).order_by(table.c.id).limit(chunk)
+        ).all()
+        if not rows:
+            return total
+        db.session.execute(update, [{"b_id": user_id, "b_phone": normalize_phone(phone) or None,
+                                     "b_cpf": digits_only(cpf) or None} for user_id, phone, cpf in rows])
+        db.session.commit()
+        last_id, total = rows[-1].id, total + len(rows)
+
+
+@customers_cli.command("rebuild")
+def rebuild_command():
+    """Recalcula customer_stats a partir dos pedidos."""
+    print(f"✅ Resumo de {rebuild()} cliente(s) recalculado.")
+
+
+@customers_cli.command("backfill-digits")
+@click.option("--chunk", default=BACKFILL_CHUNK, show_default=True, help="Usuários por transação.")
+def backfill_digits_command(chunk):
+    """Preenche os dígitos de telefone e CPF usados na busca do caixa."""
+    print(f"✅ {backfill_digits(chunk)} usuário(s) atualizado(s).")
@@ -0,0 +1,330 @@
+import math
+import statistics
+from datetime import datetime, timedelta, timezone
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from src.database import db
+from src.models.eta_stat import EtaStat
+from src.models.order import Order, OrderEvent, OrderItem
+from src.models.product import Product
+from src.services import order_events
+from src.services.menu import current_period
+
+# Previsão do tempo de cada pedido (Order.estimated_time, em minutos desde a
+# criação), no lugar dos 30 minutos fixos.
+#
+# A tabela eta_stats guarda médias móveis da duração das etapas, por período
+# (almoço/jantar):
+#   preparo: em_preparo → pronto, por categoria dos itens (0 = todas);
+#   entrega: saiu_para_entrega → entregue.
+# Elas são atualizadas a cada transição gravada em order_events, com um único
+# UPSERT, sem reler o histórico.
+#
+# No checkout, a previsão é
+#   fila à frente × preparo médio / ETA_KITCHEN_PARALLEL + preparo da categoria
+#   mais lenta do pedido + entrega (se for entrega),
+# o que custa duas consultas pequenas (estatísticas e tamanho da fila, pelo
+# índice parcial dos pedidos em aberto). A cada mudança de status o restante
+# é recalculado a partir da etapa atual.
+#
+#   flask eta backtest --days 30    # compara previsões e tempos reais do histórico
+#   flask eta rebuild --days 90     # recalcula eta_stats a partir de order_events
+
+eta_cli = AppGroup("eta", help="Previsão do tempo dos pedidos.")
+
+OPEN_STATUSES = ("recebido", "em_preparo")
+DEFAULT_MINUTES = {"preparo": 20, "entrega": 10}  # somam os 30 minutos antigos
+# Até WINDOW amostras a média é exata; depois, cada amostra nova pesa 1/WINDOW
+# (média móvel exponencial, que acompanha mudanças de cardápio e de equipe)
+WINDOW = 20
+MIN_SAMPLES = 5
+# Durações acima disso são status esquecidos no painel, não tempo de cozinha
+MAX_SAMPLE_MINUTES = 180
+ALL_CATEGORIES = 0
+
+
+def _utc(value):
+    """Datetime sem fuso em UTC (SQLite devolve sem fuso; record() usa com fuso)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def period_of(at):
+    """Período do cardápio (Almoço/Jantar) do instante UTC `at`, no horário do servidor."""
+    local = _utc(at).replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return current_period(local)[1]
+
+
+def _weight(samples):
+    return 1 / (samples + 1) if samples + 1 < WINDOW else 1 / WINDOW
+
+
+def target_status(delivery_type):
+    """Status em que a previsão se cumpre: retirada termina em pronto, entrega em entregue."""
+    return "entregue" if delivery_type == "entrega" else "pronto"
+
+
+def observations(from_status, to_status, at, stage_started, categories):
+    """Amostras (etapa, categoria, período, minutos) produzidas por uma transição.
+
+    `stage_started`: {status: instante em que o pedido entrou nele}.
+    """
+    if to_status == "pronto" and "em_preparo" in stage_started:
+        stage, started, keys = "preparo", stage_started["em_preparo"], set(categories) | {ALL_CATEGORIES}
+    elif to_status == "entregue" and from_status == "saiu_para_entrega" and "saiu_para_entrega" in stage_started:
+        stage, started, keys = "entrega", stage_started["saiu_para_entrega"], {ALL_CATEGORIES}
+    else:
+        return []
+    minutes = (_utc(at) - _utc(started)).total_seconds() / 60
+    if not 0 < minutes <= MAX_SAMPLE_MINUTES:
+        return []
+    period = period_of(started)
+    return [(stage, category_id, period, minutes) for category_id in sorted(keys)]
+
+
+class EtaModel:
+    """Médias por (etapa, categoria, período) e o cálculo da previsão."""
+
+    def __init__(self, rows=(), parallel=3):
+        self.stats = {(stage, category_id, period): (samples, mean)
+                      for stage, category_id, period, samples, mean in rows}
+        self.parallel = max(parallel, 1)
+
+    def observe(self, stage, category_id, period, minutes):
+        samples, mean = self.stats.get((stage, category_id, period), (0, 0.0))
+        self.stats[(stage, category_id, period)] = (samples + 1, mean + (minutes - mean) * _weight(samples))
+
+    def mean(self, stage, category_id, period):
+        """Média da categoria; com poucas amostras, a de todas as categorias; sem dados, o padrão."""
+        for key in ((stage, category_id, period), (stage, ALL_CATEGORIES, period)):
+            samples, mean = self.stats.get(key, (0, 0.0))
+            if samples >= MIN_SAMPLES:
+                return mean
+        return DEFAULT_MINUTES[stage]
+
+    def remaining(self, status, categories, period, delivery_type, queue_ahead=0):
+        """Minutos que faltam a partir da entrada no status `status`."""
+        minutes = 0
+        if status == "recebido":
+            minutes += queue_ahead * self.mean("preparo", ALL_CATEGORIES, period) / self.parallel
+        if status in ("recebido", "em_preparo"):
+            minutes += max([self.mean("preparo", c, period) for c in categories] or
+                           [self.mean("preparo", ALL_CATEGORIES, period)])
+        if delivery_type == "entrega" and status in ("recebido", "em_preparo", "pronto", "saiu_para_entrega"):
+            minutes += self.mean("entrega", ALL_CATEGORIES, period)
+        return minutes
+
+
+# --- Banco ----------------------------------------------------------------------------
+
+def load_model(connection=None, periods=None):
+    """EtaModel com as estatísticas gravadas (a tabela tem poucas dezenas de linhas)."""
+    query = select(EtaStat.stage, EtaStat.category_id, EtaStat.period, EtaStat.samples, EtaStat.mean_minutes)
+    if periods:
+        query = query.where(EtaStat.period.in_(periods))
+    rows = (connection or db.session).execute(query).all()
+    return EtaModel(rows, current_app.config.get("ETA_KITCHEN_PARALLEL", 3))
+
+
+def queue_depth(connection=None):
+    """Pedidos em aberto na cozinha (usa o índice parcial ix_orders_open_status)."""
+    return (connection or db.session).execute(
+        select(func.count()).select_from(Order).where(Order.status.in_(OPEN_STATUSES))
+    ).scalar()
+
+
+def estimate_new_order(category_ids, delivery_type, now=None):
+    """Minutos previstos para um pedido que está sendo criado agora."""
+    period = period_of(now or datetime.now(timezone.utc))
+    model = load_model(periods=[period])
+    minutes = model.remaining("recebido", category_ids, period, delivery_type, queue_depth())
+    return max(math.ceil(minutes), 1)
+
+
+def _save_observations(connection, samples):
+    if not samples:
+        return
+    table = EtaStat.__table__
+    rows = [{"stage": stage, "category_id": category_id, "period": period, "samples": 1, "mean_minutes": minutes,
+             "updated_at": datetime.now(timezone.utc)}
+            for stage, category_id, period, minutes in samples]
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(table)
+        weight = case((table.c.samples + 1 < WINDOW, 1.0 / (table.c.samples + 1)), else_=1.0 / WINDOW)
+        # A atualização acontece no banco: transições simultâneas não perdem amostras
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.stage, table.c.category_id, table.c.period],
+            set_={"samples": table.c.samples + 1,
+                  "mean_minutes": table.c.mean_minutes + (statement.excluded.mean_minutes - table.c.mean_minutes) * weight,
+                  "updated_at": statement.excluded.updated_at}), rows)
+        return
+    model = EtaModel(connection.execute(
+        select(table.c.stage, table.c.category_id, table.c.period, table.c.samples, table.c.mean_minutes)).all())
+    for stage, category_id, period, minutes in samples:
+        model.observe(stage, category_id, period, minutes)
+        samples_count, mean = model.stats[(stage, category_id, period)]
+        values = {"samples": samples_count, "mean_minutes": mean, "updated_at": datetime.now(timezone.utc)}
+        key = (table.c.stage == stage, table.c.category_id == category_id, table.c.period == period)
+        if not connection.execute(table.update().where(*key).values(values)).rowcount:
+            connection.execute(table.insert().values(stage=stage, category_id=category_id, period=period, **values))
+
+
+def _on_transitions(connection, transitions, at):
+    """Assinante de order_events: aprende as durações e atualiza a previsão dos pedidos."""
+    # A criação é tratada no checkout, que já grava estimated_time no INSERT
+    transitions = [t for t in transitions if t[1] is not None and t[1] != t[2]]
+    if not transitions:
+        return
+    order_ids = sorted({order_id for order_id, _, _ in transitions})
+
+    orders = {}
+    rows = connection.execute(
+        select(Order.id, Order.created_at, Order.delivery_type, Product.category_id)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(Order.id.in_(order_ids))
+    )
+    for order_id, created_at, delivery_type, category_id in rows:
+        order = orders.setdefault(order_id, {"created_at": created_at, "delivery_type": delivery_type,
+                                             "categories": set()})
+        if category_id is not None:
+            order["categories"].add(category_id)
+
+    started = {}
+    finishing = [order_id for order_id, _, to_status in transitions if to_status in ("pronto", "entregue")]
+    if finishing:
+        rows = connection.execute(
+            select(OrderEvent.order_id, OrderEvent.to_status, OrderEvent.created_at)
+            .where(OrderEvent.order_id.in_(finishing), OrderEvent.to_status.in_(("em_preparo", "saiu_para_entrega")))
+            .order_by(OrderEvent.id)
+        )
+        for order_id, to_status, created_at in rows:
+            started.setdefault(order_id, {})[to_status] = created_at
+
+    samples = []
+    for order_id, from_status, to_status in transitions:
+        if order_id in orders:
+            samples.extend(observations(from_status, to_status, at, started.get(order_id, {}),
+                                        orders[order_id]["categories"]))
+    _save_observations(connection, samples)
+
+    period = period_of(at)
+    model = load_model(connection, periods=[period])
+    estimates = []
+    for order_id, _, to_status in transitions:
+        order = orders.get(order_id)
+        if order is None or to_status not in ("em_preparo", "pronto", "saiu_para_entrega"):
+            continue  # recebido não volta; entregue/cancelado mantêm a última previsão
+        elapsed = (_utc(at) - _utc(order["created_at"])).total_seconds() / 60
+        remaining = model.remaining(to_status, order["categories"], period, order["delivery_type"])
+        estimates.append({"b_id": order_id, "b_minutes": max(math.ceil(elapsed + remaining), 1)})
+    if estimates:
+        connection.execute(
+            update(Order.__table__).where(Order.__table__.c.id == bindparam("b_id"))
+            .values(estimated_time=bindparam("b_minutes")), estimates)
+
+
+# --- Reprodução do histórico ------------------------------------------------------------
+
+def _history(start):
+    """(eventos em ordem, {order_id: (criação, delivery_type, categorias)}) a partir de `start`."""
+    events = db.session.execute(
+        select(OrderEvent.order_id, OrderEvent.from_status, OrderEvent.to_status, OrderEvent.created_at)
+        .where(OrderEvent.created_at >= start).order_by(OrderEvent.id)
+    ).all()
+    orders = {}
+    rows = db.session.execute(
+        select(Order.id, Order.created_at, Order.delivery_type, Product.category_id)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(Order.created_at >= start - timedelta(days=1))
+    )
+    for order_id, created_at, delivery_type, category_id in rows:
+        orders.setdefault(order_id, (_utc(created_at), delivery_type, set()))[2].add(category_id)
+    return events, orders
+
+
+def replay(events, orders, model, score_from=None):
+    """Reproduz os eventos em ordem, aprendendo em `model` como o sistema ao vivo.
+
+    Devolve (previsto, real) em minutos de cada pedido criado a partir de
+    `score_from` que chegou ao status final (pronto na retirada, entregue na entrega).
+    """
+    open_orders, started, placed, results = set(), {}, {}, []
+    for order_id, from_status, to_status, at in events:
+        if order_id not in orders:
+            continue
+        created_at, delivery_type, categories = orders[order_id]
+        if from_status is None:
+            if score_from is None or created_at >= score_from:
+                period = period_of(created_at)
+                placed[order_id] = model.remaining("recebido", categories, period, delivery_type, len(open_orders))
+        else:
+            for sample in observations(from_status, to_status, at, started.get(order_id, {}), categories):
+                model.observe(*sample)
+            if to_status == target_status(delivery_type) and order_id in placed:
+                results.append((placed.pop(order_id), (_utc(at) - created_at).total_seconds() / 60))
+        started.setdefault(order_id, {})[to_status] = at
+        if to_status in OPEN_STATUSES:
+            open_orders.add(order_id)
+        else:
+            open_orders.discard(order_id)
+    return results
+
+
+def score(results, estimate_of=lambda estimate, actual: estimate):
+    errors = sorted(abs(estimate_of(estimate, actual) - actual) for estimate, actual in results)
+    return {
+        "orders": len(errors),
+        "mae": statistics.fmean(errors),
+        "median": statistics.median(errors),
+        "p90": errors[min(int(len(errors) * 0.9), len(errors) - 1)],
+        "within_10": sum(error <= 10 for error in errors) / len(errors),
+    }
+
+
+def init_app(app):
+    order_events.subscribe(_on_transitions)
+    app.cli.add_command(eta_cli)
+
+
+@eta_cli.command("backtest")
+@click.option("--days", default=30, show_default=True, help="Dias de pedidos avaliados.")
+@click.option("--warmup", default=30, show_default=True, help="Dias anteriores usados só para aprender.")
+def backtest_command(days, warmup):
+    """Compara as previsões que o modelo teria feito com os tempos reais."""
+    now = datetime.utcnow()
+    score_from = now - timedelta(days=days)
+    events, orders = _history(score_from - timedelta(days=warmup))
+    results = replay(events, orders, EtaModel(parallel=current_app.config.get("ETA_KITCHEN_PARALLEL", 3)),
+                     score_from)
+    if not results:
+        print("⚠️ Nenhum pedido concluído com transições registradas no período.")
+        return
+    print(f"{'Modelo':<16} {'Pedidos':>8} {'Erro médio':>11} {'Mediana':>8} {'P90':>7} {'≤10 min':>8}")
+    for label, estimate_of in (("Previsão", lambda estimate, actual: estimate),
+                               ("Fixo 30 min", lambda estimate, actual: 30)):
+        s = score(results, estimate_of)
+        print(f"{label:<16} {s['orders']:>8} {s['mae']:>10.1f}m {s['median']:>7.1f}m {s['p90']:>6.1f}m "
+              f"{s['within_10']:>7.0%}")
+
+
+@eta_cli.command("rebuild")
+@click.option("--days", default=90, show_default=True)
+def rebuild_command(days):
+    """Recalcula eta_stats reproduzindo os eventos dos últimos N dias."""
+    events, orders = _history(datetime.utcnow() - timedelta(days=days))
+    model = EtaModel()
+    replay(events, orders, model)
+    db.session.execute(EtaStat.__table__.delete())
+    db.session.add_all([EtaStat(stage=stage, category_id=category_id, period=period, samples=samples,
+                                mean_minutes=mean)
+                        for (stage, category_id, period), (samples, mean) in model.stats.items()])
+    db.session.commit()
+    print(f"✅ {len(model.stats)} estatística(s) recalculada(s) a partir de {len(events)} evento(s).")
@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import date
+from sqlalchemy import and_, func, or_, select
+from src.database import db
+from src.models.expense import Expense
+from src.services import cache
+from src.services.reports import EXPENSE_TYPES
+
+# Livro de despesas do admin.
+#
+# A lista pagina por chave: cada página continua a partir do (data, id) da
+# última despesa da anterior, pelo índice (location_id, date, expense_type),
+# sem OFFSET e sem carregar a tabela inteira.
+#
+# O resumo mês × tipo sai de uma única consulta agrupada no banco, com um mês a
+# mais no início para a variação do primeiro mês mostrado. Fica no cache (região
+# "expenses") até a próxima despesa criada, editada ou apagada.
+
+PAGE_SIZE = 50
+SUMMARY_MONTHS = 12
+# Despesas mudam pouco; o TTL só cobre escritas feitas fora do ORM
+SUMMARY_TTL = 24 * 3600
+
+
+def _encode(expense):
+    return base64.urlsafe_b64encode(json.dumps([expense.date.isoformat(), expense.id]).encode()).decode()
+
+
+def _decode(cursor):
+    try:
+        day, expense_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(day), int(expense_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def page(after=None, expense_type=None, limit=PAGE_SIZE):
+    """(despesas, cursor da próxima página ou None), da mais recente para a mais antiga."""
+    query = select(Expense)
+    if expense_type:
+        query = query.where(Expense.expense_type == expense_type)
+    position = _decode(after) if after else None
+    if position is not None:
+        day, expense_id = position
+        query = query.where(or_(Expense.date < day, and_(Expense.date == day, Expense.id < expense_id)))
+    rows = db.session.execute(query.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit + 1)).scalars().all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _encode(rows[-1])
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month(column):
+    if db.session.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def _delta(total, previous):
+    return {
+        "total": round(total, 2),
+        "previous": round(previous, 2),
+        "delta": round(total - previous, 2),
+        "delta_pct": round((total - previous) / previous * 100, 1) if previous else None,
+    }
+
+
+@cache.region("expenses", ttl=SUMMARY_TTL, models=(Expense,))
+def monthly_summary(first_month, last_month):
+    """Totais por mês e tipo de `first_month` a `last_month` (inclusive), com a variação sobre o mês anterior."""
+    month = _month(Expense.date)
+    rows = db.session.execute(
+        select(month, Expense.expense_type, func.sum(Expense.amount))
+        .where(Expense.date >= add_months(first_month, -1), Expense.date < add_months(last_month, 1))
+        .group_by(month, Expense.expense_type)
+    ).all()
+    totals = {(row_month, expense_type): amount for row_month, expense_type, amount in rows}
+    types = sorted({expense_type for _, expense_type in totals}, key=lambda t: (t not in EXPENSE_TYPES, t))
+
+    months, by_type, by_month = [], [], []
+    current = first_month
+    while current <= last_month:
+        key, previous_key = f"{current:%Y-%m}", f"{add_months(current, -1):%Y-%m}"
+        months.append(key)
+        for expense_type in types:
+            total = totals.get((key, expense_type), 0)
+            previous = totals.get((previous_key, expense_type), 0)
+            if total or previous:
+                by_type.append({"month": key, "expense_type": expense_type,
+                                "label": EXPENSE_TYPES.get(expense_type, "Outros"), **_delta(total, previous)})
+        by_month.append({"month": key, **_delta(
+            sum(totals.get((key, t), 0) for t in types), sum(totals.get((previous_key, t), 0) for t in types))})
+        current = add_months(current, 1)
+
+    return {
+        "months": months,
+        "types": [{"key": t, "label": EXPENSE_TYPES.get(t, "Outros")} for t in types],
+        "rows": by_type,
+        "totals": by_month,
+    }
+
+
+def recent_summary(today=None, months=SUMMARY_MONTHS):
+    """Resumo dos últimos `months` meses, terminando no mês atual."""
+    last_month = month_start(today or date.today())
+    return monthly_summary(add_months(last_month, 1 - months), last_month)
+
+
+@cache.region("expenses", ttl=SUMMARY_TTL, models=(Expense,))
+def total_since(day):
+    """Soma das despesas a partir de `day` (inclusive)."""
+    return db.session.execute(
+        select(func.coalesce(func.sum(Expense.amount), 0)).where(Expense.date >= day)
+    ).scalar()
@@ -0,0 +1,156 @@
+import time
+from datetime import datetime, timedelta
+import click
+import pytz
+from flask.cli import AppGroup
+from sqlalchemy import delete, insert, select
+from src.database import db
+from src.models.demand_forecast import DemandForecast
+from src.models.product import Product
+from src.services import history
+from src.services.menu import DINNER_STARTS_AT_HOUR, WEEKDAYS
+
+# Previsão de demanda por produto, dia e período, para planejar o preparo.
+#
+# Lê o histórico de itens vendidos de uma vez (arquivo colunar + tabelas
+# ativas, via history.sold_items) e monta, com NumPy, uma matriz
+#   produto × semana × dia da semana × período
+# somando as quantidades com um único bincount. Para cada célula
+# (produto, dia da semana, período):
+#   baseline: média das semanas desde a primeira venda do produto;
+#   quantity: suavização exponencial das semanas (--alpha, padrão 0.3),
+#             partindo da baseline, calculada como um produto escalar com os
+#             pesos (1 - alfa)^k, sem laço em Python.
+# Os próximos dias recebem o valor do seu dia da semana e período e vão para a
+# tabela demand_forecast, mostrada no dashboard.
+#
+#   flask forecast run --days 7 --weeks 104
+#
+# O agendador (src/services/scheduler.py) roda a previsão na virada do dia.
+# NumPy é importado sob demanda, como o pyarrow em history.py.
+
+forecast_cli = AppGroup("forecast", help="Previsão de demanda para o preparo.")
+
+PERIODS = ("Almoço", "Jantar")
+DEFAULT_WEEKS = 104
+DEFAULT_DAYS = 7
+DEFAULT_ALPHA = 0.3
+# Quantidades previstas abaixo disso não vão para a tabela
+MIN_QUANTITY = 0.05
+
+
+def _numpy():
+    import numpy as np
+    return np
+
+
+def weekly_matrix(product_ids, local_times, quantities, last_day, weeks):
+    """(produtos, matriz produtos × semanas × 7 dias × 2 períodos) com as quantidades vendidas.
+
+    A última semana termina em `last_day`; dias fora das `weeks` semanas são ignorados.
+    """
+    np = _numpy()
+    days = local_times.astype("datetime64[D]")
+    hours = (local_times - days).astype("timedelta64[h]").astype(np.int64)
+    period = (hours >= DINNER_STARTS_AT_HOUR).astype(np.int64)
+    days_back = (np.datetime64(last_day, "D") - days).astype(np.int64)
+    keep = (days_back >= 0) & (days_back < weeks * 7)
+
+    # 1970-01-01 foi quinta-feira: +3 faz segunda = 0, como date.weekday()
+    weekday = (days[keep].astype(np.int64) + 3) % 7
+    week = weeks - 1 - days_back[keep] // 7
+    products, product_index = np.unique(product_ids[keep], return_inverse=True)
+    cell = ((product_index * weeks + week) * 7 + weekday) * 2 + period[keep]
+    matrix = np.bincount(cell, weights=quantities[keep], minlength=len(products) * weeks * 14)
+    return products, matrix.reshape(len(products), weeks, 7, 2)
+
+
+def smooth(matrix, alpha):
+    """(baseline, previsão), cada uma produtos × 7 dias × 2 períodos."""
+    np = _numpy()
+    weeks = matrix.shape[1]
+    sold = matrix.sum(axis=(2, 3)) > 0
+    # Semanas anteriores à primeira venda não contam (produto novo no cardápio)
+    first_week = np.where(sold.any(axis=1), sold.argmax(axis=1), weeks)
+    active = np.arange(weeks)[None, :] >= first_week[:, None]
+    active_weeks = np.maximum(active.sum(axis=1), 1)
+
+    baseline = (matrix * active[:, :, None, None]).sum(axis=1) / active_weeks[:, None, None]
+    # Antes da primeira venda a série fica na baseline e não puxa a suavização
+    series = np.where(active[:, :, None, None], matrix, baseline[:, None])
+    # s_T = alfa·Σ (1-alfa)^(T-1-t)·x_t + (1-alfa)^T·s_0, com s_0 = baseline
+    decay = (1 - alpha) ** np.arange(weeks - 1, -1, -1)
+    level = alpha * np.tensordot(decay, series, axes=(0, 1)) + (1 - alpha) ** weeks * baseline
+    return baseline, level
+
+
+def forecast(weeks=DEFAULT_WEEKS, days=DEFAULT_DAYS, alpha=DEFAULT_ALPHA, today=None):
+    """Linhas (data, período, product_id, previsão, baseline) dos próximos `days` dias."""
+    np = _numpy()
+    today = today or datetime.now(pytz.timezone(history.LOCAL_TZ)).date()
+    start = today - timedelta(weeks=weeks)
+    items = history.sold_items(start, today)
+    products, matrix = weekly_matrix(
+        items["product_id"].to_numpy(),
+        items["local_time"].to_numpy(),
+        items["quantity"].to_numpy().astype(np.float64),
+        today - timedelta(days=1),
+        weeks,
+    )
+    baseline, level = smooth(matrix, alpha)
+
+    rows = []
+    for offset in range(days):
+        day = today + timedelta(days=offset)
+        for period_index, period in enumerate(PERIODS):
+            expected = level[:, day.weekday(), period_index]
+            base = baseline[:, day.weekday(), period_index]
+            for i in np.nonzero(expected >= MIN_QUANTITY)[0]:
+                rows.append((day, period, int(products[i]), round(float(expected[i]), 2), round(float(base[i]), 2)))
+    return rows
+
+
+def run(weeks=DEFAULT_WEEKS, days=DEFAULT_DAYS, alpha=DEFAULT_ALPHA, today=None):
+    """Recalcula a previsão e substitui as linhas de hoje em diante; devolve quantas gravou."""
+    today = today or datetime.now(pytz.timezone(history.LOCAL_TZ)).date()
+    rows = forecast(weeks, days, alpha, today)
+    db.session.execute(delete(DemandForecast).where(DemandForecast.forecast_date >= today))
+    if rows:
+        generated_at = datetime.now(pytz.utc)
+        db.session.execute(insert(DemandForecast), [
+            {"forecast_date": day, "period": period, "product_id": product_id, "quantity": quantity,
+             "baseline": base, "generated_at": generated_at}
+            for day, period, product_id, quantity, base in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def prep_plan(day, limit=10):
+    """[(produto, {período: quantidade})] dos produtos com maior previsão no dia."""
+    rows = db.session.execute(
+        select(Product.name, DemandForecast.period, DemandForecast.quantity)
+        .join(Product, Product.id == DemandForecast.product_id)
+        .where(DemandForecast.forecast_date == day)
+    ).all()
+    plan = {}
+    for name, period, quantity in rows:
+        plan.setdefault(name, {})[period] = quantity
+    return sorted(plan.items(), key=lambda item: sum(item[1].values()), reverse=True)[:limit]
+
+
+@forecast_cli.command("run")
+@click.option("--days", default=DEFAULT_DAYS, show_default=True, help="Dias a prever, a partir de hoje.")
+@click.option("--weeks", default=DEFAULT_WEEKS, show_default=True, help="Semanas de histórico.")
+@click.option("--alpha", default=DEFAULT_ALPHA, show_default=True, help="Peso das semanas recentes (0-1).")
+def run_command(days, weeks, alpha):
+    """Recalcula a previsão de demanda por produto, dia e período."""
+    if not 0 < alpha <= 1:
+        print("⚠️ --alpha deve estar entre 0 e 1.")
+        return
+    started = time.perf_counter()
+    count = run(weeks, days, alpha)
+    print(f"✅ {count} previsões gravadas para {days} dia(s) em {time.perf_counter() - started:.2f}s.")
+    today = datetime.now(pytz.timezone(history.LOCAL_TZ)).date()
+    print(f"Hoje ({WEEKDAYS[today.weekday()]}, {today:%d/%m}):")
+    for name, periods in prep_plan(today):
+        print(f"   {name}: " + " | ".join(f"{p} {periods.get(p, 0):.1f}" for p in PERIODS))
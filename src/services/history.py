@@ -0,0 +1,427 @@
+import glob
+import os
+import re
+from datetime import datetime, timedelta, timezone
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, delete
+from src.database import db
+from src.models.location import DEFAULT_LOCATION_ID, current_location_id
+from src.models.order import Order, OrderEvent, OrderItem
+from src.models.product import Product
+from src.services.partitions import add_months, month_start
+
+# Arquivo frio de pedidos fechados em arquivos colunares (Arrow IPC com zstd).
+#
+# `flask history archive --older-than 12` move pedidos entregues/cancelados com
+# mais de N meses, junto com seus itens e eventos de status, para ORDER_ARCHIVE_DIR:
+#   orders-2024-03-<carimbo>.arrow, order_items-2024-03-<carimbo>.arrow e
+#   order_events-2024-03-<carimbo>.arrow (o mês é o da criação do pedido)
+# Cada execução grava arquivos novos (nunca reescreve os antigos).
+#
+# `sales_report` e `product_sales` somam arquivo e tabelas ativas com
+# agregações vetorizadas do pyarrow, então relatórios de vários anos não
+# dependem do tamanho das tabelas OLTP.
+#
+# Os arquivos guardam a unidade de cada pedido e item; os relatórios somam só
+# a unidade atual (todas, fora de requisições). Arquivos gravados antes das
+# unidades não têm a coluna e contam como da unidade padrão.
+#
+# pyarrow é importado sob demanda para não pesar na inicialização da aplicação.
+
+CLOSED_STATUSES = ("entregue", "cancelado")
+LOCAL_TZ = "America/Sao_Paulo"
+GRANULARITIES = ("day", "month", "year")
+_FILE_NAME = re.compile(r"^(orders|order_items|order_events)-(\d{4})-(\d{2})-\w+\.arrow$")
+
+history_cli = AppGroup("history", help="Arquivo colunar de pedidos antigos e relatórios históricos.")
+
+
+def _arrow():
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    return pa, pc
+
+
+def _feather():
+    import pyarrow.feather as feather
+    return feather
+
+
+def _schemas():
+    pa, _ = _arrow()
+    orders = pa.schema([
+        ("id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("total_amount", pa.float64()),
+        ("status", pa.string()),
+        ("payment_method", pa.string()),
+        ("delivery_type", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("location_id", pa.int64()),
+    ])
+    items = pa.schema([
+        ("id", pa.int64()),
+        ("order_id", pa.int64()),
+        ("product_id", pa.int64()),
+        ("quantity", pa.int64()),
+        ("unit_price", pa.float64()),
+        ("order_created_at", pa.timestamp("us")),
+        ("order_status", pa.string()),
+        ("location_id", pa.int64()),
+    ])
+    events = pa.schema([
+        ("id", pa.int64()),
+        ("order_id", pa.int64()),
+        ("from_status", pa.string()),
+        ("to_status", pa.string()),
+        ("created_at", pa.timestamp("us")),
+    ])
+    return {"orders": orders, "order_items": items, "order_events": events}
+
+
+def archive_dir():
+    return current_app.config["ORDER_ARCHIVE_DIR"]
+
+
+def _naive_utc(value):
+    # SQLite devolve datetimes sem fuso (já em UTC); o PostgreSQL pode devolver com fuso
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _month_bounds(month):
+    following = add_months(month, 1)
+    return datetime(month.year, month.month, 1), datetime(following.year, following.month, 1)
+
+
+def _table(kind, rows):
+    pa, _ = _arrow()
+    schema = _schemas()[kind]
+    columns = list(zip(*rows)) if rows else [[] for _ in schema.names]
+    return pa.table([pa.array(list(values), type=field.type) for values, field in zip(columns, schema)], schema=schema)
+
+
+# --- Escrita ------------------------------------------------------------------------
+
+def _write(kind, month, table):
+    pa, _ = _arrow()
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(archive_dir(), f"{kind}-{month:%Y-%m}-{stamp}.arrow")
+    tmp = path + ".tmp"
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+
+def _delete_live(order_ids, chunk=900):
+    for start in range(0, len(order_ids), chunk):
+        ids = order_ids[start:start + chunk]
+        db.session.execute(delete(OrderItem).where(OrderItem.order_id.in_(ids)).execution_options(synchronize_session=False))
+        db.session.execute(delete(OrderEvent).where(OrderEvent.order_id.in_(ids)).execution_options(synchronize_session=False))
+        db.session.execute(delete(Order).where(Order.id.in_(ids)).execution_options(synchronize_session=False))
+
+
+def _reconcile(months):
+    """Remove das tabelas ativas pedidos que já estão no arquivo.
+
+    Cobre uma execução interrompida entre gravar os arquivos e apagar as linhas.
+    """
+    archived = _read("orders", months[0], add_months(months[-1], 1), columns=["id"])
+    if not archived.num_rows:
+        return 0
+    archived_ids = archived["id"].to_pylist()
+    live = []
+    for start in range(0, len(archived_ids), 900):
+        live.extend(db.session.execute(select(Order.id).where(Order.id.in_(archived_ids[start:start + 900]))).scalars())
+    if live:
+        _delete_live(live)
+        db.session.commit()
+    return len(live)
+
+
+def archive_closed_orders(older_than_months, batch_size=5000, dry_run=False, now=None):
+    """Move pedidos fechados mais antigos que o corte para arquivos colunares.
+
+    Trabalha mês a mês e em lotes de `batch_size` pedidos: grava os arquivos,
+    depois apaga pedidos, itens e eventos numa transação. Retorna {mês: pedidos arquivados}.
+    """
+    cutoff = add_months(month_start(now or datetime.utcnow()), -older_than_months)
+    cutoff_dt = datetime(cutoff.year, cutoff.month, 1)
+    closed = (Order.status.in_(CLOSED_STATUSES), Order.created_at < cutoff_dt)
+
+    first = db.session.execute(select(Order.created_at).where(*closed).order_by(Order.created_at).limit(1)).scalar()
+    if first is None:
+        return {}
+
+    months = []
+    month = month_start(first)
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+
+    summary = {}
+    if dry_run:
+        for month in months:
+            begin, end = _month_bounds(month)
+            count = db.session.query(Order).filter(*closed, Order.created_at >= begin, Order.created_at < end).count()
+            if count:
+                summary[month.strftime("%Y-%m")] = count
+        return summary
+
+    os.makedirs(archive_dir(), exist_ok=True)
+    _reconcile(months)
+
+    for month in months:
+        begin, end = _month_bounds(month)
+        last_id = 0
+        while True:
+            orders = db.session.execute(
+                select(Order.id, Order.user_id, Order.total_amount, Order.status, Order.payment_method,
+                       Order.delivery_type, Order.created_at, Order.location_id)
+                .where(*closed, Order.created_at >= begin, Order.created_at < end, Order.id > last_id)
+                .order_by(Order.id)
+                .limit(batch_size)
+            ).all()
+            if not orders:
+                break
+            order_ids = [o.id for o in orders]
+            status_by_id = {o.id: o.status for o in orders}
+            location_by_id = {o.id: o.location_id for o in orders}
+
+            items, events = [], []
+            for start in range(0, len(order_ids), 900):
+                chunk = order_ids[start:start + 900]
+                items.extend(db.session.execute(
+                    select(OrderItem.id, OrderItem.order_id, OrderItem.product_id, OrderItem.quantity,
+                           OrderItem.unit_price, OrderItem.order_created_at)
+                    .where(OrderItem.order_id.in_(chunk))
+                ).all())
+                events.extend(db.session.execute(
+                    select(OrderEvent.id, OrderEvent.order_id, OrderEvent.from_status, OrderEvent.to_status,
+                           OrderEvent.created_at)
+                    .where(OrderEvent.order_id.in_(chunk)).order_by(OrderEvent.id)
+                ).all())
+
+            order_rows = [tuple(o[:-2]) + (_naive_utc(o.created_at), o.location_id) for o in orders]
+            item_rows = [tuple(i[:-1]) + (_naive_utc(i.order_created_at), status_by_id[i.order_id],
+                                          location_by_id[i.order_id]) for i in items]
+            event_rows = [tuple(e[:-1]) + (_naive_utc(e.created_at),) for e in events]
+
+            written = [_write("orders", month, _table("orders", order_rows)),
+                       _write("order_items", month, _table("order_items", item_rows)),
+                       _write("order_events", month, _table("order_events", event_rows))]
+            try:
+                _delete_live(order_ids)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                for path in written:
+                    os.remove(path)
+                raise
+
+            key = month.strftime("%Y-%m")
+            summary[key] = summary.get(key, 0) + len(order_ids)
+            last_id = order_ids[-1]
+    return summary
+
+
+# --- Leitura ------------------------------------------------------------------------
+
+def _read(kind, start, end, columns=None):
+    """Tabela com os arquivos `kind` cujos meses tocam o intervalo [start, end).
+
+    Os arquivos são separados por mês em UTC e o intervalo é em datas locais: a
+    noite do último dia do mês em Brasília já está no arquivo do mês seguinte.
+    A seleção usa a mesma folga de `_utc_window`; o corte exato é de quem chama.
+    """
+    pa, _ = _arrow()
+    begin, finish = _utc_window(start, end)
+    first_month, tables = month_start(begin.date()), []
+    for path in sorted(glob.glob(os.path.join(archive_dir(), f"{kind}-*.arrow"))):
+        match = _FILE_NAME.match(os.path.basename(path))
+        if not match:
+            continue
+        month = datetime(int(match.group(2)), int(match.group(3)), 1).date()
+        if month < first_month or month >= finish.date():
+            continue
+        # Arquivo mapeado em memória; só as colunas pedidas são descomprimidas
+        table = _feather().read_table(path, memory_map=True, columns=_present(path, columns))
+        if "location_id" not in table.column_names:
+            table = table.append_column("location_id", pa.array([DEFAULT_LOCATION_ID] * table.num_rows, pa.int64()))
+        tables.append(table.select(columns) if columns else table)
+
+    if not tables:
+        schema = _schemas()[kind]
+        return _table(kind, []).select(columns) if columns else schema.empty_table()
+    return _in_location(pa.concat_tables(tables))
+
+
+def _present(path, columns):
+    """Das colunas pedidas, as que existem no arquivo (os antigos não têm location_id)."""
+    if columns is None:
+        return None
+    pa, _ = _arrow()
+    with pa.memory_map(path) as source:
+        names = pa.ipc.open_file(source).schema.names
+    return [column for column in columns if column in names]
+
+
+def _in_location(table):
+    location_id = current_location_id()
+    if location_id is None or "location_id" not in table.column_names:
+        return table
+    _, pc = _arrow()
+    return table.filter(pc.equal(table["location_id"], location_id))
+
+
+def _live_orders(begin, end):
+    rows = db.session.execute(
+        select(Order.id, Order.total_amount, Order.status, Order.created_at, Order.location_id)
+        .where(Order.created_at >= begin, Order.created_at < end)
+    ).all()
+    pa, _ = _arrow()
+    return pa.table({
+        "id": pa.array([r.id for r in rows], pa.int64()),
+        "total_amount": pa.array([r.total_amount for r in rows], pa.float64()),
+        "status": pa.array([r.status for r in rows], pa.string()),
+        "created_at": pa.array([_naive_utc(r.created_at) for r in rows], pa.timestamp("us")),
+        "location_id": pa.array([r.location_id for r in rows], pa.int64()),
+    })
+
+
+def _live_items(begin, end):
+    rows = db.session.execute(
+        select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price,
+               OrderItem.order_created_at, Order.status, Order.location_id)
+        .join(Order)
+        .where(Order.created_at >= begin, Order.created_at < end)
+    ).all()
+    pa, _ = _arrow()
+    return pa.table({
+        "order_id": pa.array([r.order_id for r in rows], pa.int64()),
+        "product_id": pa.array([r.product_id for r in rows], pa.int64()),
+        "quantity": pa.array([r.quantity for r in rows], pa.int64()),
+        "unit_price": pa.array([r.unit_price for r in rows], pa.float64()),
+        "order_created_at": pa.array([_naive_utc(r.order_created_at) for r in rows], pa.timestamp("us")),
+        "order_status": pa.array([r.status for r in rows], pa.string()),
+        "location_id": pa.array([r.location_id for r in rows], pa.int64()),
+    })
+
+
+def _local_time(column):
+    pa, pc = _arrow()
+    utc = pc.assume_timezone(column, "UTC")
+    return pc.local_timestamp(utc.cast(pa.timestamp("us", tz=LOCAL_TZ)))
+
+
+def _in_range(table, time_column, start, end):
+    _, pc = _arrow()
+    local = _local_time(table[time_column])
+    mask = pc.and_(pc.greater_equal(local, datetime.combine(start, datetime.min.time())),
+                   pc.less(local, datetime.combine(end, datetime.min.time())))
+    return table.append_column("local_time", local).filter(mask)
+
+
+def _period(local, granularity):
+    _, pc = _arrow()
+    if granularity == "day":
+        return pc.strftime(local, "%Y-%m-%d")
+    if granularity == "month":
+        return pc.strftime(local, "%Y-%m")
+    return pc.strftime(local, "%Y")
+
+
+def _utc_window(start, end):
+    # Horário local de Brasília é no máximo 3h atrás do UTC; uma folga de um dia
+    # no SQL basta, o corte exato é feito no fuso local.
+    return datetime.combine(start, datetime.min.time()) - timedelta(days=1), \
+        datetime.combine(end, datetime.min.time()) + timedelta(days=1)
+
+
+def sales_report(start, end, granularity="month"):
+    """Pedidos e faturamento (exceto cancelados) por dia, mês ou ano, no intervalo [start, end)."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidade inválida: {granularity}")
+    pa, pc = _arrow()
+    columns = ["id", "total_amount", "status", "created_at", "location_id"]
+
+    archived = _read("orders", start, end, columns=columns)
+    live = _live_orders(*_utc_window(start, end))
+    if archived.num_rows:
+        # Pedidos presentes nos dois lados (execução interrompida) contam uma vez
+        live = live.filter(pc.invert(pc.is_in(live["id"], value_set=archived["id"])))
+    orders = pa.concat_tables([archived, live])
+
+    orders = _in_range(orders, "created_at", start, end)
+    orders = orders.filter(pc.not_equal(orders["status"], "cancelado"))
+    orders = orders.append_column("period", _period(orders["local_time"], granularity))
+
+    grouped = orders.group_by("period").aggregate([("total_amount", "sum"), ("id", "count")]).sort_by("period")
+    return [{"period": period, "orders": count, "revenue": round(revenue, 2)}
+            for period, revenue, count in zip(grouped["period"].to_pylist(),
+                                             grouped["total_amount_sum"].to_pylist(),
+                                             grouped["id_count"].to_pylist())]
+
+
+def sold_items(start, end):
+    """Itens vendidos (sem pedidos cancelados) de [start, end), do arquivo e das tabelas ativas.
+
+    Tabela pyarrow com as colunas dos itens e `local_time` (horário de Brasília).
+    """
+    pa, pc = _arrow()
+    columns = ["order_id", "product_id", "quantity", "unit_price", "order_created_at", "order_status", "location_id"]
+
+    archived = _read("order_items", start, end, columns=columns)
+    live = _live_items(*_utc_window(start, end))
+    if archived.num_rows:
+        live = live.filter(pc.invert(pc.is_in(live["order_id"], value_set=archived["order_id"])))
+    items = pa.concat_tables([archived, live])
+
+    items = _in_range(items, "order_created_at", start, end)
+    return items.filter(pc.not_equal(items["order_status"], "cancelado"))
+
+
+def product_sales(start, end, limit=20):
+    """Quantidade e receita por produto (exceto pedidos cancelados) no intervalo [start, end)."""
+    pa, pc = _arrow()
+    items = sold_items(start, end)
+    items = items.append_column("revenue", pc.multiply(pc.cast(items["quantity"], pa.float64()), items["unit_price"]))
+
+    grouped = items.group_by("product_id").aggregate([("quantity", "sum"), ("revenue", "sum")])
+    grouped = grouped.sort_by([("quantity_sum", "descending")]).slice(0, limit)
+
+    product_ids = grouped["product_id"].to_pylist()
+    names = dict(db.session.execute(select(Product.id, Product.name).where(Product.id.in_(product_ids))).all()) if product_ids else {}
+    return [{"product_id": pid, "name": names.get(pid, f"#{pid}"), "quantity": qty, "revenue": round(revenue, 2)}
+            for pid, qty, revenue in zip(product_ids, grouped["quantity_sum"].to_pylist(), grouped["revenue_sum"].to_pylist())]
+
+
+# --- CLI ----------------------------------------------------------------------------
+
+@history_cli.command("archive")
+@click.option("--older-than", "older_than", default=12, show_default=True, help="Idade mínima, em meses, dos pedidos arquivados.")
+@click.option("--batch-size", default=5000, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Apenas conta os pedidos que seriam arquivados.")
+def archive_command(older_than, batch_size, dry_run):
+    """Move pedidos entregues/cancelados antigos para o arquivo colunar."""
+    summary = archive_closed_orders(older_than, batch_size=batch_size, dry_run=dry_run)
+    verb = "seriam arquivados" if dry_run else "arquivados"
+    for month, count in sorted(summary.items()):
+        print(f"{month}: {count} pedido(s) {verb}")
+    print(f"✅ Total: {sum(summary.values())} pedido(s) {verb}.")
+
+
+@history_cli.command("report")
+@click.option("--start", required=True, type=click.DateTime(["%Y-%m-%d"]))
+@click.option("--end", required=True, type=click.DateTime(["%Y-%m-%d"]), help="Data final (exclusiva).")
+@click.option("--by", "granularity", default="month", type=click.Choice(GRANULARITIES), show_default=True)
+def report_command(start, end, granularity):
+    """Relatório de vendas somando arquivo e tabelas ativas."""
+    for row in sales_report(start.date(), end.date(), granularity):
+        print(f"{row['period']}\t{row['orders']}\tR$ {row['revenue']:.2f}")
@@ -0,0 +1,205 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import bindparam, case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.database import db
+from src.models.kitchen_slot import SlotReservation
+from src.models.location import DEFAULT_LOCATION_ID, current_location_id
+from src.models.order import Order, OrderItem
+from src.models.product import Category, Product
+from src.services import cache, order_events
+
+# Capacidade da cozinha por horário (fatias de KITCHEN_SLOT_MINUTES, padrão 15).
+#
+# Limites:
+#   Category.slot_capacity: itens da categoria por horário (vazio = sem limite);
+#   KITCHEN_SLOT_ORDERS: pedidos por horário, somando tudo (0 = sem limite).
+#
+# O checkout oferece os próximos horários com espaço. Ao fechar o pedido, cada
+# limite vira um UPDATE condicional na linha (horário, categoria) de
+# slot_reservations ("used + n <= capacidade"), então a verificação e a reserva
+# são um só comando, sem corrida entre checkouts simultâneos, e o custo não
+# depende de quantos pedidos existem. Se o horário escolhido lotou, o pedido
+# vai para o seguinte (até KITCHEN_SLOT_LOOKAHEAD horários à frente); sem
+# nenhum, é recusado antes de pegar o lock de escrita.
+#
+# Cancelar um pedido em aberto devolve a capacidade do horário.
+#
+# Cada unidade tem a sua cozinha: as reservas são por (unidade, horário, categoria).
+
+ORDERS = 0  # chave de slot_reservations que conta pedidos
+
+
+class KitchenFullError(Exception):
+    """Nenhum horário com capacidade nos próximos KITCHEN_SLOT_LOOKAHEAD."""
+
+
+def _utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def slot_duration():
+    return timedelta(minutes=current_app.config.get("KITCHEN_SLOT_MINUTES", 15))
+
+
+@cache.region("menu", models=(Category,))
+def slot_capacities():
+    """{category_id: itens por horário} das categorias com limite."""
+    return dict(db.session.execute(
+        select(Category.id, Category.slot_capacity).where(Category.slot_capacity.isnot(None))
+    ).all())
+
+
+def _capacity(key):
+    if key == ORDERS:
+        return current_app.config.get("KITCHEN_SLOT_ORDERS", 0)
+    return slot_capacities()[key]
+
+
+def needs(category_quantities):
+    """{chave: quantidade} que um pedido ocupa em um horário; vazio se nada tem limite.
+
+    `category_quantities`: {category_id: itens do pedido}.
+    """
+    capacities = slot_capacities()
+    result = {category_id: quantity for category_id, quantity in category_quantities.items()
+              if category_id in capacities}
+    if current_app.config.get("KITCHEN_SLOT_ORDERS", 0):
+        result[ORDERS] = 1
+    return result
+
+
+def slot_of(at):
+    """Início (UTC, sem fuso) do horário que contém `at`."""
+    at = _utc(at)
+    step = int(slot_duration().total_seconds())
+    midnight = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + timedelta(seconds=int((at - midnight).total_seconds()) // step * step)
+
+
+def candidate_slots(earliest=None, now=None):
+    """Horários que o checkout pode oferecer: do atual (ou de `earliest`) em diante."""
+    start = slot_of(now or datetime.now(timezone.utc))
+    if earliest is not None:
+        start = max(start, slot_of(earliest))
+    return [start + slot_duration() * i for i in range(current_app.config.get("KITCHEN_SLOT_LOOKAHEAD", 8))]
+
+
+def _location():
+    return current_location_id() or DEFAULT_LOCATION_ID
+
+
+def free_slots(order_needs, earliest=None, now=None):
+    """Horários com espaço para `order_needs`, em ordem (uma consulta pelo índice único)."""
+    slots = candidate_slots(earliest, now)
+    used = {}
+    rows = db.session.execute(
+        select(SlotReservation.slot_start, SlotReservation.category_id, SlotReservation.used)
+        .where(SlotReservation.location_id == _location(), SlotReservation.slot_start.in_(slots),
+               SlotReservation.category_id.in_(list(order_needs)))
+    )
+    for slot_start, category_id, slot_used in rows:
+        used[(_utc(slot_start), category_id)] = slot_used
+    return [slot for slot in slots
+            if all(used.get((slot, key), 0) + quantity <= _capacity(key) for key, quantity in order_needs.items())]
+
+
+def slot_label(slot):
+    """"19:30–19:45" no horário do servidor."""
+    local = _utc(slot).replace(tzinfo=timezone.utc).astimezone()
+    return f"{local:%H:%M}–{local + slot_duration():%H:%M}"
+
+
+# --- Reserva ----------------------------------------------------------------------------
+
+def _ensure_row(location_id, slot, key):
+    table = SlotReservation.__table__
+    values = {"location_id": location_id, "slot_start": slot, "category_id": key, "used": 0}
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        db.session.execute(insert(table).values(values).on_conflict_do_nothing(
+            index_elements=[table.c.location_id, table.c.slot_start, table.c.category_id]))
+    elif db.session.execute(select(table.c.id).where(
+            table.c.location_id == location_id, table.c.slot_start == slot, table.c.category_id == key)).first() is None:
+        db.session.execute(table.insert().values(values))
+
+
+def _take(location_id, slot, key, quantity):
+    capacity = _capacity(key)
+    if quantity > capacity:
+        return False
+    table = SlotReservation.__table__
+    statement = (table.update()
+                 .where(table.c.location_id == location_id, table.c.slot_start == slot, table.c.category_id == key,
+                        table.c.used + quantity <= capacity)
+                 .values(used=table.c.used + quantity))
+    if db.session.execute(statement).rowcount:
+        return True
+    # Primeira reserva do horário: cria a linha zerada e tenta de novo
+    _ensure_row(location_id, slot, key)
+    return db.session.execute(statement).rowcount == 1
+
+
+def _give_back(connection, releases):
+    """Devolve capacidade: `releases` = {(unidade, horário, chave): quantidade}."""
+    if not releases:
+        return
+    table = SlotReservation.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.location_id == bindparam("b_location"), table.c.slot_start == bindparam("b_slot"),
+               table.c.category_id == bindparam("b_key"))
+        .values(used=case((table.c.used > bindparam("b_quantity"), table.c.used - bindparam("b_quantity")), else_=0)),
+        [{"b_location": location_id, "b_slot": slot, "b_key": key, "b_quantity": quantity}
+         for (location_id, slot, key), quantity in releases.items()])
+
+
+def reserve(order_needs, slots):
+    """Reserva `order_needs` no primeiro horário de `slots` que ainda tiver espaço.
+
+    Roda dentro da transação do pedido, na cozinha da unidade atual; devolve o
+    horário ou levanta KitchenFullError.
+    """
+    location_id = _location()
+    for slot in slots:
+        taken = {}
+        for key, quantity in sorted(order_needs.items()):
+            if not _take(location_id, slot, key, quantity):
+                break
+            taken[(location_id, slot, key)] = quantity
+        else:
+            return slot
+        _give_back(db.session.connection(), taken)
+    raise KitchenFullError("Cozinha sem capacidade nos próximos horários")
+
+
+def _on_transitions(connection, transitions, at):
+    """Assinante de order_events: pedido em aberto cancelado devolve o horário."""
+    cancelled = [order_id for order_id, from_status, to_status in transitions
+                 if to_status == "cancelado" and from_status in ("recebido", "em_preparo")]
+    if not cancelled:
+        return
+    rows = connection.execute(
+        select(Order.id, Order.location_id, Order.slot_start, Product.category_id, func.sum(OrderItem.quantity))
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(Order.id.in_(cancelled), Order.slot_start.isnot(None))
+        .group_by(Order.id, Order.location_id, Order.slot_start, Product.category_id)
+    )
+    releases, orders = {}, set()
+    for order_id, location_id, slot_start, category_id, quantity in rows:
+        key = (location_id, slot_start, category_id)
+        releases[key] = releases.get(key, 0) + quantity
+        if order_id not in orders:
+            orders.add(order_id)
+            key = (location_id, slot_start, ORDERS)
+            releases[key] = releases.get(key, 0) + 1
+    # Linhas inexistentes (categorias sem limite) não são afetadas pelo UPDATE
+    _give_back(connection, releases)
+
+
+def init_app(app):
+    order_events.subscribe(_on_transitions)
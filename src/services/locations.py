@@ -0,0 +1,128 @@
+import re
+import unicodedata
+from contextlib import contextmanager
+import click
+from flask import g, request, session
+from flask.cli import AppGroup
+from sqlalchemy import event, select
+from sqlalchemy.orm import with_loader_criteria
+from src.database import db
+from src.models.location import DEFAULT_LOCATION_ID, Location, LocationScoped, current_location_id
+
+# Unidades do restaurante.
+#
+# Produtos, pedidos, despesas, funcionários, promoções, cupons e reservas da
+# cozinha têm location_id (mixin LocationScoped), com os índices compostos
+# começando por ele. Cada requisição roda em uma unidade:
+#   ?location=<id> na URL (totens e app, sem cookie) > escolha guardada na sessão
+#   (tela Unidades do admin, seletor da home do cliente) > DEFAULT_LOCATION_ID.
+# O evento do_orm_execute da sessão acrescenta "location_id = unidade" a todo
+# SELECT/UPDATE/DELETE do ORM que envolva esses modelos (inclusive joins e
+# carregamentos de relacionamentos), e linhas novas nascem na unidade atual;
+# as rotas não precisam filtrar nada à mão. SQL textual e escritas pela conexão
+# (ex.: busca FTS, reservas da cozinha) filtram explicitamente.
+#
+# Os caches em memória (src/services/cache.py) separam as entradas por unidade.
+#
+# Fora de requisições (CLI, agendador, relatórios em segundo plano) nada é
+# filtrado, a menos que o código entre em `scoped(location_id)`. Cada unidade é
+# uma fatia independente pela chave location_id, o que permite movê-la depois
+# para um banco próprio.
+#
+#   flask locations list
+#   flask locations add "Centro" --address "Rua X, 10"
+
+locations_cli = AppGroup("locations", help="Unidades do restaurante.")
+
+
+def init_app(app):
+    if not event.contains(db.session, "do_orm_execute", _scope):
+        event.listen(db.session, "do_orm_execute", _scope)
+    app.before_request(_bind_request)
+    app.cli.add_command(locations_cli)
+
+
+def _bind_request():
+    g.location_id = (request.args.get("location", type=int)
+                     or session.get("location_id")
+                     or DEFAULT_LOCATION_ID)
+
+
+def _scope(orm_execute_state):
+    if not (orm_execute_state.is_select or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    # Carregamentos de colunas e relacionamentos herdam o filtro da consulta original
+    if orm_execute_state.is_column_load or orm_execute_state.is_relationship_load:
+        return
+    if orm_execute_state.execution_options.get("all_locations"):
+        return
+    location_id = current_location_id()
+    if location_id is None:
+        return
+    orm_execute_state.statement = orm_execute_state.statement.options(with_loader_criteria(
+        LocationScoped, lambda cls: cls.location_id == location_id, include_aliases=True))
+
+
+@contextmanager
+def scoped(location_id):
+    """Executa o bloco como se fosse uma requisição da unidade (None = todas)."""
+    previous = g.get("location_id")
+    g.location_id = location_id
+    try:
+        yield
+    finally:
+        g.location_id = previous
+
+
+def location_ids():
+    """Ids das unidades ativas, em ordem."""
+    return db.session.execute(
+        select(Location.id).where(Location.is_active.is_(True)).order_by(Location.id)
+    ).scalars().all()
+
+
+def all_locations():
+    return db.session.execute(select(Location).order_by(Location.id)).scalars().all()
+
+
+def choose(location_id):
+    """Guarda na sessão do navegador a unidade escolhida; False se ela não existe ou está inativa."""
+    if location_id not in location_ids():
+        return False
+    session["location_id"] = location_id
+    g.location_id = location_id
+    return True
+
+
+def slugify(name):
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")
+
+
+def add_location(name, address=None, slug=None):
+    location = Location(name=name, slug=slug or slugify(name), address=address)
+    db.session.add(location)
+    db.session.commit()
+    return location
+
+
+@locations_cli.command("list")
+def list_command():
+    """Lista as unidades."""
+    for location in all_locations():
+        status = "" if location.is_active else " (inativa)"
+        print(f"{location.id}\t{location.slug}\t{location.name}{status}")
+
+
+@locations_cli.command("add")
+@click.argument("name")
+@click.option("--address", default=None)
+@click.option("--slug", default=None, help="Identificador curto (padrão: gerado do nome).")
+def add_command(name, address, slug):
+    """Cadastra uma unidade nova."""
+    slug = slug or slugify(name)
+    if db.session.execute(select(Location.id).where(Location.slug == slug)).first():
+        print(f"⚠️ Já existe uma unidade '{slug}'.")
+        return
+    location = add_location(name, address, slug)
+    print(f"✅ Unidade '{location.name}' criada (id {location.id}).")
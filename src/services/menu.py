@@ -0,0 +1,120 @@
+import hashlib
+import json
+from datetime import datetime
+from src.database import db
+from src.models.product import Category, Product, ProductAvailability, IngredientOption
+from src.services import cache, locations
+
+WEEKDAYS = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+PERIODS = ['Almoço', 'Jantar']
+DINNER_STARTS_AT_HOUR = 15
+MENU_MODELS = (Category, Product, ProductAvailability, IngredientOption)
+
+
+def current_period(now=None):
+    """Retorna (dia da semana, período) usados nas regras de disponibilidade."""
+    now = now or datetime.now()
+    current_day = WEEKDAYS[now.weekday()]
+    # Simplificado: antes das 15h = Almoço, depois = Jantar
+    current_time = "Almoço" if now.hour < DINNER_STARTS_AT_HOUR else "Jantar"
+    return current_day, current_time
+
+
+def matching_availability(availabilities, current_day, current_time):
+    """Primeira regra de disponibilidade que vale para o dia/período, ou None."""
+    for availability in availabilities:
+        if (availability.day_of_week == current_day or availability.day_of_week == "Todos") and \
+           (availability.time_of_day == current_time or availability.time_of_day == "Dia Todo"):
+            return availability
+    return None
+
+
+@cache.region("menu", models=MENU_MODELS)
+def menu_snapshot(current_day, current_time):
+    """Cardápio já resolvido para um dia/período, em estruturas simples (sem objetos ORM).
+
+    Carrega produtos, disponibilidades e ingredientes em três consultas, em vez
+    de duas consultas por produto.
+    """
+    categories = [{"id": c.id, "name": c.name} for c in Category.query.order_by(Category.id).all()]
+    categories_by_id = {c["id"]: c for c in categories}
+
+    products = Product.query.filter_by(is_available=True).order_by(Product.id).all()
+    product_ids = [p.id for p in products]
+
+    availabilities = {}
+    options = {}
+    if product_ids:
+        for availability in ProductAvailability.query.filter(ProductAvailability.product_id.in_(product_ids)).order_by(ProductAvailability.id):
+            availabilities.setdefault(availability.product_id, []).append(availability)
+        for option in IngredientOption.query.filter(IngredientOption.product_id.in_(product_ids)).order_by(IngredientOption.id):
+            options.setdefault(option.product_id, []).append({
+                "id": option.id,
+                "name": option.name,
+                "price_adjustment": option.price_adjustment or 0,
+                "is_removable": option.is_removable,
+            })
+
+    processed_products = []
+    for product in products:
+        rules = availabilities.get(product.id, [])
+        price_adjustment = 0
+        # Se não há regras específicas, produto está disponível
+        if rules:
+            availability = matching_availability(rules, current_day, current_time)
+            if availability is None:
+                continue
+            price_adjustment = availability.price_adjustment or 0
+
+        processed_products.append({
+            "id": product.id,
+            "name": product.name,
+            "description": product.description,
+            "image_url": product.image_url,
+            "price": product.price,
+            "category_id": product.category_id,
+            "category": categories_by_id.get(product.category_id),
+            "current_price": product.price + price_adjustment,
+            "price_adjustment": price_adjustment,
+            "ingredient_options": options.get(product.id, []),
+        })
+
+    return {"categories": categories, "products": processed_products}
+
+
+@cache.region("menu", models=MENU_MODELS)
+def menu_document(current_day, current_time):
+    """Cardápio do período em JSON compacto (bytes) e seu ETag, para a API.
+
+    O ETag combina a versão da região "menu" com um hash do conteúdo.
+    """
+    snapshot = menu_snapshot(current_day, current_time)
+    version = cache.current_version("menu")
+    document = {
+        "version": version,
+        "day": current_day,
+        "period": current_time,
+        "categories": snapshot["categories"],
+        "products": [{
+            "id": p["id"],
+            "name": p["name"],
+            "description": p["description"],
+            "image_url": p["image_url"],
+            "category_id": p["category_id"],
+            "price": p["current_price"],
+            "base_price": p["price"],
+            "options": p["ingredient_options"],
+        } for p in snapshot["products"]],
+    }
+    body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = f"{version}-{hashlib.sha1(body).hexdigest()[:16]}"
+    return body, etag
+
+
+def warm_menu_cache(now=None):
+    """Pré-carrega os cardápios de almoço e jantar do dia de cada unidade (ex.: no mestre do gunicorn)."""
+    current_day, _ = current_period(now)
+    for location_id in locations.location_ids():
+        with locations.scoped(location_id):
+            for current_time in PERIODS:
+                menu_document(current_day, current_time)
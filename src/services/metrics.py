@@ -0,0 +1,156 @@
+import os
+import time
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event, func, select
+from src.database import db
+
+# Métricas no formato do Prometheus, expostas em /metrics (src/routes/ops.py).
+#
+# Com vários workers do gunicorn, cada processo grava seus valores em arquivos
+# no diretório PROMETHEUS_MULTIPROC_DIR (definido em gunicorn.conf.py) e o
+# /metrics de qualquer worker soma todos. Sem a variável (desenvolvimento),
+# vale o registro em memória do próprio processo.
+#
+# Pedidos por minuto: rate(orders_placed_total[5m]) * 60
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Duração das requisições por endpoint.",
+    ["endpoint", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requisições em andamento (fila dos workers).",
+    multiprocess_mode="livesum",
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Conexões do pool emprestadas no momento.",
+    ["bind"], multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Tamanho configurado do pool de conexões.",
+    ["bind"], multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Consultas ao cache em memória, por região e resultado (hit/miss).",
+    ["region", "result"],
+)
+ORDERS_PLACED = Counter("orders_placed_total", "Pedidos realizados.")
+
+OPEN_ORDER_STATUSES = ("recebido", "em_preparo", "pronto", "saiu_para_entrega")
+
+# Filas cuja profundidade é medida no momento da coleta: nome -> função sem argumentos
+# que devolve um inteiro. Outros módulos podem registrar as suas com register_queue.
+_queues = {}
+
+
+def register_queue(name, depth):
+    _queues[name] = depth
+
+
+def record_cache(region, hit):
+    CACHE_REQUESTS.labels(region=region, result="hit" if hit else "miss").inc()
+
+
+def record_order_placed(count=1):
+    ORDERS_PLACED.inc(count)
+
+
+def _open_orders():
+    """{(unidade, status): pedidos em aberto}, com zero nos status vazios de cada unidade ativa."""
+    from src.models.location import Location
+    from src.models.order import Order
+    # O /metrics também é uma requisição: sem a opção, só contaria a unidade padrão
+    rows = db.session.execute(
+        select(Order.location_id, Order.status, func.count())
+        .where(Order.status.in_(OPEN_ORDER_STATUSES)).group_by(Order.location_id, Order.status)
+        .execution_options(all_locations=True)
+    ).all()
+    counts = {(location_id, status): count for location_id, status, count in rows}
+    location_ids = set(db.session.execute(select(Location.id).where(Location.is_active)).scalars())
+    location_ids.update(location_id for location_id, _ in counts)
+    return {(location_id, status): counts.get((location_id, status), 0)
+            for location_id in sorted(location_ids) for status in OPEN_ORDER_STATUSES}
+
+
+class QueueCollector:
+    """Profundidade das filas, calculada no processo que atende o /metrics."""
+
+    def collect(self):
+        orders = GaugeMetricFamily("orders_open", "Pedidos em aberto por unidade e status (fila da cozinha/entrega).",
+                                   labels=["location_id", "status"])
+        try:
+            open_orders = _open_orders()
+        except Exception:
+            # Banco fora do ar não derruba o /metrics; o /readyz acusa o problema
+            db.session.rollback()
+            open_orders = {}
+        for (location_id, status), count in open_orders.items():
+            orders.add_metric([str(location_id), status], count)
+        yield orders
+
+        queues = GaugeMetricFamily("queue_depth", "Itens aguardando em filas internas.", labels=["queue"])
+        for name, depth in sorted(_queues.items()):
+            queues.add_metric([name], depth())
+        yield queues
+
+
+def init_app(app):
+    """Mede a latência das requisições e o uso do pool de conexões."""
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+
+    @app.after_request
+    def _observe(response):
+        start = g.get("_metrics_start")
+        if start is not None:
+            REQUEST_LATENCY.labels(
+                endpoint=request.endpoint or "desconhecido", method=request.method, status=response.status_code
+            ).observe(time.perf_counter() - start)
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        # teardown roda mesmo quando a requisição falha antes do after_request
+        if g.pop("_metrics_start", None) is not None:
+            REQUESTS_IN_PROGRESS.dec()
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _instrument_pool(bind or "default", engine)
+
+
+def _instrument_pool(bind, engine):
+    in_use = DB_POOL_IN_USE.labels(bind=bind)
+    size = DB_POOL_SIZE.labels(bind=bind)
+
+    def checkout(*args):
+        in_use.inc()
+        # Gravado no próprio worker (e não no mestre, que só aquece o cache)
+        if callable(getattr(engine.pool, "size", None)):
+            size.set(engine.pool.size())
+
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", lambda *args: in_use.dec())
+
+
+def render():
+    """Corpo e content-type da resposta do /metrics."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        registry.register(_ProcessRegistry())
+    registry.register(QueueCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class _ProcessRegistry:
+    # Repassa as métricas do registro padrão sem registrar o QueueCollector nele
+    def collect(self):
+        return REGISTRY.collect()
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import pytz
+from sqlalchemy import event, inspect, insert, select
+from src.database import db
+from src.models.order import Order, OrderEvent
+
+# Log de transições de status dos pedidos (recebido → em_preparo → pronto →
+# saiu_para_entrega → entregue/cancelado).
+#
+# Toda mudança de Order.status feita pelo ORM vira uma linha em order_events no
+# mesmo flush (evento after_flush da sessão). Escritas em SQL direto (INSERT do
+# checkout, atualizações em lote) chamam `record` na mesma transação.
+#
+# Consumidores (painéis ao vivo, totalizações, integrações) leem de forma
+# incremental: guardam o id do último evento visto e pedem `events_since(id)`,
+# em vez de varrer a tabela de pedidos.
+
+# No PostgreSQL os ids saem da sequência antes do commit: uma transação lenta
+# pode confirmar o id 10 depois de outra já ter confirmado o 11. Entregamos só
+# eventos com alguns segundos de idade para o cursor não pular esses casos.
+# (No SQLite as escritas são serializadas e os ids chegam em ordem.)
+SETTLE_SECONDS = 5
+
+# Funções chamadas com (conexão, transições, instante) logo após cada gravação,
+# na mesma transação (ex.: estatísticas de tempo de preparo em src/services/eta.py)
+_subscribers = []
+
+
+def init_app(app):
+    """Registra o evento que grava as transições feitas pelo ORM."""
+    if not event.contains(db.session, "after_flush", _collect_transitions):
+        event.listen(db.session, "after_flush", _collect_transitions)
+
+
+def _collect_transitions(session, flush_context):
+    transitions = []
+    for obj in session.new:
+        if isinstance(obj, Order) and obj.status:
+            transitions.append((obj.id, None, obj.status))
+    for obj in session.dirty:
+        if not isinstance(obj, Order):
+            continue
+        history = inspect(obj).attrs.status.history
+        if history.added and history.deleted and history.added[0] != history.deleted[0]:
+            transitions.append((obj.id, history.deleted[0], history.added[0]))
+    if transitions:
+        record(session, transitions)
+
+
+def subscribe(func):
+    """Registra `func(conexão, transições, instante)`, chamada a cada gravação de eventos."""
+    if func not in _subscribers:
+        _subscribers.append(func)
+
+
+def record(session, transitions, at=None):
+    """Grava transições (order_id, status anterior ou None, novo status) na transação da sessão."""
+    at = at or datetime.now(pytz.utc)
+    rows = [{"order_id": order_id, "from_status": from_status, "to_status": to_status, "created_at": at}
+            for order_id, from_status, to_status in transitions]
+    # Pela conexão, e não pela sessão: funciona também dentro de um flush
+    connection = session.connection()
+    connection.execute(insert(OrderEvent), rows)
+    for func in _subscribers:
+        func(connection, transitions, at)
+
+
+def events_since(after_id=0, limit=500, now=None):
+    """Eventos com id maior que `after_id`, em ordem; o id do último é o próximo cursor."""
+    query = select(OrderEvent).where(OrderEvent.id > after_id).order_by(OrderEvent.id).limit(limit)
+    if db.session.get_bind().dialect.name == "postgresql":
+        settled = (now or datetime.now(pytz.utc)) - timedelta(seconds=SETTLE_SECONDS)
+        query = query.where(OrderEvent.created_at < settled)
+    return [{
+        "id": e.id,
+        "order_id": e.order_id,
+        "from_status": e.from_status,
+        "to_status": e.to_status,
+        "created_at": e.created_at.isoformat(),
+    } for e in db.session.execute(query).scalars()]
+
+
+def latest_event_id():
+    """Id do evento mais recente (cursor inicial de quem só quer mudanças futuras)."""
+    return db.session.execute(select(db.func.max(OrderEvent.id))).scalar() or 0
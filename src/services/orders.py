@@ -0,0 +1,227 @@
+import math
+from datetime import datetime, timedelta
+import click
+import pytz
+from flask.cli import AppGroup
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from src.database import begin_write, db
+from src.models.order import Order, OrderItem, OrderRequest
+from src.models.product import Product
+from src.models.promotion import Coupon
+from src.services import eta, kitchen, order_events
+from src.services.kitchen import KitchenFullError
+
+# Criação de pedidos em poucas idas ao banco:
+#   0. (com limite de capacidade) UPDATE condicional que reserva o horário da cozinha;
+#   1. UPDATE ... RETURNING que resgata o cupom (só se ainda houver usos);
+#   2. INSERT ... RETURNING do pedido, já com a previsão de tempo (src/services/eta.py);
+#   3. INSERT em lote (executemany/insertmanyvalues) de todos os itens;
+#   4. INSERT do evento "recebido" em order_events;
+#   5. INSERT da chave de idempotência, tudo na mesma transação.
+#
+# Um reenvio do mesmo checkout (duplo clique, retry do celular) traz a mesma
+# chave: devolvemos o pedido já criado em vez de gravar outro. Se dois envios
+# chegarem juntos, o índice único da chave faz o segundo desfazer tudo,
+# inclusive o resgate do cupom.
+#
+# Mudanças de status em lote (quadro da cozinha) seguem o fluxo abaixo: um
+# único UPDATE condicional altera só os pedidos cujo status atual permite a
+# transição e devolve os ids alterados; os eventos vão para order_events na
+# mesma transação. A edição de um pedido pela tela dele continua livre, para
+# correções manuais (ex.: reabrir um cancelado).
+
+# Status seguintes permitidos a partir de cada status em aberto
+NEXT_STATUSES = {
+    "recebido": ("em_preparo", "cancelado"),
+    "em_preparo": ("pronto", "cancelado"),
+    "pronto": ("saiu_para_entrega", "entregue", "cancelado"),
+    "saiu_para_entrega": ("entregue", "cancelado"),
+}
+
+orders_cli = AppGroup("orders", help="Manutenção de pedidos.")
+
+
+class EmptyOrderError(ValueError):
+    """Nenhum item válido no carrinho."""
+
+
+def existing_order_id(user_id, idempotency_key):
+    """Id do pedido já criado com esta chave pelo usuário, ou None."""
+    if not idempotency_key:
+        return None
+    return db.session.execute(
+        select(OrderRequest.order_id).where(OrderRequest.user_id == user_id,
+                                            OrderRequest.idempotency_key == idempotency_key)
+    ).scalar()
+
+
+def cart_lines(cart):
+    """(product_id, quantidade) de cada item do carrinho da sessão."""
+    lines = []
+    for cart_key, cart_item in cart.items():
+        if isinstance(cart_item, dict):
+            lines.append((cart_item.get("product_id"), cart_item.get("quantity", 0)))
+        else:  # Formato antigo: {product_id: quantidade}
+            lines.append((int(cart_key), cart_item))
+    return lines
+
+
+def _redeem_coupon(code, subtotal):
+    """Resgata um uso do cupom de forma atômica; devolve o desconto (0 se não valer)."""
+    if not code:
+        return 0
+    row = db.session.execute(
+        update(Coupon)
+        .where(Coupon.code == code, Coupon.is_active == True,
+               Coupon.used_count < Coupon.usage_limit, Coupon.min_order_value <= subtotal)
+        .values(used_count=Coupon.used_count + 1)
+        .returning(Coupon.discount_type, Coupon.discount_value)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        return 0
+    if row.discount_type == "percentage":
+        return subtotal * (row.discount_value / 100)
+    return row.discount_value
+
+
+def place_order(user_id, lines, payment_method, delivery_type, delivery_address=None,
+                coupon_code=None, idempotency_key=None, slot=None, now=None):
+    """Cria o pedido e seus itens; devolve (id do pedido, criado).
+
+    `criado` é False quando a chave de idempotência já tinha gerado um pedido.
+    `slot`: horário de preparo pedido pelo cliente (o primeiro livre a partir dele
+    é reservado); levanta KitchenFullError se a cozinha não tiver capacidade.
+    `now`: instante do pedido (padrão: agora), que define o horário atual da cozinha.
+    """
+    order_id = existing_order_id(user_id, idempotency_key)
+    if order_id is not None:
+        return order_id, False
+
+    product_ids = {product_id for product_id, _ in lines}
+    products = {product_id: (price, category_id) for product_id, price, category_id in db.session.execute(
+        select(Product.id, Product.price, Product.category_id).where(Product.id.in_(product_ids))
+    )} if product_ids else {}
+    items = [{"product_id": product_id, "quantity": quantity, "unit_price": products[product_id][0]}
+             for product_id, quantity in lines if product_id in products]
+    if not items:
+        raise EmptyOrderError("Carrinho sem produtos válidos")
+
+    category_quantities = {}
+    for item in items:
+        category_id = products[item["product_id"]][1]
+        category_quantities[category_id] = category_quantities.get(category_id, 0) + item["quantity"]
+    order_needs = kitchen.needs(category_quantities)
+    created_at = now or datetime.now(pytz.utc)
+    slots = kitchen.free_slots(order_needs, slot, created_at) if order_needs else []
+    if order_needs and not slots:
+        # Recusa rápida: nem chega a pegar o lock de escrita
+        raise KitchenFullError("Cozinha sem capacidade nos próximos horários")
+
+    # A partir daqui a transação é só de escrita e curta (BEGIN IMMEDIATE no SQLite)
+    begin_write()
+
+    slot_start = None
+    if order_needs:
+        try:
+            slot_start = kitchen.reserve(order_needs, slots)
+        except KitchenFullError:
+            db.session.rollback()
+            raise
+
+    subtotal = sum(item["unit_price"] * item["quantity"] for item in items)
+    total = subtotal - _redeem_coupon(coupon_code, subtotal)
+
+    estimated_time = eta.estimate_new_order(set(category_quantities), delivery_type, created_at)
+    if slot_start is not None:
+        # Agendado para um horário à frente: a previsão não pode ser antes dele
+        slot_end = slot_start + kitchen.slot_duration()
+        estimated_time = max(estimated_time, math.ceil((slot_end - created_at.replace(tzinfo=None)).total_seconds() / 60))
+    order_id = db.session.execute(
+        insert(Order).returning(Order.id),
+        [{"user_id": user_id, "total_amount": total, "status": "recebido",
+          "payment_method": payment_method, "delivery_type": delivery_type,
+          "delivery_address": delivery_address, "created_at": created_at, "estimated_time": estimated_time,
+          "slot_start": slot_start}],
+    ).scalar_one()
+
+    for item in items:
+        item.update(order_id=order_id, order_created_at=created_at)
+    db.session.execute(insert(OrderItem), items)
+    # INSERT direto não passa pelo flush do ORM: registra a criação aqui
+    order_events.record(db.session, [(order_id, None, "recebido")], at=created_at)
+
+    try:
+        if idempotency_key:
+            db.session.execute(insert(OrderRequest), [{"user_id": user_id, "idempotency_key": idempotency_key,
+                                                       "order_id": order_id, "created_at": created_at}])
+        db.session.commit()
+    except IntegrityError:
+        # Outro envio com a mesma chave venceu a corrida
+        db.session.rollback()
+        existing_id = existing_order_id(user_id, idempotency_key)
+        if existing_id is None:
+            raise
+        return existing_id, False
+
+    return order_id, True
+
+
+def previous_statuses(status):
+    """Status a partir dos quais um pedido pode ir para `status` (vazio se nenhum)."""
+    return tuple(current for current, following in NEXT_STATUSES.items() if status in following)
+
+
+def bulk_set_status(order_ids, status):
+    """Leva para `status` os pedidos cujo status atual permite a transição.
+
+    Devolve as transições gravadas [(id, status anterior, status)]; os demais
+    pedidos (transição ilegal, outra unidade, inexistentes) ficam como estão.
+    """
+    allowed = previous_statuses(status)
+    if not allowed:
+        raise ValueError(f"Status inválido para alteração em lote: {status}")
+    order_ids = sorted(set(order_ids))
+    if not order_ids:
+        return []
+
+    begin_write()
+    if len(allowed) == 1:
+        # Só um status anterior possível: todo pedido alterado vinha dele
+        previous = dict.fromkeys(order_ids, allowed[0])
+    else:
+        previous = dict(db.session.execute(
+            select(Order.id, Order.status)
+            .where(Order.id.in_(order_ids), Order.status.in_(allowed))
+            .with_for_update()
+        ).all())
+    changed = db.session.execute(
+        update(Order)
+        .where(Order.id.in_(order_ids), Order.status.in_(allowed))
+        .values(status=status)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    transitions = [(order_id, previous[order_id], status) for order_id in sorted(changed)]
+    if transitions:
+        # UPDATE em lote não passa pelo flush do ORM: registra as transições aqui
+        order_events.record(db.session, transitions)
+    db.session.commit()
+    return transitions
+
+
+def prune_order_requests(older_than_days=7):
+    """Apaga chaves de idempotência antigas (retries só fazem sentido por minutos)."""
+    cutoff = datetime.now(pytz.utc) - timedelta(days=older_than_days)
+    result = db.session.execute(delete(OrderRequest).where(OrderRequest.created_at < cutoff))
+    db.session.commit()
+    return result.rowcount
+
+
+@orders_cli.command("prune-keys")
+@click.option("--older-than-days", default=7, show_default=True)
+def prune_keys_command(older_than_days):
+    """Apaga chaves de idempotência de checkout antigas."""
+    removed = prune_order_requests(older_than_days)
+    print(f"✅ {removed} chave(s) de idempotência removida(s).")
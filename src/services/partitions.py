@@ -0,0 +1,148 @@
+import re
+from datetime import date, datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text
+from src.database import db
+
+# Particionamento mensal (PostgreSQL) das tabelas `orders` e `order_items`.
+#
+# Cada mês tem um par de partições, ex.: orders_p2026_10 / order_items_p2026_10.
+# `orders` é particionada por created_at e `order_items` por order_created_at
+# (cópia do created_at do pedido), então filtros por período podem descartar
+# partições inteiras e as junções pedido/itens acontecem partição a partição.
+#
+# Comandos de manutenção:
+#   flask partitions create --months-ahead 3
+#   flask partitions archive --older-than 24 [--drop]
+
+PARTITIONED_TABLES = (("orders", "created_at"), ("order_items", "order_created_at"))
+ARCHIVE_SCHEMA = "archive"
+_PARTITION_NAME = re.compile(r"^(orders|order_items)_p(\d{4})_(\d{2})$")
+
+partitions_cli = AppGroup("partitions", help="Manutenção das partições mensais de pedidos.")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(connection):
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'orders' AND c.relnamespace = 'public'::regnamespace"
+    )).scalar())
+
+
+def existing_partitions(connection, table):
+    """Meses que já têm partição anexada à tabela informada."""
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {"table": table}).scalars()
+    months = set()
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match and match.group(1) == table:
+            months.add(date(int(match.group(2)), int(match.group(3)), 1))
+    return months
+
+
+def create_partitions(connection, first_month, last_month):
+    """Cria (se faltarem) as partições de pedidos e itens de first_month até last_month."""
+    created = []
+    for table, _ in PARTITIONED_TABLES:
+        present = existing_partitions(connection, table)
+        month = month_start(first_month)
+        while month <= last_month:
+            if month not in present:
+                name = partition_name(table, month)
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                ))
+                created.append(name)
+            month = add_months(month, 1)
+    return created
+
+
+def ensure_future_partitions(connection, months_ahead=3, today=None):
+    """Garante partições do mês atual até `months_ahead` meses à frente."""
+    current = month_start(today or datetime.utcnow())
+    return create_partitions(connection, current, add_months(current, months_ahead))
+
+
+def archive_partitions(connection, older_than_months, drop=False, today=None):
+    """Desanexa as partições anteriores ao corte e as move para o schema `archive`.
+
+    Os itens são desanexados antes dos pedidos (por causa da chave estrangeira),
+    e a chave estrangeira copiada para a partição desanexada é removida, já que
+    ela deixaria de apontar para a tabela ativa. Com `drop=True` as partições são
+    apagadas em vez de arquivadas.
+    """
+    cutoff = add_months(month_start(today or datetime.utcnow()), -older_than_months)
+    months = sorted(m for m in existing_partitions(connection, "orders") if m < cutoff)
+
+    if months and not drop:
+        connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+
+    archived = []
+    for month in months:
+        for table in ("order_items", "orders"):
+            name = partition_name(table, month)
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            foreign_keys = connection.execute(text(
+                "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'"
+            ), {"name": name}).scalars().all()
+            for constraint in foreign_keys:
+                connection.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+            if drop:
+                connection.execute(text(f"DROP TABLE {name}"))
+            else:
+                connection.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+            archived.append(name)
+    return archived
+
+
+def _require_partitioned(connection):
+    if not is_partitioned(connection):
+        print("⚠️ As tabelas de pedidos não estão particionadas (requer PostgreSQL e a migração de particionamento).")
+        return False
+    return True
+
+
+@partitions_cli.command("create")
+@click.option("--months-ahead", default=3, show_default=True, help="Quantos meses futuros manter criados.")
+def create_command(months_ahead):
+    """Cria as partições do mês atual e dos próximos meses."""
+    with db.engine.begin() as connection:
+        if not _require_partitioned(connection):
+            return
+        created = ensure_future_partitions(connection, months_ahead)
+    print(f"✅ {len(created)} partição(ões) criada(s). {' '.join(created)}")
+
+
+@partitions_cli.command("archive")
+@click.option("--older-than", "older_than", default=24, show_default=True, help="Idade mínima, em meses, das partições arquivadas.")
+@click.option("--drop", is_flag=True, help="Apaga as partições antigas em vez de movê-las para o schema archive.")
+def archive_command(older_than, drop):
+    """Desanexa partições antigas de pedidos e itens."""
+    with db.engine.begin() as connection:
+        if not _require_partitioned(connection):
+            return
+        archived = archive_partitions(connection, older_than, drop=drop)
+    action = "apagada(s)" if drop else f"movida(s) para o schema {ARCHIVE_SCHEMA}"
+    print(f"✅ {len(archived)} partição(ões) {action}. {' '.join(archived)}")
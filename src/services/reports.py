@@ -0,0 +1,306 @@
+import csv
+import hashlib
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import click
+import pytz
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select, update
+from src.database import db
+from src.models.expense import Expense
+from src.models.location import current_location_id
+from src.models.product import Product
+from src.models.report_job import ReportJob
+from src.services import history, locations
+from src.services.metrics import register_queue
+from src.services.partitions import add_months, month_start
+
+# Relatórios pesados do painel (faturamento de vários meses, lucro por produto,
+# despesas) rodam fora da requisição.
+#
+# O admin envia o pedido em /admin/reports; `submit` grava um ReportJob
+# "pendente" e o entrega a um pool limitado de threads do próprio processo
+# (REPORT_WORKERS, padrão 2). A página acompanha o progresso e, ao final,
+# mostra a tabela e o CSV para download.
+#
+# Pedidos idênticos (mesmo tipo e parâmetros) reaproveitam o job em andamento
+# ou o resultado dos últimos REPORT_CACHE_MINUTES minutos. O job guarda a
+# unidade de quem pediu e roda filtrado por ela, como a requisição.
+#
+# Se o processo morre com jobs na mão, eles ficam "pendente" ou "executando".
+# O pool, ao subir, devolve à fila os "executando" há mais de STALE_AFTER e
+# retoma todos os pendentes; `submit` não reaproveita um job órfão.
+#
+# Com REPORT_WORKERS=0 (ex.: workers gevent, em que uma thread pesada travaria
+# o worker), os jobs ficam na fila para um processo separado:
+#   flask reports worker --concurrency 2
+
+reports_cli = AppGroup("reports", help="Execução dos relatórios do painel.")
+
+EXPENSE_TYPES = {"rent": "Aluguel", "salaries": "Salários", "fixed_bills": "Contas Fixas"}
+# Um job "executando" há mais tempo que isso ficou órfão (processo reiniciado)
+STALE_AFTER = timedelta(minutes=30)
+
+_executor = None
+
+
+class ReportError(ValueError):
+    """Parâmetros de relatório inválidos."""
+
+
+# --- Relatórios ---------------------------------------------------------------------
+
+def _months(start, end):
+    """Intervalos [início, fim) de cada mês que toca [start, end)."""
+    current = month_start(start)
+    while current < end:
+        following = add_months(current, 1)
+        yield max(current, start), min(following, end)
+        current = following
+
+
+def revenue_report(params, progress):
+    months = list(_months(params["start"], params["end"]))
+    totals = {}
+    for index, (start, end) in enumerate(months, 1):
+        for row in history.sales_report(start, end, params.get("granularity", "month")):
+            total = totals.setdefault(row["period"], {"period": row["period"], "orders": 0, "revenue": 0})
+            total["orders"] += row["orders"]
+            total["revenue"] = round(total["revenue"] + row["revenue"], 2)
+        progress(index * 100 // len(months))
+    return {
+        "columns": [["period", "Período"], ["orders", "Pedidos"], ["revenue", "Faturamento (R$)"]],
+        "rows": [totals[period] for period in sorted(totals)],
+    }
+
+
+def product_profit_report(params, progress):
+    months = list(_months(params["start"], params["end"]))
+    totals = {}
+    for index, (start, end) in enumerate(months, 1):
+        # Sem limite: o corte por lucro só pode ser feito depois de somar todos os meses
+        for row in history.product_sales(start, end, limit=None):
+            total = totals.setdefault(row["product_id"], {"product_id": row["product_id"], "name": row["name"],
+                                                          "quantity": 0, "revenue": 0})
+            total["quantity"] += row["quantity"]
+            total["revenue"] += row["revenue"]
+        progress(index * 90 // len(months))
+
+    # Custo atual do produto (o custo histórico não é guardado nos itens)
+    costs = dict(db.session.execute(
+        select(Product.id, func.coalesce(Product.cost, 0)).where(Product.id.in_(list(totals)))
+    ).all()) if totals else {}
+    rows = []
+    for total in totals.values():
+        cost = costs.get(total["product_id"], 0) * total["quantity"]
+        rows.append({**total, "revenue": round(total["revenue"], 2), "cost": round(cost, 2),
+                     "profit": round(total["revenue"] - cost, 2)})
+    rows.sort(key=lambda row: row["profit"], reverse=True)
+    progress(100)
+    return {
+        "columns": [["name", "Produto"], ["quantity", "Quantidade"], ["revenue", "Receita (R$)"],
+                    ["cost", "Custo (R$)"], ["profit", "Lucro (R$)"]],
+        "rows": rows,
+    }
+
+
+def expenses_report(params, progress):
+    totals = {}
+    rows = db.session.execute(
+        select(Expense.date, Expense.expense_type, Expense.amount)
+        .where(Expense.date >= params["start"], Expense.date < params["end"])
+    )
+    for expense_date, expense_type, amount in rows:
+        key = (expense_date.strftime("%Y-%m"), EXPENSE_TYPES.get(expense_type, "Outros"))
+        totals[key] = totals.get(key, 0) + amount
+    progress(100)
+    return {
+        "columns": [["period", "Mês"], ["type", "Tipo"], ["amount", "Total (R$)"]],
+        "rows": [{"period": period, "type": label, "amount": round(amount, 2)}
+                 for (period, label), amount in sorted(totals.items())],
+    }
+
+
+REPORTS = {
+    "revenue": ("Faturamento por período", revenue_report),
+    "product_profit": ("Lucro por produto", product_profit_report),
+    "expenses": ("Despesas por mês e tipo", expenses_report),
+}
+
+
+def normalize_params(kind, form):
+    """Valida os parâmetros do formulário; devolve um dicionário com datas."""
+    if kind not in REPORTS:
+        raise ReportError("Tipo de relatório desconhecido.")
+    try:
+        start = datetime.strptime(form.get("start", ""), "%Y-%m-%d").date()
+        end = datetime.strptime(form.get("end", ""), "%Y-%m-%d").date()
+    except ValueError:
+        raise ReportError("Informe as datas no formato AAAA-MM-DD.")
+    if end <= start:
+        raise ReportError("A data final deve ser posterior à inicial.")
+    params = {"start": start, "end": end}
+    if kind == "revenue":
+        granularity = form.get("granularity") or "month"
+        if granularity not in history.GRANULARITIES:
+            raise ReportError("Agrupamento inválido.")
+        params["granularity"] = granularity
+    return params
+
+
+def _dump_params(params):
+    return json.dumps({k: v.isoformat() if isinstance(v, date) else v for k, v in params.items()}, sort_keys=True)
+
+
+def _load_params(text):
+    params = json.loads(text)
+    for key in ("start", "end"):
+        params[key] = date.fromisoformat(params[key])
+    return params
+
+
+# --- Fila ---------------------------------------------------------------------------
+
+def submit(kind, params, user_id=None):
+    """Cria (ou reaproveita) o job do relatório; devolve (job, reaproveitado)."""
+    encoded = _dump_params({**params, "location_id": current_location_id()})
+    params_hash = hashlib.sha256(f"{kind}:{encoded}".encode()).hexdigest()
+    now = datetime.now(pytz.utc)
+    fresh_after = now - timedelta(minutes=current_app.config.get("REPORT_CACHE_MINUTES", 15))
+
+    # Um job "executando" há mais de STALE_AFTER ficou órfão: não é devolvido
+    existing = ReportJob.query.filter(
+        ReportJob.params_hash == params_hash,
+        (ReportJob.status == "pendente") |
+        ((ReportJob.status == "executando") & (ReportJob.started_at >= now - STALE_AFTER)) |
+        ((ReportJob.status == "concluido") & (ReportJob.finished_at >= fresh_after)),
+    ).order_by(ReportJob.id.desc()).first()
+    if existing is not None:
+        if existing.status == "pendente":
+            # Pode ter sido entregue a um pool que morreu; claim() evita execução dupla
+            _dispatch(existing.id)
+        return existing, True
+
+    job = ReportJob(kind=kind, params=encoded, params_hash=params_hash, created_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+    _dispatch(job.id)
+    return job, False
+
+
+def _dispatch(job_id):
+    global _executor
+    app = current_app._get_current_object()
+    workers = app.config.get("REPORT_WORKERS", 2)
+    if workers <= 0:
+        return  # fica para "flask reports worker"
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reports")
+        # Pool novo (processo recém-iniciado): retoma o que ficou da vida anterior
+        requeue_stale()
+        for pending_id in db.session.execute(
+            select(ReportJob.id).where(ReportJob.status == "pendente", ReportJob.id != job_id).order_by(ReportJob.id)
+        ).scalars():
+            _executor.submit(_run_in_app, app, pending_id)
+    _executor.submit(_run_in_app, app, job_id)
+
+
+def _run_in_app(app, job_id):
+    with app.app_context():
+        run_job(job_id)
+
+
+def claim(job_id):
+    """Marca o job como em execução se ainda estiver pendente (só um executor vence)."""
+    result = db.session.execute(
+        update(ReportJob).where(ReportJob.id == job_id, ReportJob.status == "pendente")
+        .values(status="executando", started_at=datetime.now(pytz.utc), progress=0)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _set(job_id, **values):
+    db.session.execute(update(ReportJob).where(ReportJob.id == job_id).values(**values)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def run_job(job_id):
+    """Executa um job pendente; devolve False se outro executor já o pegou."""
+    if not claim(job_id):
+        return False
+    job = db.session.get(ReportJob, job_id)
+    try:
+        _, build = REPORTS[job.kind]
+        params = _load_params(job.params)
+        with locations.scoped(params.get("location_id")):
+            result = build(params, lambda percent: _set(job_id, progress=percent))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning("Relatório %s falhou.", job_id, exc_info=True)
+        _set(job_id, status="erro", error=str(e)[:500], finished_at=datetime.now(pytz.utc))
+        return True
+    _set(job_id, status="concluido", progress=100, result=json.dumps(result, ensure_ascii=False),
+         finished_at=datetime.now(pytz.utc))
+    return True
+
+
+def requeue_stale(now=None):
+    """Devolve à fila jobs presos em "executando" (processo reiniciado no meio)."""
+    cutoff = (now or datetime.now(pytz.utc)) - STALE_AFTER
+    result = db.session.execute(
+        update(ReportJob).where(ReportJob.status == "executando", ReportJob.started_at < cutoff)
+        .values(status="pendente").execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def pending_count():
+    return db.session.execute(select(func.count()).where(ReportJob.status == "pendente")).scalar()
+
+
+def result_rows(job):
+    """(colunas, linhas) do resultado de um job concluído."""
+    result = json.loads(job.result)
+    return result["columns"], result["rows"]
+
+
+def result_csv(job):
+    columns, rows = result_rows(job)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow([label for _, label in columns])
+    for row in rows:
+        writer.writerow([row.get(key) for key, _ in columns])
+    return out.getvalue()
+
+
+def init_app(app):
+    register_queue("report_jobs", pending_count)
+    app.cli.add_command(reports_cli)
+
+
+@reports_cli.command("worker")
+@click.option("--concurrency", default=2, show_default=True)
+@click.option("--poll", default=2.0, show_default=True, help="Intervalo, em segundos, entre consultas à fila.")
+def worker_command(concurrency, poll):
+    """Executa os relatórios pendentes (para REPORT_WORKERS=0 nos workers web)."""
+    app = current_app._get_current_object()
+    requeued = requeue_stale()
+    print(f"✅ Executor de relatórios iniciado ({requeued} job(s) órfão(s) devolvido(s) à fila).")
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            job_ids = db.session.execute(
+                select(ReportJob.id).where(ReportJob.status == "pendente").order_by(ReportJob.id).limit(concurrency)
+            ).scalars().all()
+            db.session.commit()
+            list(pool.map(lambda job_id: _run_in_app(app, job_id), job_ids))
+            if not job_ids:
+                time.sleep(poll)
@@ -0,0 +1,203 @@
+import os
+import tempfile
+import threading
+from datetime import datetime, time, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import or_, select, update
+from src.database import db
+from src.models.promotion import Coupon, Promotion
+from src.services import forecast, locations
+from src.services.menu import DINNER_STARTS_AT_HOUR, current_period, menu_document
+from src.services.orders import prune_order_requests
+
+# Agendador das viradas de período (meia-noite e 15h) e dos horários de início
+# e fim de promoções e cupons.
+#
+# Pouco antes de cada virada (SCHEDULER_WARMUP_LEAD, padrão 60 s), monta no
+# cache do processo o cardápio do período seguinte; na virada, recalcula-o e
+# desativa cupons e promoções vencidos. Assim o primeiro cliente do jantar não
+# paga pela montagem do cardápio. À meia-noite, o mestre também recalcula a
+# previsão de demanda (src/services/forecast.py).
+#
+# O cache é por processo: no gunicorn, cada worker roda um agendador que
+# aquece o próprio cache, e só o worker que segura a trava de arquivo
+# (MaintenanceLock) faz a manutenção. O mestre não roda threads: um fork com
+# uma thread segurando um lock (cache, logging, pool) pode travar os workers
+# (ver gunicorn.conf.py). Sem gunicorn:
+#   flask scheduler run          # processo dedicado
+#   flask scheduler run --once   # só as tarefas vencidas agora (ex.: via cron)
+
+scheduler_cli = AppGroup("scheduler", help="Aquecimento de cache e tarefas nas viradas de período.")
+
+# Acorda pelo menos a cada MAX_SLEEP para enxergar promoções criadas depois do último cálculo
+MAX_SLEEP = timedelta(minutes=5)
+
+
+def period_boundaries(after, until):
+    """Viradas de dia (00:00) e de almoço para jantar entre `after` (exclusivo) e `until`."""
+    boundaries = []
+    day = after.date()
+    while day <= until.date():
+        for hour, reason in ((0, "dia"), (DINNER_STARTS_AT_HOUR, "periodo")):
+            at = datetime.combine(day, time(hour))
+            if after < at <= until:
+                boundaries.append((at, reason))
+        day += timedelta(days=1)
+    return boundaries
+
+
+def upcoming_events(after, until):
+    """(instante, motivo) ordenados: viradas de período e início/fim de promoções e cupons."""
+    events = period_boundaries(after, until)
+    for model in (Promotion, Coupon):
+        rows = db.session.execute(
+            select(model.start_date, model.end_date).where(
+                model.is_active == True,
+                or_(model.start_date.between(after, until), model.end_date.between(after, until)))
+        ).all()
+        for start_date, end_date in rows:
+            for at, edge in ((start_date, "inicio"), (end_date, "fim")):
+                if after < at <= until:
+                    events.append((at, f"{model.__tablename__}:{edge}"))
+    return sorted(set(events))
+
+
+def expire_promotions(now):
+    """Desativa cupons e promoções cujo end_date já passou; devolve quantos de cada."""
+    counts = {}
+    for model in (Coupon, Promotion):
+        result = db.session.execute(
+            update(model).where(model.is_active == True, model.end_date < now)
+            .values(is_active=False).execution_options(synchronize_session=False)
+        )
+        counts[model.__tablename__] = result.rowcount
+    db.session.commit()
+    return counts
+
+
+def warm_period(at, refresh=False):
+    """Monta no cache, para cada unidade, o cardápio (JSON da API e snapshot das páginas) válido em `at`."""
+    current_day, current_time = current_period(at)
+    for location_id in locations.location_ids():
+        with locations.scoped(location_id):
+            if refresh:
+                menu_document.refresh(current_day, current_time)
+            else:
+                menu_document(current_day, current_time)
+    return current_day, current_time
+
+
+class MaintenanceLock:
+    """Trava de arquivo que elege um único processo para a manutenção.
+
+    Chamada a cada virada: quem já segura a trava continua com ela; os demais
+    tentam pegá-la sem esperar. O sistema libera a trava quando o processo
+    morre, e o próximo worker a chegar numa virada assume.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("SCHEDULER_LOCK_FILE",
+                                      os.path.join(tempfile.gettempdir(), "restaurante-scheduler.lock"))
+        self._handle = None
+
+    def __call__(self):
+        if self._handle is None:
+            import fcntl
+            handle = open(self.path, "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+            self._handle = handle
+        return True
+
+
+class Scheduler:
+    """Executa as tarefas das viradas.
+
+    `maintenance`: True, False (só aquece o cache local) ou uma função chamada
+    a cada virada que diz se este processo faz a manutenção (ex.: MaintenanceLock).
+    """
+
+    def __init__(self, app, maintenance=True, lead=None):
+        self.app = app
+        self.maintenance = maintenance
+        self.lead = timedelta(seconds=lead if lead is not None else app.config.get("SCHEDULER_WARMUP_LEAD", 60))
+        self._last = datetime.now()
+        self._warmed = set()
+        self._stop = threading.Event()
+
+    def tick(self, now=None):
+        """Executa o que venceu desde a última chamada; devolve quantos segundos dormir."""
+        now = now or datetime.now()
+        with self.app.app_context():
+            events = upcoming_events(self._last, now + self.lead + MAX_SLEEP)
+            for at, reason in events:
+                if at - self.lead <= now and at not in self._warmed and at > now:
+                    self._run("aquecimento", warm_period, at)
+                    self._warmed.add(at)
+                if at <= now:
+                    self._fire(at, reason)
+            db.session.remove()
+        self._warmed = {at for at in self._warmed if at > now}
+        self._last = now
+
+        wake_times = [t for at, _ in events for t in (at - self.lead, at) if t > now]
+        next_wake = min(wake_times + [now + MAX_SLEEP])
+        return max((next_wake - now).total_seconds(), 1)
+
+    def _maintains(self):
+        return self.maintenance() if callable(self.maintenance) else self.maintenance
+
+    def _fire(self, at, reason):
+        if self._maintains():
+            counts = self._run("expiração de cupons", expire_promotions, at)
+            if counts and any(counts.values()):
+                current_app.logger.info("Desativados na virada %s: %s", at, counts)
+            if reason == "dia":
+                self._run("limpeza de chaves", prune_order_requests)
+                self._run("previsão de demanda", forecast.run)
+        self._run("aquecimento", warm_period, at, True)
+
+    def _run(self, name, func, *args):
+        # Uma tarefa com erro não derruba o agendador; tenta de novo na próxima virada
+        try:
+            return func(*args)
+        except Exception:
+            db.session.rollback()
+            current_app.logger.warning("Tarefa agendada '%s' falhou.", name, exc_info=True)
+            return None
+
+    def run(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.tick())
+
+    def start(self):
+        """Roda em uma thread daemon (greenlet, nos workers gevent)."""
+        thread = threading.Thread(target=self.run, name="scheduler", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+@scheduler_cli.command("run")
+@click.option("--once", is_flag=True, help="Executa só as tarefas vencidas agora e sai.")
+def run_command(once):
+    """Roda o agendador completo (aquecimento e expiração de cupons/promoções)."""
+    scheduler = Scheduler(current_app._get_current_object())
+    if once:
+        with current_app.app_context():
+            counts = expire_promotions(datetime.now())
+            warm_period(datetime.now(), refresh=True)
+        print(f"✅ Cupons desativados: {counts['coupon']} | Promoções desativadas: {counts['promotion']}")
+        return
+    print("✅ Agendador iniciado (Ctrl+C para sair).")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
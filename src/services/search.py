@@ -0,0 +1,245 @@
+import re
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, bindparam, event, inspect, or_, select, text
+from src.database import db
+from src.models.location import current_location_id
+from src.models.product import Product, IngredientOption
+
+# Busca textual do cardápio (nome, descrição e nomes dos ingredientes opcionais).
+#
+# - SQLite: tabela virtual FTS5 com `remove_diacritics`, então "acai" encontra "Açaí";
+# - PostgreSQL: coluna tsvector com índice GIN e a configuração
+#   `portuguese_unaccent` (stemming em português + unaccent).
+#
+# O índice é criado junto com a tabela de produtos (db.create_all) ou pela
+# migração, atualizado na mesma transação em que produtos ou ingredientes mudam
+# (eventos da sessão) e reconstruído por completo com `flask search-reindex`.
+# Sem o índice (banco antigo ainda não migrado), a busca cai para LIKE.
+
+INDEX_TABLE = "product_search"
+TS_CONFIG = "portuguese_unaccent"
+
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5(
+        name, description, options, product_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+]
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{TS_CONFIG}') THEN
+            CREATE TEXT SEARCH CONFIGURATION {TS_CONFIG} (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION {TS_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END $$""",
+    f"""CREATE TABLE IF NOT EXISTS {INDEX_TABLE} (
+        product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_{INDEX_TABLE}_document ON {INDEX_TABLE} USING GIN (document)",
+]
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Engines em que já confirmamos que a tabela do índice existe
+_ready = set()
+
+
+def init_app(app):
+    """Registra o comando de CLI e os eventos que mantêm o índice sincronizado."""
+    app.cli.add_command(reindex_command)
+    if not event.contains(db.session, "after_flush", _collect_changes):
+        event.listen(db.session, "after_flush", _collect_changes)
+        event.listen(db.session, "before_commit", _sync_index)
+        event.listen(db.session, "after_rollback", _discard_changes)
+
+
+@event.listens_for(Product.__table__, "after_create")
+def _create_index_with_products(target, connection, **kw):
+    create_index(connection)
+
+
+def _dialect(bind):
+    return bind.dialect.name
+
+
+def index_ready(connection):
+    key = connection.engine.url
+    if key not in _ready and inspect(connection).has_table(INDEX_TABLE):
+        _ready.add(key)
+    return key in _ready
+
+
+def create_index(connection):
+    """Cria as estruturas do índice (idempotente)."""
+    ddl = POSTGRES_DDL if _dialect(connection) == "postgresql" else SQLITE_DDL
+    for statement in ddl:
+        connection.execute(text(statement))
+    _ready.discard(connection.engine.url)
+
+
+# --- Sincronização ------------------------------------------------------------------
+
+def mark_dirty(session, product_ids):
+    """Agenda a reindexação dos produtos no próximo commit da sessão.
+
+    Usado por escritas em lote (INSERT/UPDATE sem ORM), que não passam pelos
+    eventos de flush.
+    """
+    session.info.setdefault("search_dirty", set()).update(product_ids)
+
+
+def _collect_changes(session, flush_context):
+    dirty = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product) and obj.id is not None:
+            dirty.add(obj.id)
+        elif isinstance(obj, IngredientOption) and obj.product_id is not None:
+            dirty.add(obj.product_id)
+    if dirty:
+        mark_dirty(session, dirty)
+
+
+def _discard_changes(session):
+    session.info.pop("search_dirty", None)
+
+
+def _sync_index(session):
+    # before_commit roda antes do flush final; garantimos que tudo foi enviado
+    # para que os documentos reflitam o estado que será gravado.
+    session.flush()
+    product_ids = session.info.pop("search_dirty", None)
+    if not product_ids:
+        return
+    connection = session.connection()
+    if index_ready(connection):
+        reindex_products(connection, product_ids)
+
+
+def _documents(connection, product_ids):
+    products = connection.execute(
+        text("SELECT id, name, description FROM products WHERE id IN :ids")
+        .bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(product_ids)},
+    ).all()
+    options = {}
+    for product_id, name in connection.execute(
+        text("SELECT product_id, name FROM ingredient_options WHERE product_id IN :ids ORDER BY id")
+        .bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(product_ids)},
+    ):
+        options.setdefault(product_id, []).append(name)
+
+    return [{"product_id": product_id,
+             "name": name or "",
+             "description": description or "",
+             "options": " ".join(options.get(product_id, []))}
+            for product_id, name, description in products]
+
+
+def reindex_products(connection, product_ids):
+    """Atualiza os documentos dos produtos informados (remove os que não existem mais)."""
+    product_ids = list(product_ids)
+    documents = _documents(connection, product_ids)
+    remove = bindparam("ids", expanding=True)
+
+    if _dialect(connection) == "postgresql":
+        existing = {d["product_id"] for d in documents}
+        gone = [pid for pid in product_ids if pid not in existing]
+        if gone:
+            connection.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE product_id IN :ids").bindparams(remove), {"ids": gone})
+        if documents:
+            connection.execute(text(f"""
+                INSERT INTO {INDEX_TABLE} (product_id, document)
+                VALUES (:product_id,
+                        setweight(to_tsvector('{TS_CONFIG}', :name), 'A') ||
+                        setweight(to_tsvector('{TS_CONFIG}', :description), 'B') ||
+                        setweight(to_tsvector('{TS_CONFIG}', :options), 'C'))
+                ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document
+            """), documents)
+    else:
+        # FTS5 não tem UPSERT: removemos e inserimos novamente
+        connection.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE product_id IN :ids").bindparams(remove), {"ids": product_ids})
+        if documents:
+            connection.execute(text(f"""
+                INSERT INTO {INDEX_TABLE} (product_id, name, description, options)
+                VALUES (:product_id, :name, :description, :options)
+            """), documents)
+
+
+def rebuild_index(connection):
+    """Recria o índice inteiro a partir da tabela de produtos."""
+    create_index(connection)
+    connection.execute(text(f"DELETE FROM {INDEX_TABLE}"))
+    product_ids = connection.execute(text("SELECT id FROM products")).scalars().all()
+    # Em blocos, para não montar listas IN gigantes
+    for start in range(0, len(product_ids), 500):
+        reindex_products(connection, product_ids[start:start + 500])
+    return len(product_ids)
+
+
+# --- Consulta -----------------------------------------------------------------------
+
+def _tokens(query):
+    return [token.lower() for token in _TOKEN.findall(query or "")][:8]
+
+
+def search_product_ids(query, limit=20):
+    """Ids dos produtos disponíveis que casam com a busca, do mais relevante ao menos.
+
+    Cada termo é tratado como prefixo ("fran" encontra "Frango"), e todos os
+    termos precisam aparecer.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    limit = max(int(limit), 1)
+
+    connection = db.session.connection()
+    if not index_ready(connection):
+        return _like_product_ids(tokens, limit)
+    # SQL textual não passa pelo filtro de unidade do ORM
+    location_id = current_location_id()
+    in_location = "AND p.location_id = :location_id" if location_id is not None else ""
+    if _dialect(connection) == "postgresql":
+        sql = f"""
+            SELECT s.product_id
+            FROM {INDEX_TABLE} s JOIN products p ON p.id = s.product_id
+            WHERE s.document @@ to_tsquery('{TS_CONFIG}', :query) AND p.is_available {in_location}
+            ORDER BY ts_rank(s.document, to_tsquery('{TS_CONFIG}', :query)) DESC, s.product_id
+            LIMIT :limit
+        """
+        match = " & ".join(f"{token}:*" for token in tokens)
+    else:
+        # Pesos do bm25 na ordem das colunas: nome, descrição, ingredientes
+        sql = f"""
+            SELECT s.product_id
+            FROM {INDEX_TABLE} s JOIN products p ON p.id = s.product_id
+            WHERE {INDEX_TABLE} MATCH :query AND p.is_available {in_location}
+            ORDER BY bm25({INDEX_TABLE}, 10.0, 4.0, 2.0), s.product_id
+            LIMIT :limit
+        """
+        match = " ".join(f'"{token}"*' for token in tokens)
+
+    return connection.execute(text(sql), {"query": match, "limit": limit, "location_id": location_id}).scalars().all()
+
+
+def _like_product_ids(tokens, limit):
+    """Busca sem o índice: cada termo em qualquer ponto do nome ou da descrição (consulta do ORM, já filtrada pela unidade)."""
+    conditions = [or_(Product.name.ilike(f"%{token}%"), Product.description.ilike(f"%{token}%")) for token in tokens]
+    return db.session.execute(
+        select(Product.id).where(Product.is_available.is_(True), and_(*conditions)).order_by(Product.id).limit(limit)
+    ).scalars().all()
+
+
+@click.command("search-reindex")
+@with_appcontext
+def reindex_command():
+    """Cria (se preciso) e reconstrói o índice de busca de produtos."""
+    with db.engine.begin() as connection:
+        total = rebuild_index(connection)
+    print(f"✅ Índice de busca reconstruído ({total} produtos).")
@@ -0,0 +1,56 @@
+import click
+from flask.cli import AppGroup
+from src.database import db
+
+# Manutenção periódica do SQLite em modo WAL (ver configure_sqlite em src/database.py).
+#
+# O checkpoint automático do SQLite só copia o WAL de volta para o banco quando
+# não há leitores; em horários de movimento o arquivo -wal pode crescer muito.
+# Agende (ex.: a cada hora):
+#   flask sqlite checkpoint
+#   flask sqlite optimize
+
+sqlite_cli = AppGroup("sqlite", help="Manutenção do banco SQLite (WAL e estatísticas).")
+
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+def _require_sqlite(engine):
+    if engine.dialect.name != "sqlite":
+        print("⚠️ O banco configurado não é SQLite; nada a fazer.")
+        return False
+    return True
+
+
+def checkpoint(engine, mode="TRUNCATE"):
+    """Copia o WAL para o banco; devolve (ocupado, páginas no WAL, páginas copiadas)."""
+    with engine.connect() as connection:
+        return tuple(connection.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one())
+
+
+def optimize(engine):
+    """Atualiza as estatísticas que o planner usa (ANALYZE só onde compensa)."""
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA optimize")
+
+
+@sqlite_cli.command("checkpoint")
+@click.option("--mode", default="TRUNCATE", show_default=True, type=click.Choice(CHECKPOINT_MODES))
+def checkpoint_command(mode):
+    """Executa wal_checkpoint e reduz o arquivo -wal."""
+    if not _require_sqlite(db.engine):
+        return
+    busy, wal_pages, copied = checkpoint(db.engine, mode)
+    if busy:
+        print(f"⚠️ Checkpoint parcial: {copied} de {wal_pages} páginas copiadas (havia leitores ativos).")
+    else:
+        print(f"✅ Checkpoint concluído ({copied} páginas copiadas).")
+
+
+@sqlite_cli.command("optimize")
+def optimize_command():
+    """Executa PRAGMA optimize."""
+    if not _require_sqlite(db.engine):
+        return
+    optimize(db.engine)
+    print("✅ PRAGMA optimize executado.")
@@ -0,0 +1,336 @@
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+import click
+from flask import g, has_app_context, request
+from flask.cli import AppGroup
+from sqlalchemy import event, select
+from src.database import db
+
+# Captura e reprodução de tráfego real para testes de desempenho.
+#
+# Captura (opcional): com TRAFFIC_CAPTURE_FILE definido, cada requisição vira uma
+# linha JSON no arquivo (só acrescentada, nunca reescrita), com:
+#   instante, método, endpoint e regra da rota, papel (anonimo/cliente/admin),
+#   o *formato* dos parâmetros (nomes e tipos, nunca os valores), status,
+#   duração e número de consultas SQL.
+# Nada de cookies, ids de usuário, endereços ou valores digitados.
+#
+# Reprodução:
+#   flask traffic replay captura.jsonl --base-url http://127.0.0.1:5000 --speed 2 --concurrency 16
+# recria as requisições com valores tirados do banco local (produtos, pedidos,
+# cupons), no mesmo ritmo (ou N vezes mais rápido), e mostra a distribuição de
+# latência e de consultas por rota. Defina QUERY_COUNT_HEADER=1 na instância
+# alvo para que ela informe as consultas de cada resposta (X-Query-Count).
+
+traffic_cli = AppGroup("traffic", help="Captura e reprodução de tráfego para testes de desempenho.")
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+# Rotas que não fazem sentido reproduzir (login, cadastro, senhas)
+SKIPPED_ENDPOINTS = ("auth.login", "auth.register", "auth.logout", "auth.reset_password_request",
+                     "auth.reset_password", "auth.change_password", "static")
+# Campos dos quais nem o tamanho é gravado
+SENSITIVE_FIELDS = ("password", "token", "cpf", "phone", "email", "address", "username", "name")
+
+
+# --- Captura ------------------------------------------------------------------------
+
+def init_app(app):
+    """Liga a contagem de consultas e o gravador, conforme a configuração."""
+    capture_file = app.config.get("TRAFFIC_CAPTURE_FILE")
+    if not capture_file and not app.config.get("QUERY_COUNT_HEADER"):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, "before_cursor_execute", _count_query):
+                event.listen(engine, "before_cursor_execute", _count_query)
+
+    @app.after_request
+    def _describe_request(response):
+        queries = g.get("_query_count", 0)
+        if app.config.get("QUERY_COUNT_HEADER"):
+            response.headers[QUERY_COUNT_HEADER] = str(queries)
+        if capture_file:
+            request.environ["traffic.trace"] = {
+                "endpoint": request.endpoint,
+                "rule": request.url_rule.rule if request.url_rule else None,
+                "role": _role(),
+                "view_args": {k: _field_shape(k, v) for k, v in (request.view_args or {}).items()},
+                "args": _shapes(request.args),
+                "form": _shapes(request.form),
+                "json": {k: _field_shape(k, v) for k, v in _json_body().items()},
+                "queries": queries,
+            }
+        return response
+
+    if capture_file:
+        app.wsgi_app = TrafficRecorder(app.wsgi_app, capture_file, float(app.config.get("TRAFFIC_CAPTURE_SAMPLE", 1.0)))
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g._query_count = g.get("_query_count", 0) + 1
+
+
+def _role():
+    # Só olha o usuário se a própria rota já o carregou: acessar current_user
+    # aqui tocaria na sessão de requisições anônimas (ex.: /api/menu)
+    user = g.get("_login_user")
+    if user is None or not getattr(user, "is_authenticated", False):
+        return "anonimo"
+    return "admin" if user.is_admin else "cliente"
+
+
+def _json_body():
+    body = request.get_json(silent=True) if request.is_json else None
+    return body if isinstance(body, dict) else {}
+
+
+def _shape(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    text = str(value)
+    if text.lstrip("-").isdigit():
+        return "int"
+    try:
+        float(text)
+        return "float"
+    except ValueError:
+        return f"str:{len(text)}"
+
+
+def _field_shape(key, value):
+    if any(word in key.lower() for word in SENSITIVE_FIELDS):
+        return "str"
+    return _shape(value)
+
+
+def _shapes(multidict):
+    return {key: [_field_shape(key, v) for v in values] for key, values in multidict.lists()}
+
+
+class TrafficRecorder:
+    """Middleware WSGI que acrescenta uma linha JSON por requisição ao arquivo de captura."""
+
+    def __init__(self, wsgi_app, path, sample=1.0):
+        self.wsgi_app = wsgi_app
+        self.path = path
+        self.sample = sample
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        # Um descritor por processo (os workers nascem por fork); O_APPEND mantém
+        # cada linha inteira mesmo com vários processos gravando no mesmo arquivo.
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+            self._pid = os.getpid()
+        return self._fd
+
+    def __call__(self, environ, start_response):
+        if self.sample < 1 and random.random() >= self.sample:
+            return self.wsgi_app(environ, start_response)
+
+        status = {}
+
+        def _start_response(status_line, headers, exc_info=None):
+            status["code"] = int(status_line.split(" ", 1)[0])
+            return start_response(status_line, headers, exc_info)
+
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, _start_response)
+        finally:
+            trace = environ.get("traffic.trace")
+            if trace is not None:
+                trace.update(ts=round(started_at, 3), method=environ.get("REQUEST_METHOD"),
+                             status=status.get("code"), duration_ms=round((time.perf_counter() - started) * 1000, 2))
+                os.write(self._file(), (json.dumps(trace, separators=(",", ":")) + "\n").encode())
+
+
+# --- Reprodução ---------------------------------------------------------------------
+
+def load_traces(path):
+    with open(path) as stream:
+        traces = [json.loads(line) for line in stream if line.strip()]
+    return sorted(traces, key=lambda t: t["ts"])
+
+
+class ValueSource:
+    """Valores reais do banco local para preencher os parâmetros capturados."""
+
+    def __init__(self):
+        from src.models.order import Order
+        from src.models.product import Category, Product
+        from src.models.promotion import Coupon
+        self.values = {
+            "product_id": db.session.execute(select(Product.id)).scalars().all(),
+            "category_id": db.session.execute(select(Category.id)).scalars().all(),
+            "order_id": db.session.execute(select(Order.id).order_by(Order.id.desc()).limit(1000)).scalars().all(),
+            "coupon_code": db.session.execute(select(Coupon.code)).scalars().all(),
+            "q": [name.split()[0][:4] for name in db.session.execute(select(Product.name)).scalars() if name],
+        }
+        self.values["category"] = self.values["category_id"]
+        self.values["product_ids"] = self.values["product_id"]
+
+    def value(self, name, shape):
+        choices = self.values.get(name)
+        if choices:
+            return random.choice(choices)
+        if name == "quantity":
+            return random.randint(1, 3)
+        if shape == "int":
+            return 1
+        if shape == "float":
+            return 50.0
+        if shape == "bool":
+            return True
+        length = int(shape.split(":", 1)[1]) if shape.startswith("str:") else 4
+        return "x" * min(length, 50)
+
+
+def build_request(trace, url_map, source):
+    """(método, caminho, corpo, content-type) a partir de uma linha da captura."""
+    adapter = url_map.bind("localhost")
+    view_args = {k: source.value(k, shape) for k, shape in trace["view_args"].items()}
+    path = adapter.build(trace["endpoint"], view_args)
+    query = [(k, source.value(k, shape)) for k, shapes in trace["args"].items() for shape in shapes]
+    if query:
+        path += "?" + urllib.parse.urlencode(query)
+
+    if trace.get("json"):
+        body = json.dumps({k: source.value(k, shape) for k, shape in trace["json"].items()}).encode()
+        return trace["method"], path, body, "application/json"
+    if trace.get("form"):
+        form = [(k, source.value(k, shape)) for k, shapes in trace["form"].items() for shape in shapes]
+        return trace["method"], path, urllib.parse.urlencode(form).encode(), "application/x-www-form-urlencoded"
+    return trace["method"], path, None, None
+
+
+class _Session:
+    """Cookies de um cliente virtual já logado com o papel pedido."""
+
+    def __init__(self, base_url, credentials):
+        self.base_url = base_url
+        self.credentials = credentials
+        self._openers = {}
+
+    def opener(self, role):
+        if role not in self._openers:
+            opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+            if role in self.credentials:
+                username, password = self.credentials[role]
+                data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+                opener.open(self.base_url + "/login", data=data, timeout=30).read()
+            self._openers[role] = opener
+        return self._openers[role]
+
+
+def replay(traces, url_map, source, base_url, speed=1.0, concurrency=8, credentials=None, include_destructive=False):
+    """Reproduz as requisições respeitando o ritmo original dividido por `speed`.
+
+    Retorna {endpoint: {"latencies": [...], "queries": [...], "errors": n}}.
+    """
+    credentials = credentials or {}
+    results = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(trace, request_spec):
+        method, path, body, content_type = request_spec
+        if not hasattr(local, "session"):
+            local.session = _Session(base_url, credentials)
+        req = urllib.request.Request(base_url + path, data=body, method=method)
+        if content_type:
+            req.add_header("Content-Type", content_type)
+        queries, failed = None, False
+        try:
+            # O login do cliente virtual fica fora da medição
+            opener = local.session.opener(trace["role"])
+        except OSError:
+            opener = None
+        started = time.perf_counter()
+        try:
+            if opener is None:
+                raise OSError("login falhou")
+            with opener.open(req, timeout=60) as response:
+                response.read()
+                queries = response.headers.get(QUERY_COUNT_HEADER)
+        except urllib.error.HTTPError as exc:
+            queries = exc.headers.get(QUERY_COUNT_HEADER)
+            failed = exc.code >= 500
+        except OSError:
+            failed = True
+        elapsed = time.perf_counter() - started
+        with lock:
+            stats = results.setdefault(trace["endpoint"], {"latencies": [], "queries": [], "errors": 0})
+            stats["latencies"].append(elapsed)
+            if queries is not None:
+                stats["queries"].append(int(queries))
+            stats["errors"] += failed
+
+    playable = [t for t in traces if t.get("endpoint") and t["endpoint"] not in SKIPPED_ENDPOINTS
+                and (include_destructive or "delete" not in t["endpoint"])]
+    if not playable:
+        return results
+
+    first = playable[0]["ts"]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for trace in playable:
+            delay = (trace["ts"] - first) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, trace, build_request(trace, url_map, source))
+    return results
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def format_report(results):
+    lines = [f"{'rota':<36}{'req':>7}{'erros':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}{'consultas':>11}"]
+    for endpoint, stats in sorted(results.items(), key=lambda item: -len(item[1]["latencies"])):
+        latencies = stats["latencies"]
+        queries = f"{statistics.mean(stats['queries']):.1f}" if stats["queries"] else "-"
+        lines.append(f"{endpoint:<36}{len(latencies):>7}{stats['errors']:>7}"
+                     f"{_percentile(latencies, 0.5) * 1000:>9.1f}{_percentile(latencies, 0.95) * 1000:>9.1f}"
+                     f"{_percentile(latencies, 0.99) * 1000:>9.1f}{max(latencies) * 1000:>9.1f}{queries:>11}")
+    return "\n".join(lines)
+
+
+@traffic_cli.command("replay")
+@click.argument("capture_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--base-url", default="http://127.0.0.1:5000", show_default=True)
+@click.option("--speed", default=1.0, show_default=True, help="Multiplicador do ritmo original (2 = duas vezes mais rápido).")
+@click.option("--concurrency", default=8, show_default=True)
+@click.option("--client", "client_login", default="cliente:cliente123", show_default=True, help="usuário:senha para rotas de cliente.")
+@click.option("--admin", "admin_login", default="admin:admin123", show_default=True, help="usuário:senha para rotas de admin.")
+@click.option("--include-destructive", is_flag=True, help="Reproduz também rotas de exclusão.")
+def replay_command(capture_file, base_url, speed, concurrency, client_login, admin_login, include_destructive):
+    """Reproduz uma captura contra uma instância local e mostra a latência por rota."""
+    from flask import current_app
+    traces = load_traces(capture_file)
+    credentials = {"cliente": tuple(client_login.split(":", 1)), "admin": tuple(admin_login.split(":", 1))}
+    print(f"Reproduzindo {len(traces)} requisições a {speed}x com {concurrency} conexões em {base_url}...")
+    started = time.perf_counter()
+    results = replay(traces, current_app.url_map, ValueSource(), base_url.rstrip("/"), speed=speed,
+                     concurrency=concurrency, credentials=credentials, include_destructive=include_destructive)
+    print(format_report(results))
+    print(f"✅ Concluído em {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,6 @@
+# Ponto de entrada WSGI para o gunicorn (ver gunicorn.conf.py).
+# Com preload_app, este módulo é importado uma única vez no processo mestre
+# e os workers herdam o app já configurado via fork.
+from src.main import create_app
+
+app = create_app()
@@ -0,0 +1,208 @@
+import json
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import pytest
+import pytz
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from src.database import db
+from src.main import create_app
+from src.models.employee import Employee
+from src.models.expense import Expense
+from src.models.order import Order, OrderItem
+from src.models.product import Category, IngredientOption, Product, ProductAvailability
+from src.models.promotion import Coupon, Promotion
+from src.models.report_job import ReportJob
+from src.models.user import User
+from src.services import cache, search
+
+# Tamanhos da base usada nos testes: o mesmo fluxo roda em cada um e o número
+# de consultas por rota não pode crescer com os dados.
+SIZES = {"pequeno": 2, "grande": 12}
+PASSWORD = "senha123"
+# Hash barato (poucas iterações) para o login dos testes não dominar o tempo da suíte
+PASSWORD_HASH = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+
+
+def seed(n):
+    """Popula a base com `n` itens de cada tipo (n categorias com n produtos, n clientes com n pedidos...).
+
+    Devolve os ids usados nas URLs dos testes.
+    """
+    admin = User(username="admin", email="admin@teste.com", cpf="000.000.000-00", is_admin=True,
+                 password_hash=PASSWORD_HASH)
+    clients = []
+    for i in range(n):
+        client = User(username=f"cliente{i}", email=f"cliente{i}@teste.com", cpf=f"111.111.111-{i:02d}",
+                      password_hash=PASSWORD_HASH)
+        clients.append(client)
+    db.session.add_all([admin] + clients)
+
+    products = []
+    for c in range(n):
+        category = Category(name=f"Categoria {c}")
+        db.session.add(category)
+        for p in range(n):
+            product = Product(name=f"Prato {c}-{p}", description="Arroz, feijão e salada", price=20 + p,
+                              cost=8, category=category)
+            product.availabilities.append(ProductAvailability(day_of_week="Todos", time_of_day="Dia Todo"))
+            product.ingredient_options.append(IngredientOption(name="Queijo extra", price_adjustment=2))
+            db.session.add(product)
+            products.append(product)
+    # Categoria e produto sem vínculos, para as rotas de exclusão
+    spare_category = Category(name="Sem produtos")
+    spare_product = Product(name="Nunca vendido", price=10, category=products[0].category)
+    db.session.add_all([spare_category, spare_product])
+    db.session.flush()
+
+    now = datetime.now(pytz.utc)
+    for client in clients:
+        for i in range(n):
+            order = Order(user=client, total_amount=50, status="entregue" if i else "recebido",
+                          payment_method="pix", delivery_type="retirada", created_at=now - timedelta(days=i))
+            for product in products[i:i + 3]:
+                order.items.append(OrderItem(product=product, quantity=1, unit_price=product.price))
+            db.session.add(order)
+
+    for i in range(n):
+        db.session.add(Employee(name=f"Funcionário {i}", email=f"func{i}@teste.com", role="cozinha"))
+        db.session.add(Promotion(name=f"Promoção {i}", discount_type="percentage", discount_value=10,
+                                 start_date=datetime(2026, 1, 1), end_date=datetime(2030, 1, 1)))
+        db.session.add(Coupon(code=f"CUPOM{i}", discount_type="fixed", discount_value=5, usage_limit=1000,
+                              start_date=datetime(2026, 1, 1), end_date=datetime(2030, 1, 1)))
+        db.session.add(Expense(description=f"Despesa {i}", amount=100, expense_type="fixa", date=date.today()))
+    report = ReportJob(kind="revenue", params='{"end": "2026-02-01", "granularity": "month", "start": "2026-01-01"}',
+                       params_hash="0" * 64, status="concluido", progress=100,
+                       result=json.dumps({"columns": [["period", "Período"], ["revenue", "Faturamento (R$)"]],
+                                          "rows": [{"period": f"2026-{m:02d}", "revenue": 10.0} for m in range(1, n + 1)]}))
+    db.session.add(report)
+    db.session.commit()
+
+    first_product = products[0]
+    return {
+        "product_id": first_product.id,
+        "category_id": first_product.category_id,
+        "availability_id": first_product.availabilities[0].id,
+        "ingredient_id": first_product.ingredient_options[0].id,
+        "spare_product_id": spare_product.id,
+        "spare_category_id": spare_category.id,
+        "order_id": clients[0].orders[0].id,
+        "employee_id": Employee.query.first().id,
+        "promotion_id": Promotion.query.first().id,
+        "coupon_id": Coupon.query.first().id,
+        "expense_id": Expense.query.first().id,
+        "coupon_code": "CUPOM0",
+        "report_id": report.id,
+    }
+
+
+class Seeded:
+    def __init__(self, app, ids):
+        self.app = app
+        self.ids = ids
+
+    def fill(self, value):
+        """Troca "{product_id}" e afins pelos ids da base, em textos, dicionários e listas."""
+        if isinstance(value, str):
+            return value.format(**self.ids)
+        if isinstance(value, dict):
+            return {key: self.fill(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.fill(item) for item in value]
+        return value
+
+    def client(self, username=None):
+        """Cliente de teste já logado (admin, um cliente) ou anônimo."""
+        client = self.app.test_client()
+        if username:
+            response = client.post("/login", data={"username": username, "password": PASSWORD})
+            assert response.status_code == 302, f"login de {username} falhou"
+        return client
+
+
+def create_test_app(path, **config):
+    """App de teste com banco SQLite em `path` (tabelas ainda não criadas)."""
+    return create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "SECRET_KEY": "testes",
+        "REPORT_WORKERS": 0,  # jobs ficam na fila; nenhuma thread roda durante os testes
+        **config,
+    })
+
+
+@pytest.fixture(scope="session")
+def seeded_apps(tmp_path_factory):
+    """Um app com banco SQLite temporário para cada tamanho de SIZES."""
+    apps = {}
+    for name, n in SIZES.items():
+        app = create_test_app(tmp_path_factory.mktemp(name) / "app.db",
+                              ORDER_ARCHIVE_DIR=str(tmp_path_factory.mktemp(f"{name}-archive")))
+        with app.app_context():
+            db.create_all()
+            ids = seed(n)
+            with db.engine.begin() as connection:
+                search.rebuild_index(connection)
+        apps[name] = Seeded(app, ids)
+    return apps
+
+
+@pytest.fixture
+def fresh_app(request, tmp_path):
+    """App novo para um teste, com seed(n) e o contexto do app ativo; devolve um Seeded.
+
+    Tamanho da base e configuração extra vêm da marca `fresh_app`, no teste ou no módulo:
+        pytestmark = pytest.mark.fresh_app(n=3, KITCHEN_SLOT_LOOKAHEAD=2)
+    Sem a marca, n=2. O arquivo de pedidos (ORDER_ARCHIVE_DIR) fica em tmp_path.
+    """
+    marker = request.node.get_closest_marker("fresh_app")
+    config = dict(marker.kwargs) if marker else {}
+    n = config.pop("n", 2)
+    app = create_test_app(tmp_path / "app.db", ORDER_ARCHIVE_DIR=str(tmp_path / "arquivo"), **config)
+    # O cache é do processo: não reaproveita cardápio ou resumo de outro banco de teste
+    cache.invalidate("menu", "expenses")
+    with app.app_context():
+        db.create_all()
+        ids = seed(n)
+        # Fecha a leitura aberta por seed(): com ela, a sessão não veria gravações feitas por outras conexões
+        db.session.commit()
+        yield Seeded(app, ids)
+    cache.invalidate("menu", "expenses")
+
+
+@contextmanager
+def count_queries(app):
+    """Lista com os comandos SQL executados dentro do bloco (todas as engines do app)."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not re.match(r"\s*(PRAGMA|BEGIN|SAVEPOINT|RELEASE)", statement, re.I):
+            statements.append(statement)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+
+
+def measure(seeded, user, method, url, setup=(), **kwargs):
+    """(resposta, comandos SQL) de uma requisição, com o cache em memória frio.
+
+    O cache é global no processo e os apps de cada tamanho compartilham as
+    mesmas chaves; esvaziá-lo mede o pior caso e isola um banco do outro.
+    `setup`: requisições (método, url, dados) feitas antes da medição, ex.: encher o carrinho.
+    """
+    client = seeded.client(user)
+    for setup_method, setup_url, setup_data in setup:
+        client.open(seeded.fill(setup_url), method=setup_method, data=seeded.fill(setup_data))
+    kwargs = {key: seeded.fill(value) for key, value in kwargs.items()}
+    cache.invalidate("menu", "expenses")
+    with count_queries(seeded.app) as statements:
+        response = client.open(seeded.fill(url), method=method, **kwargs)
+    return response, statements
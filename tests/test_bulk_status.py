@@ -0,0 +1,71 @@
+import pytest
+from src.database import db
+from src.models.order import Order, OrderEvent
+from src.services import locations, orders
+
+pytestmark = pytest.mark.fresh_app(n=3)
+
+
+def _statuses():
+    db.session.expire_all()
+    return {order.id: order.status for order in Order.query}
+
+
+def _events(status):
+    return {(e.order_id, e.from_status) for e in OrderEvent.query.filter_by(to_status=status)}
+
+
+def test_only_legal_transitions_change(fresh_app):
+    before = _statuses()
+    received = [order_id for order_id, status in before.items() if status == "recebido"]
+    delivered = [order_id for order_id, status in before.items() if status == "entregue"]
+
+    transitions = orders.bulk_set_status(received + delivered + [9999], "em_preparo")
+    assert transitions == [(order_id, "recebido", "em_preparo") for order_id in sorted(received)]
+    after = _statuses()
+    assert all(after[order_id] == "em_preparo" for order_id in received)
+    assert all(after[order_id] == "entregue" for order_id in delivered)
+    assert _events("em_preparo") == {(order_id, "recebido") for order_id in received}
+
+    # Vários status anteriores possíveis: cada evento guarda o seu
+    orders.bulk_set_status(received[:1], "pronto")
+    transitions = orders.bulk_set_status(received + delivered, "cancelado")
+    assert sorted(transitions) == sorted([(received[0], "pronto", "cancelado")]
+                                         + [(order_id, "em_preparo", "cancelado") for order_id in received[1:]])
+
+    with pytest.raises(ValueError):
+        orders.bulk_set_status(received, "recebido")
+
+
+def test_bulk_status_endpoint(fresh_app):
+    client = fresh_app.client("admin")
+    received = [order_id for order_id, status in _statuses().items() if status == "recebido"]
+
+    response = client.post("/admin/orders/bulk_status", json={"order_ids": received + [9999], "status": "em_preparo"})
+    assert response.status_code == 200
+    assert response.json == {"status": "em_preparo",
+                             "updated": [{"id": i, "from_status": "recebido"} for i in sorted(received)],
+                             "skipped": [9999]}
+    assert client.post("/admin/orders/bulk_status", json={"order_ids": received, "status": "x"}).status_code == 400
+    assert client.post("/admin/orders/bulk_status", json={"order_ids": [], "status": "pronto"}).status_code == 400
+
+    # Pedidos de outra unidade não são alterados
+    other = locations.add_location("Centro")
+    response = client.post(f"/admin/orders/bulk_status?location={other.id}",
+                           json={"order_ids": received, "status": "pronto"})
+    assert response.json["updated"] == [] and response.json["skipped"] == sorted(received)
+    with locations.scoped(None):
+        assert {_statuses()[i] for i in received} == {"em_preparo"}
+
+
+def test_write_transaction_refuses_pending_orm_changes(fresh_app):
+    order = db.session.get(Order, fresh_app.ids["order_id"])
+    order.total_amount = 999
+    with pytest.raises(RuntimeError):
+        orders.bulk_set_status([order.id], "em_preparo")
+    # Nada foi gravado às escondidas: nem a alteração pendente, nem o status
+    db.session.rollback()
+    assert (order.total_amount, order.status) == (50, "recebido")
+
+    # Só leituras antes: a transação de leitura é desfeita e a escrita segue
+    assert orders.bulk_set_status([order.id], "em_preparo") == [(order.id, "recebido", "em_preparo")]
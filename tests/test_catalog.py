@@ -0,0 +1,97 @@
+import io
+import pytest
+from src.database import db
+from src.models.product import Category, IngredientOption, Product
+from src.services import catalog
+
+
+def _import(text, fmt="csv"):
+    plan = catalog.plan_import(catalog.parse_catalog(io.StringIO(text), fmt))
+    return plan, catalog.apply_import(plan)
+
+
+def test_parse_csv_lists_and_errors():
+    rows = catalog.parse_catalog(io.StringIO(
+        "name,category,price,availabilities,ingredient_options\n"
+        "Suco,Bebidas,\"7,50\",Todos|Almoço|1.00,Gelo|0|1\n"), "csv")
+    assert rows == [{"id": None, "name": "Suco", "category": "Bebidas", "price": 7.5,
+                     "availabilities": [{"day_of_week": "Todos", "time_of_day": "Almoço", "price_adjustment": 1.0}],
+                     "ingredient_options": [{"name": "Gelo", "price_adjustment": 0.0, "is_removable": True}]}]
+
+    with pytest.raises(catalog.CatalogImportError, match="Linha 2"):
+        catalog.parse_catalog(io.StringIO("name,category,price\nSuco,Bebidas,1\nChá,Bebidas,abc\n"), "csv")
+    with pytest.raises(catalog.CatalogImportError, match="repetido"):
+        catalog.parse_catalog(io.StringIO('[{"name": "A", "category": "B", "price": 1},'
+                                          ' {"name": "a", "category": "B", "price": 2}]'), "json")
+
+
+def test_plan_and_apply_create_and_update(fresh_app):
+    ids = fresh_app.ids
+    plan, summary = _import("name,category,price,cost,ingredient_options\n"
+                            "Prato 0-0,Categoria 0,25,8,Queijo extra|2.00|0;Bacon|3.00|0\n"
+                            "Pudim,Sobremesas,9,,\n")
+    assert plan["new_categories"] == ["Sobremesas"]
+    assert [p["name"] for p in plan["product_inserts"]] == ["Pudim"]
+    assert plan["product_updates"][0]["changes"] == {"price": (20, 25)}
+    assert summary["options_created"] == 1
+
+    product = db.session.get(Product, ids["product_id"])
+    assert product.price == 25
+    assert {o.name for o in IngredientOption.query.filter_by(product_id=product.id)} == {"Queijo extra", "Bacon"}
+    pudim = Product.query.filter_by(name="Pudim").one()
+    assert pudim.is_available is True and pudim.category.name == "Sobremesas"
+
+    # Reimportar o mesmo arquivo não muda nada
+    plan, _ = _import("name,category,price,cost,ingredient_options\n"
+                      "Prato 0-0,Categoria 0,25,8,Queijo extra|2.00|0;Bacon|3.00|0\n")
+    assert plan["product_updates"] == [] and plan["option_inserts"] == [] and plan["unchanged"] == 1
+
+
+def test_missing_columns_keep_current_values(fresh_app):
+    ids = fresh_app.ids
+    product = db.session.get(Product, ids["product_id"])
+    product.is_available = False
+    product.image_url = "/static/prato.jpg"
+    db.session.commit()
+
+    plan, _ = _import(f"id,name,category,price\n{product.id},Prato 0-0,Categoria 0,30\n")
+    assert plan["product_updates"][0]["changes"] == {"price": (20, 30)}
+    db.session.expire_all()
+    product = db.session.get(Product, ids["product_id"])
+    assert (product.price, product.description, product.cost, product.image_url, product.is_available) == \
+        (30, "Arroz, feijão e salada", 8, "/static/prato.jpg", False)
+
+    with pytest.raises(catalog.CatalogImportError, match="preço"):
+        _import("name,category,description\nNovo,Categoria 0,Sem preço\n")
+
+
+@pytest.mark.parametrize("action, value, message", [
+    ("reprice", None, "percentual"),
+    ("reprice", "dez", "percentual"),
+    ("reprice", "nan", "percentual"),
+    ("reprice", "inf", "percentual"),
+    ("reprice", "-100", "zerar"),
+    ("category", None, "categoria"),
+    ("category", "999", "não encontrada"),
+    ("availability", "talvez", "disponibilidade"),
+])
+def test_bulk_update_rejects_invalid_values(fresh_app, action, value, message):
+    ids = fresh_app.ids
+    with pytest.raises(ValueError, match=message):
+        catalog.bulk_update_products([ids["product_id"]], action, value)
+    db.session.expire_all()
+    assert db.session.get(Product, ids["product_id"]).price == 20
+
+
+def test_bulk_update_products(fresh_app):
+    ids = fresh_app.ids
+    assert catalog.bulk_update_products([ids["product_id"]], "reprice", "10,5") == 1
+    db.session.expire_all()
+    assert db.session.get(Product, ids["product_id"]).price == pytest.approx(22.1)
+
+    target = Category.query.filter_by(name="Sem produtos").one()
+    catalog.bulk_update_products([ids["product_id"]], "category", str(target.id))
+    catalog.bulk_update_products([ids["product_id"]], "availability", "toggle")
+    db.session.expire_all()
+    product = db.session.get(Product, ids["product_id"])
+    assert (product.category_id, product.is_available) == (target.id, False)
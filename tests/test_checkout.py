@@ -0,0 +1,18 @@
+from src.models.order import Order
+
+
+def test_resubmitted_checkout_returns_the_same_order(fresh_app):
+    client = fresh_app.client("cliente0")
+    client.post("/client/add_to_cart", data={"product_id": fresh_app.ids["product_id"], "quantity": "1"})
+    form = {"payment_method": "pix", "delivery_type": "retirada", "idempotency_key": "chave-1"}
+    before = Order.query.count()
+
+    first = client.post("/client/place_order", data=form)
+    assert "/client/order_tracking/" in first.location
+    # O carrinho já foi esvaziado: o reenvio vai para o mesmo pedido, não para o cardápio
+    second = client.post("/client/place_order", data=form)
+    assert second.location == first.location
+    assert Order.query.count() == before + 1
+
+    other = client.post("/client/place_order", data=dict(form, idempotency_key="chave-2"))
+    assert other.location.endswith("/client/menu")
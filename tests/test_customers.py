@@ -0,0 +1,116 @@
+import pytest
+from src.database import db
+from src.models.customer_stats import CustomerStats
+from src.models.order import Order
+from src.models.user import User
+from src.services import customers, orders
+
+pytestmark = pytest.mark.fresh_app(n=3)
+
+
+def _stats(user_id):
+    db.session.expire_all()
+    stats = db.session.get(CustomerStats, user_id)
+    return stats.order_count, stats.lifetime_value, stats.avg_ticket
+
+
+def test_stats_follow_checkout_and_cancellation(fresh_app):
+    client = User.query.filter_by(username="cliente0").one()
+    assert _stats(client.id) == (3, 150, 50)
+
+    order_id, _ = orders.place_order(client.id, [(fresh_app.ids["product_id"], 2)], "pix", "retirada")
+    total = db.session.get(Order, order_id).total_amount
+    assert _stats(client.id) == (4, pytest.approx(150 + total), pytest.approx((150 + total) / 4))
+
+    order = db.session.get(Order, order_id)
+    order.status = "cancelado"
+    db.session.commit()
+    assert _stats(client.id) == (3, pytest.approx(150), pytest.approx(50))
+
+    order = db.session.get(Order, order_id)
+    order.status = "recebido"
+    db.session.commit()
+    assert _stats(client.id)[0] == 4
+
+    # A manutenção incremental bate com o recálculo completo
+    expected = {s.user_id: (s.order_count, s.lifetime_value) for s in CustomerStats.query}
+    customers.rebuild()
+    assert {s.user_id: (s.order_count, pytest.approx(s.lifetime_value)) for s in CustomerStats.query} == expected
+
+
+@pytest.mark.parametrize("sort", list(customers.SORTS))
+def test_keyset_pages_cover_every_client_once(fresh_app, sort):
+    for i in range(7):
+        db.session.add(User(username=f"Novo{i}", email=f"novo{i}@teste.com", cpf=f"222.222.222-{i:02d}"))
+    db.session.commit()
+
+    seen, after = [], None
+    while True:
+        rows, after = customers.page(sort, after, limit=3)
+        seen.extend(user.id for user, _ in rows)
+        if after is None:
+            break
+    expected = [user_id for (user_id,) in db.session.execute(db.select(User.id).where(User.is_admin.is_(False)))]
+    assert sorted(seen) == sorted(expected)
+    assert len(seen) == len(set(seen))
+
+
+def test_search_by_prefix(fresh_app):
+    rows, _ = customers.page(q="CLIENTE1")
+    assert [user.username for user, _ in rows] == ["cliente1"]
+    rows, _ = customers.page(q="novo")
+    assert rows == []
+
+
+def test_lookup_by_masked_phone_and_cpf(fresh_app):
+    db.session.add_all([
+        User(username="balcao", email="balcao@teste.com", cpf="123.456.789-09", phone="+55 (11) 98765-4321"),
+        User(username="vizinho", email="vizinho@teste.com", cpf="98765432100", phone="11 98765 0000"),
+    ])
+    db.session.commit()
+
+    assert [c["username"] for c in customers.lookup("011 98765-4321")] == ["balcao"]
+    assert {c["username"] for c in customers.lookup("(11) 98765")} == {"balcao", "vizinho"}
+    assert [c["username"] for c in customers.lookup("12345678909")] == ["balcao"]
+    assert customers.lookup("11") == []
+    rows, _ = customers.page(q="(11) 98765-0")
+    assert [user.username for user, _ in rows] == ["vizinho"]
+
+
+def test_lookup_exact_match_survives_many_prefix_matches(fresh_app):
+    # CPFs que começam pelos mesmos dígitos do telefone procurado, mais que o limite da busca
+    cpfs = [f"1198765432{d}" for d in range(10)] + [f"119.876.543-2{d}" for d in range(10)]
+    db.session.add_all([User(username=f"prefixo{i}", email=f"prefixo{i}@teste.com", cpf=cpf, phone=f"(21) 5555-{i:04d}")
+                        for i, cpf in enumerate(cpfs[:customers.LOOKUP_LIMIT + 2])])
+    db.session.add(User(username="exato", email="exato@teste.com", cpf="555.666.777-88", phone="(11) 9876-5432"))
+    db.session.commit()
+
+    found = customers.lookup("(11) 9876-5432")
+    assert len(found) == customers.LOOKUP_LIMIT
+    assert found[0]["username"] == "exato" and found[0]["exact"]
+    assert not any(c["exact"] for c in found[1:])
+
+
+def test_register_conflicts_ignore_masks(fresh_app):
+    db.session.add(User(username="existente", email="existente@teste.com", cpf="123.456.789-09"))
+    db.session.commit()
+    assert User.conflicts("novo", "novo@teste.com", "12345678909") == {"cpf"}
+    assert User.conflicts("existente", "existente@teste.com", "000") == {"username", "email"}
+    assert User.conflicts("novo", "novo@teste.com", "111.222.333-44") == set()
+
+    # CPF repetido em cadastros antigos não esconde o dono do username/email
+    db.session.add_all([User(username=f"antigo{i}", email=f"antigo{i}@teste.com", cpf=cpf)
+                        for i, cpf in enumerate(["12345678909", "123 456 789 09", "123.456.789/09"])])
+    db.session.add(User(username="recente", email="recente@teste.com", cpf="987.654.321-00"))
+    db.session.commit()
+    assert User.conflicts("recente", "recente@teste.com", "123.456.789-09") == {"username", "email", "cpf"}
+
+
+def test_backfill_digits(fresh_app):
+    users = User.__table__
+    db.session.execute(users.update().values(phone="(21) 3333-4444", phone_digits=None, cpf_digits=None))
+    db.session.commit()
+    assert customers.backfill_digits(chunk=2) == User.query.count()
+    assert {u.phone_digits for u in User.query} == {"2133334444"}
+    assert None not in {u.cpf_digits for u in User.query}
+    assert customers.backfill_digits() == 0
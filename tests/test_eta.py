@@ -0,0 +1,117 @@
+import math
+import re
+from datetime import datetime, timedelta, timezone
+import pytest
+from src.database import db
+from src.models.eta_stat import EtaStat
+from src.models.order import Order
+from src.models.user import User
+from src.services import eta, order_events, orders
+
+pytestmark = pytest.mark.fresh_app(ETA_KITCHEN_PARALLEL=2)
+
+PREP_ALL, PREP_CATEGORY, DELIVERY = 12, 18, 8
+
+
+@pytest.fixture
+def stats(fresh_app, monkeypatch):
+    """Médias conhecidas no almoço; todo instante cai no almoço, qualquer que seja o fuso do servidor."""
+    monkeypatch.setattr(eta, "period_of", lambda at: "Almoço")
+    category_id = fresh_app.ids["category_id"]
+    db.session.add_all([
+        EtaStat(stage="preparo", category_id=eta.ALL_CATEGORIES, period="Almoço", samples=10, mean_minutes=PREP_ALL),
+        EtaStat(stage="preparo", category_id=category_id, period="Almoço", samples=10, mean_minutes=PREP_CATEGORY),
+        EtaStat(stage="entrega", category_id=eta.ALL_CATEGORIES, period="Almoço", samples=10, mean_minutes=DELIVERY),
+    ])
+    db.session.commit()
+    return category_id
+
+
+def _stat(stage, category_id):
+    db.session.expire_all()
+    row = EtaStat.query.filter_by(stage=stage, category_id=category_id, period="Almoço").one()
+    return row.samples, row.mean_minutes
+
+
+def test_upsert_matches_in_memory_model(fresh_app):
+    samples = [("preparo", i % 2, "Jantar", 10 + i % 7 * 3) for i in range(2 * eta.WINDOW + 6)]
+    model = eta.EtaModel()
+    for start in range(0, len(samples), 3):
+        batch = samples[start:start + 3]
+        for sample in batch:
+            model.observe(*sample)
+        with db.engine.begin() as connection:
+            eta._save_observations(connection, batch)
+
+    stored = eta.load_model().stats
+    assert stored.keys() == model.stats.keys()
+    for key, (count, mean) in model.stats.items():
+        assert stored[key] == (count, pytest.approx(mean))
+
+
+def test_new_order_estimate_counts_the_queue(fresh_app, stats):
+    ahead = eta.queue_depth()
+    assert ahead == Order.query.filter_by(status="recebido").count() > 0
+    # A fila divide o preparo médio entre as ETA_KITCHEN_PARALLEL frentes da cozinha
+    queue = ahead * PREP_ALL / 2
+    assert eta.estimate_new_order({stats}, "retirada") == math.ceil(queue + PREP_CATEGORY)
+    assert eta.estimate_new_order({stats}, "entrega") == math.ceil(queue + PREP_CATEGORY + DELIVERY)
+    assert eta.estimate_new_order({999}, "retirada") == math.ceil(queue + PREP_ALL)
+
+    client = User.query.filter_by(username="cliente0").one()
+    order_id, _ = orders.place_order(client.id, [(fresh_app.ids["product_id"], 1)], "pix", "retirada")
+    assert db.session.get(Order, order_id).estimated_time == math.ceil(queue + PREP_CATEGORY)
+    assert eta.estimate_new_order({stats}, "retirada") == math.ceil(queue + PREP_ALL / 2 + PREP_CATEGORY)
+
+
+def test_transitions_refresh_estimate_and_learn_durations(fresh_app, stats):
+    client = User.query.filter_by(username="cliente0").one()
+    created = datetime.now(timezone.utc) - timedelta(hours=1)
+    order_id, _ = orders.place_order(client.id, [(fresh_app.ids["product_id"], 1)], "pix", "entrega", now=created)
+
+    def move(from_status, to_status, minutes):
+        order_events.record(db.session, [(order_id, from_status, to_status)], at=created + timedelta(minutes=minutes))
+        db.session.commit()
+        db.session.expire_all()
+        return db.session.get(Order, order_id).estimated_time
+
+    assert move("recebido", "em_preparo", 10) == 10 + PREP_CATEGORY + DELIVERY
+    # 20 minutos de preparo: a 11ª amostra pesa 1/11 na média
+    assert move("em_preparo", "pronto", 30) == 30 + DELIVERY
+    assert _stat("preparo", stats) == (11, pytest.approx(PREP_CATEGORY + (20 - PREP_CATEGORY) / 11))
+    assert _stat("preparo", eta.ALL_CATEGORIES) == (11, pytest.approx(PREP_ALL + (20 - PREP_ALL) / 11))
+    assert move("pronto", "saiu_para_entrega", 32) == 32 + DELIVERY
+    # Entregue mantém a última previsão e ensina a duração da entrega (13 minutos)
+    assert move("saiu_para_entrega", "entregue", 45) == 32 + DELIVERY
+    assert _stat("entrega", eta.ALL_CATEGORIES) == (11, pytest.approx(DELIVERY + (13 - DELIVERY) / 11))
+
+    result = fresh_app.app.test_cli_runner().invoke(args=["eta", "backtest", "--days", "1"])
+    assert re.search(r"Previsão\s+1\s", result.output) and re.search(r"Fixo 30 min\s+1\s", result.output)
+
+
+def test_replay_learns_as_it_goes_and_scores():
+    t0 = datetime(2026, 3, 2, 12, 0)
+    orders_by_id = {1: (t0, "retirada", {5}), 2: (t0 + timedelta(minutes=1), "retirada", {5})}
+    events = [
+        (1, None, "recebido", t0),
+        (2, None, "recebido", t0 + timedelta(minutes=1)),
+        (1, "recebido", "em_preparo", t0 + timedelta(minutes=5)),
+        (1, "em_preparo", "pronto", t0 + timedelta(minutes=25)),
+        (2, "recebido", "em_preparo", t0 + timedelta(minutes=26)),
+        (2, "em_preparo", "pronto", t0 + timedelta(minutes=41)),
+        (3, None, "recebido", t0),  # pedido fora do histórico carregado
+    ]
+    model = eta.EtaModel(parallel=3)
+    results = eta.replay(events, orders_by_id, model)
+    # Sem estatísticas vale o padrão (20 min); o pedido 2 tinha o 1 na fila à frente
+    default = eta.DEFAULT_MINUTES["preparo"]
+    assert results == [(default, 25), (pytest.approx(default / 3 + default), 40)]
+    period = eta.period_of(t0)
+    assert model.stats[("preparo", 5, period)] == (2, pytest.approx((20 + 15) / 2))
+
+    assert eta.replay(events, orders_by_id, eta.EtaModel(), score_from=t0 + timedelta(minutes=1)) == [
+        (pytest.approx(default / 3 + default), 40)]
+
+    summary = eta.score([(20, 25), (30, 40)])
+    assert summary == {"orders": 2, "mae": 7.5, "median": 7.5, "p90": 10, "within_10": 1.0}
+    assert eta.score([(20, 25), (30, 40)], lambda estimate, actual: 30)["mae"] == 7.5
@@ -0,0 +1,76 @@
+from datetime import date
+import pytest
+from src.database import db
+from src.models.expense import Expense
+from src.services import expenses, locations
+
+EXPENSES = [
+    ("Aluguel jan", 1000, "rent", date(2026, 1, 5)),
+    ("Luz jan", 200, "fixed_bills", date(2026, 1, 20)),
+    ("Aluguel fev", 1100, "rent", date(2026, 2, 5)),
+    ("Salários fev", 3000, "salaries", date(2026, 2, 28)),
+    ("Aluguel mar", 1100, "rent", date(2026, 3, 5)),
+    ("Gás mar", 80, "other", date(2026, 3, 5)),
+]
+
+
+@pytest.fixture
+def expenses_app(fresh_app):
+    db.session.add_all([Expense(description=d, amount=a, expense_type=t, date=day) for d, a, t, day in EXPENSES])
+    db.session.commit()
+    return fresh_app
+
+
+def test_keyset_pages_cover_every_expense_once(expenses_app):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = expenses.page(cursor, limit=3)
+        seen.extend(rows)
+        if cursor is None:
+            break
+    ordered = sorted(Expense.query.all(), key=lambda e: (e.date, e.id), reverse=True)
+    assert [e.id for e in seen] == [e.id for e in ordered]
+
+    rows, cursor = expenses.page(expense_type="rent")
+    assert [e.description for e in rows] == ["Aluguel mar", "Aluguel fev", "Aluguel jan"] and cursor is None
+
+
+def test_monthly_summary_totals_and_deltas(expenses_app):
+    summary = expenses.monthly_summary(date(2026, 2, 1), date(2026, 3, 1))
+    assert summary["months"] == ["2026-02", "2026-03"]
+    assert [t["key"] for t in summary["types"]] == ["fixed_bills", "rent", "salaries", "other"]
+    cells = {(r["month"], r["expense_type"]): r for r in summary["rows"]}
+    # Fevereiro compara com janeiro, que fica fora do período mostrado
+    assert cells["2026-02", "rent"]["delta"] == 100
+    assert cells["2026-02", "fixed_bills"] == {"month": "2026-02", "expense_type": "fixed_bills",
+                                               "label": "Contas Fixas", "total": 0, "previous": 200,
+                                               "delta": -200, "delta_pct": -100.0}
+    assert cells["2026-03", "salaries"]["delta"] == -3000
+    assert cells["2026-03", "other"]["delta_pct"] is None
+    assert [(t["month"], t["total"], t["delta"]) for t in summary["totals"]] == [
+        ("2026-02", 4100, 2900), ("2026-03", 1180, -2920)]
+
+
+def test_summary_cached_until_next_expense_change(expenses_app):
+    client = expenses_app.client("admin")
+    first = expenses.monthly_summary(date(2026, 3, 1), date(2026, 3, 1))
+    assert expenses.monthly_summary(date(2026, 3, 1), date(2026, 3, 1)) is first
+
+    client.post("/admin/expenses/add", data={"description": "Conserto", "amount": "20", "expense_type": "other",
+                                             "date": "2026-03-10"})
+    db.session.expire_all()
+    assert expenses.monthly_summary(date(2026, 3, 1), date(2026, 3, 1))["totals"][0]["total"] == 1200
+
+    response = client.get("/admin/api/expenses/summary?months=3")
+    assert response.status_code == 200
+    assert len(response.json["months"]) == 3
+
+
+def test_summary_is_per_location(expenses_app):
+    centro = locations.add_location("Centro")
+    with locations.scoped(centro.id):
+        db.session.add(Expense(description="Aluguel Centro", amount=500, expense_type="rent", date=date(2026, 3, 1)))
+        db.session.commit()
+        assert expenses.monthly_summary(date(2026, 3, 1), date(2026, 3, 1))["totals"][0]["total"] == 500
+    with locations.scoped(1):
+        assert expenses.monthly_summary(date(2026, 3, 1), date(2026, 3, 1))["totals"][0]["total"] == 1180
@@ -0,0 +1,44 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+import pytest
+from src.services.forecast import smooth, weekly_matrix
+
+LAST_DAY = date(2026, 10, 18)  # domingo
+WEEKS = 4
+
+
+def _items(rows):
+    """rows: (product_id, datetime local, quantidade) -> arrays como os de history.sold_items."""
+    product_ids, times, quantities = zip(*rows)
+    return np.array(product_ids), np.array(times, dtype="datetime64[us]"), np.array(quantities, dtype=np.float64)
+
+
+def test_steady_product_forecasts_its_weekly_quantity():
+    mondays = [datetime(2026, 10, 12, 12) - timedelta(weeks=w) for w in range(WEEKS)]
+    products, matrix = weekly_matrix(*_items([(7, at, 2) for at in mondays]), LAST_DAY, WEEKS)
+    baseline, level = smooth(matrix, alpha=0.3)
+
+    assert products.tolist() == [7]
+    assert matrix.shape == (1, WEEKS, 7, 2)
+    assert baseline[0, 0, 0] == 2  # segunda, almoço
+    assert level[0, 0, 0] == pytest.approx(2)
+    assert level[0, 0, 1] == 0  # segunda, jantar: nada vendido
+
+
+def test_new_product_is_not_diluted_by_weeks_before_launch():
+    rows = [(1, datetime(2026, 10, 12, 20) - timedelta(weeks=w), 1) for w in range(WEEKS)]
+    rows.append((2, datetime(2026, 10, 12, 20), 6))  # lançado na última semana
+    products, matrix = weekly_matrix(*_items(rows), LAST_DAY, WEEKS)
+    baseline, level = smooth(matrix, alpha=0.3)
+
+    new = products.tolist().index(2)
+    assert baseline[new, 0, 1] == pytest.approx(6)
+    assert level[new, 0, 1] == pytest.approx(6)
+
+
+def test_sales_outside_the_window_are_ignored():
+    rows = [(1, datetime(2026, 10, 19, 12), 5),  # depois do último dia
+            (1, datetime(2026, 9, 1, 12), 5),    # antes da primeira semana
+            (1, datetime(2026, 10, 14, 12), 3)]
+    _, matrix = weekly_matrix(*_items(rows), LAST_DAY, WEEKS)
+    assert matrix.sum() == 3
@@ -0,0 +1,22 @@
+from datetime import date, datetime
+import pytest
+from src.database import db
+from src.models.order import Order
+from src.models.user import User
+from src.services import history
+
+pytestmark = pytest.mark.fresh_app(n=1)
+
+
+def test_archived_order_counts_in_its_local_month(fresh_app):
+    client = User.query.filter_by(username="cliente0").one()
+    # 31/01 às 22h em Brasília = 01/02 01h em UTC: fica no arquivo de fevereiro
+    db.session.add(Order(user=client, total_amount=80, status="entregue", payment_method="pix",
+                         delivery_type="retirada", created_at=datetime(2026, 2, 1, 1, 0)))
+    db.session.commit()
+
+    assert history.archive_closed_orders(1, now=datetime(2026, 4, 15)) == {"2026-02": 1}
+    assert Order.query.filter(Order.created_at < datetime(2026, 3, 1)).count() == 0
+    assert history.sales_report(date(2026, 1, 1), date(2026, 2, 1)) == [
+        {"period": "2026-01", "orders": 1, "revenue": 80}]
+    assert history.sales_report(date(2026, 2, 1), date(2026, 3, 1)) == []
@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime, timedelta, timezone
+import pytest
+from src.database import db
+from src.models.kitchen_slot import SlotReservation
+from src.models.order import Order
+from src.models.product import Category
+from src.services import kitchen, orders
+from src.services.kitchen import KitchenFullError
+
+CAPACITY = 3
+LOOKAHEAD = 2
+CHECKOUTS = 12
+
+pytestmark = pytest.mark.fresh_app(KITCHEN_SLOT_LOOKAHEAD=LOOKAHEAD)
+
+
+@pytest.fixture
+def kitchen_app(fresh_app):
+    """App com uma categoria limitada a CAPACITY itens por horário."""
+    ids = fresh_app.ids
+    db.session.get(Category, ids["category_id"]).slot_capacity = CAPACITY
+    db.session.commit()
+    ids["user_ids"] = [user_id for (user_id,) in db.session.execute(db.select(Order.user_id).distinct())]
+    # Sem transação de leitura aberta: os checkouts concorrentes escrevem no mesmo arquivo
+    db.session.commit()
+    return fresh_app
+
+
+def test_concurrent_checkouts_never_overbook(kitchen_app):
+    app, ids = kitchen_app.app, kitchen_app.ids
+    barrier = threading.Barrier(CHECKOUTS)
+    results = []
+
+    def checkout(n):
+        with app.app_context():
+            barrier.wait()
+            try:
+                order_id, _ = orders.place_order(ids["user_ids"][n % len(ids["user_ids"])],
+                                                 [(ids["product_id"], 1)], "pix", "retirada")
+                results.append(order_id)
+            except KitchenFullError:
+                results.append(None)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=checkout, args=(n,)) for n in range(CHECKOUTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    admitted = [order_id for order_id in results if order_id is not None]
+    assert len(results) == CHECKOUTS
+    assert len(admitted) == CAPACITY * LOOKAHEAD
+
+    with app.app_context():
+        slots = db.session.execute(
+            db.select(Order.slot_start, db.func.count()).where(Order.id.in_(admitted)).group_by(Order.slot_start)
+        ).all()
+        reservations = db.session.execute(db.select(SlotReservation.slot_start, SlotReservation.used)).all()
+    assert sorted(count for _, count in slots) == [CAPACITY] * LOOKAHEAD
+    assert sorted(used for _, used in reservations) == [CAPACITY] * LOOKAHEAD
+
+
+def test_full_slot_defers_and_cancel_releases(kitchen_app):
+    ids = kitchen_app.ids
+    user_id = ids["user_ids"][0]
+    # Um único instante para todo o teste: o horário atual não vira no meio dele
+    now = datetime.now(timezone.utc)
+    first_slot = kitchen.slot_of(now)
+    placed = [orders.place_order(user_id, [(ids["product_id"], 1)], "pix", "retirada", now=now)[0]
+              for _ in range(CAPACITY + 1)]
+    deferred = db.session.get(Order, placed[-1])
+    assert deferred.slot_start == first_slot + timedelta(minutes=15)
+
+    cancelled = db.session.get(Order, placed[0])
+    cancelled.status = "cancelado"
+    db.session.commit()
+    used = db.session.execute(
+        db.select(SlotReservation.used).where(SlotReservation.slot_start == first_slot)
+    ).scalar()
+    assert used == CAPACITY - 1
+    assert kitchen.free_slots({ids["category_id"]: 1}, now=now)[0] == first_slot
@@ -0,0 +1,106 @@
+from datetime import date
+import pytest
+from src.database import db
+from src.models.expense import Expense
+from src.models.order import Order
+from src.models.product import Category, Product
+from src.models.user import User
+from src.services import locations, orders
+from src.services.menu import menu_snapshot
+
+
+@pytest.fixture
+def locations_app(fresh_app):
+    """Base do seed na unidade 1 e uma segunda unidade, "Centro", com um produto e uma despesa."""
+    centro = locations.add_location("Centro")
+    with locations.scoped(centro.id):
+        product = Product(name="Prato do Centro", price=30, cost=10, category=db.session.get(Category, 1))
+        db.session.add_all([product, Expense(description="Aluguel Centro", amount=900, expense_type="Aluguel",
+                                                   date=date.today())])
+        db.session.commit()
+        fresh_app.ids.update(centro_id=centro.id, centro_product_id=product.id)
+    return fresh_app
+
+
+def test_orm_queries_only_see_current_location(locations_app):
+    ids = locations_app.ids
+    total = Product.query.count()
+    with locations.scoped(ids["centro_id"]):
+        assert [p.name for p in Product.query.all()] == ["Prato do Centro"]
+        assert Product.query.filter(Product.id == ids["product_id"]).first() is None
+        # UPDATE em lote do ORM também é filtrado
+        Product.query.update({Product.is_available: False})
+        db.session.commit()
+    with locations.scoped(1):
+        assert Product.query.count() == total - 1
+        assert Product.query.filter_by(is_available=False).count() == 0
+    assert db.session.get(Product, ids["centro_product_id"]).is_available is False
+
+
+def test_new_rows_and_orders_belong_to_current_location(locations_app):
+    ids = locations_app.ids
+    client = User.query.filter_by(username="cliente0").one()
+    with locations.scoped(ids["centro_id"]):
+        order_id, _ = orders.place_order(client.id, [(ids["centro_product_id"], 1)], "pix", "retirada")
+        assert Order.query.count() == 1
+    assert db.session.get(Order, order_id).location_id == ids["centro_id"]
+    assert db.session.get(Product, ids["centro_product_id"]).location_id == ids["centro_id"]
+
+
+def test_menu_cache_is_separate_per_location(locations_app):
+    ids = locations_app.ids
+
+    def names():
+        return {p["name"] for p in menu_snapshot("Segunda", "Almoço")["products"]}
+
+    with locations.scoped(1):
+        principal = names()
+    with locations.scoped(ids["centro_id"]):
+        assert names() == {"Prato do Centro"}
+    with locations.scoped(1):
+        assert names() == principal
+    assert "Prato do Centro" not in principal
+
+
+def test_admin_chooses_location(locations_app):
+    ids = locations_app.ids
+    client = locations_app.client("admin")
+    assert client.get(f"/admin/products/edit/{ids['product_id']}?location={ids['centro_id']}").status_code == 404
+
+    response = client.post(f"/admin/locations/{ids['centro_id']}/select")
+    assert response.status_code == 302
+    page = client.get("/admin/expenses").get_data(as_text=True)
+    assert "Aluguel Centro" in page
+    assert client.get(f"/admin/products/edit/{ids['centro_product_id']}").status_code == 200
+    assert client.get(f"/admin/products/edit/{ids['product_id']}").status_code == 404
+
+    # A URL vale mais que a escolha guardada na sessão
+    assert client.get(f"/admin/products/edit/{ids['product_id']}?location=1").status_code == 200
+    assert client.post("/admin/locations/99/select").status_code == 302
+    assert client.get(f"/admin/products/edit/{ids['centro_product_id']}").status_code == 200
+
+
+def test_client_location_selector_clears_cart(locations_app):
+    ids = locations_app.ids
+    client = locations_app.client("cliente0")
+    with client.session_transaction() as session:
+        session["cart"] = {"x": {"product_id": ids["product_id"], "quantity": 1}}
+    client.post(f"/client/location/{ids['centro_id']}")
+    with client.session_transaction() as session:
+        assert session["location_id"] == ids["centro_id"]
+        assert not session.get("cart")
+
+
+def test_open_orders_metric_covers_every_location(locations_app):
+    ids = locations_app.ids
+    client = User.query.filter_by(username="cliente0").one()
+    with locations.scoped(ids["centro_id"]):
+        orders.place_order(client.id, [(ids["centro_product_id"], 1)], "pix", "retirada")
+    with locations.scoped(1):
+        received = Order.query.filter_by(status="recebido").count()
+
+    # A requisição do /metrics fica na unidade 1, mas a métrica conta todas
+    body = locations_app.client().get("/metrics").get_data(as_text=True)
+    assert f'orders_open{{location_id="1",status="recebido"}} {received:.1f}' in body
+    assert f'orders_open{{location_id="{ids["centro_id"]}",status="recebido"}} 1.0' in body
+    assert f'orders_open{{location_id="{ids["centro_id"]}",status="pronto"}} 0.0' in body
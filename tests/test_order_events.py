@@ -0,0 +1,74 @@
+from src.database import db
+from src.models.order import Order, OrderEvent
+from src.models.user import User
+from src.services import order_events, orders
+
+
+def _since(after_id):
+    return [(e["order_id"], e["from_status"], e["to_status"]) for e in order_events.events_since(after_id)]
+
+
+def test_orm_status_changes_are_captured_on_flush(fresh_app):
+    start = order_events.latest_event_id()
+    order = db.session.get(Order, fresh_app.ids["order_id"])
+    order.status = "em_preparo"
+    db.session.commit()
+    # Atribuir o mesmo status não é transição
+    order.status = "em_preparo"
+    order.total_amount = 60
+    db.session.commit()
+
+    new = Order(user=order.user, total_amount=30, status="recebido", payment_method="pix", delivery_type="retirada")
+    db.session.add(new)
+    db.session.flush()
+    # O evento já está na transação do flush, antes do commit
+    assert _since(start) == [(order.id, "recebido", "em_preparo"), (new.id, None, "recebido")]
+    db.session.rollback()
+    assert _since(start) == [(order.id, "recebido", "em_preparo")]
+
+
+def test_sql_writes_record_events_and_notify_subscribers(fresh_app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(order_events, "_subscribers", order_events._subscribers + [
+        lambda connection, transitions, at: calls.append(list(transitions))])
+    start = order_events.latest_event_id()
+    client = User.query.filter_by(username="cliente0").one()
+
+    order_id, _ = orders.place_order(client.id, [(fresh_app.ids["product_id"], 1)], "pix", "retirada")
+    event = OrderEvent.query.filter_by(order_id=order_id).one()
+    assert (event.from_status, event.to_status) == (None, "recebido")
+    assert event.created_at == db.session.get(Order, order_id).created_at
+
+    seeded_id = fresh_app.ids["order_id"]
+    orders.bulk_set_status([order_id, seeded_id], "em_preparo")
+    assert calls == [[(order_id, None, "recebido")],
+                     sorted([(order_id, "recebido", "em_preparo"), (seeded_id, "recebido", "em_preparo")])]
+    # Cada chamada corresponde às linhas gravadas, na mesma ordem
+    assert _since(start) == calls[0] + calls[1]
+
+
+def test_cursor_pages_cover_every_event_once(fresh_app):
+    everything = order_events.events_since(0, limit=1000)
+    assert len(everything) == OrderEvent.query.count() > 3
+
+    seen, after = [], 0
+    while True:
+        page = order_events.events_since(after, limit=3)
+        if not page:
+            break
+        seen.extend(page)
+        after = page[-1]["id"]
+    assert seen == everything
+    assert order_events.latest_event_id() == everything[-1]["id"]
+
+
+def test_feed_returns_next_cursor(fresh_app):
+    client = fresh_app.client("admin")
+    first = client.get("/admin/api/order_events?after=0&limit=2").json
+    assert len(first["events"]) == 2 and first["next"] == first["events"][-1]["id"]
+
+    following = client.get(f"/admin/api/order_events?after={first['next']}&limit=2").json
+    assert following["events"][0]["id"] > first["next"]
+
+    last = order_events.latest_event_id()
+    assert client.get(f"/admin/api/order_events?after={last}").json == {"events": [], "next": last}
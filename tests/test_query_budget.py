@@ -0,0 +1,200 @@
+import pytest
+from conftest import SIZES, measure
+
+# Orçamento de consultas SQL por rota, igual para qualquer tamanho de base.
+# Cada requisição autenticada já paga 1 consulta (carregar o usuário da sessão);
+# as páginas que usam o cardápio ou o resumo de despesas pagam também a leitura de
+# cache_versions, e as escritas nesses modelos, o incremento da versão.
+#
+# Se uma rota passar do orçamento, procure acessos preguiçosos no template
+# (ex.: order.user, item.product.category) e carregue-os na consulta da rota
+# (selectinload/joinedload) antes de aumentar o número.
+#
+# A resposta esperada é o status (200) ou, para redirecionamentos, o início da
+# URL de destino: um 302 para a página errada (login, erro de validação) ou um
+# 404 não passam como medição válida.
+
+CART = [("POST", "/client/add_to_cart", {"product_id": "{product_id}", "quantity": "2"})]
+EDIT_PRODUCT = "/admin/products/edit/{product_id}"
+# Reenvio do dry-run: um produto alterado e um novo ("{{" vira "{" no fill)
+IMPORT_PAYLOAD = ('[{{"id": {product_id}, "name": "Prato 0-0", "category": "Categoria 0", "price": 25}},'
+                  ' {{"name": "Prato importado", "category": "Categoria 0", "price": 18}}]')
+
+ROUTES = [
+    # (usuário, método, url, argumentos da requisição, resposta esperada, orçamento)
+    pytest.param(None, "GET", "/login", {}, 200, 0, id="auth.login"),
+    pytest.param(None, "POST", "/login", {"data": {"username": "cliente0", "password": "errada"}}, 200, 1,
+                 id="auth.login-post"),
+    pytest.param(None, "GET", "/register", {}, 200, 0, id="auth.register"),
+    pytest.param(None, "POST", "/register", {"data": {
+        "username": "novo", "email": "novo@teste.com", "phone": "(11) 99999-0000", "cpf": "529.982.247-25",
+        "password": "senha123", "confirm_password": "senha123"}}, "/login", 3, id="auth.register-post"),
+    pytest.param(None, "GET", "/reset_password_request", {}, 200, 0, id="auth.reset_password_request"),
+    pytest.param(None, "POST", "/reset_password_request", {"data": {"email": "cliente0@teste.com"}}, "/login", 3,
+                 id="auth.reset_password_request-post"),
+    pytest.param(None, "GET", "/reset_password/token-invalido", {}, "/reset_password_request", 1,
+                 id="auth.reset_password"),
+    pytest.param("cliente0", "GET", "/change_password", {}, 200, 1, id="auth.change_password"),
+    pytest.param("cliente0", "GET", "/logout", {}, "/login", 1, id="auth.logout"),
+
+    pytest.param("cliente0", "GET", "/client/home", {}, 200, 4, id="client.home"),
+    pytest.param("cliente0", "POST", "/client/location/1", {}, "/client/home", 1, id="client.choose_location"),
+    pytest.param("cliente0", "GET", "/client/menu", {}, 200, 6, id="client.menu"),
+    pytest.param("cliente0", "GET", "/client/menu?q=prato&category={category_id}", {}, 200, 7,
+                 id="client.menu-busca"),
+    pytest.param("cliente0", "GET", "/client/search?q=prato", {}, 200, 7, id="client.search"),
+    pytest.param("cliente0", "POST", "/client/add_to_cart", {"data": {"product_id": "{product_id}", "quantity": "1",
+                                                                      "ingredients": ["{ingredient_id}"]}},
+                 "/client/menu", 4, id="client.add_to_cart"),
+    pytest.param("cliente0", "GET", "/client/cart", {"setup": CART}, 200, 3, id="client.cart"),
+    pytest.param("cliente0", "POST", "/client/update_cart", {"setup": CART,
+                                                             "data": {"product_id": "{product_id}", "quantity": "0"}},
+                 "/client/cart", 1, id="client.update_cart"),
+    pytest.param("cliente0", "GET", "/client/remove_from_cart/{product_id}", {"setup": CART}, "/client/cart", 1,
+                 id="client.remove_from_cart"),
+    pytest.param("cliente0", "POST", "/client/remove_from_cart_key", {"setup": CART, "data": {"cart_key": "x"}},
+                 "/client/cart", 1, id="client.remove_from_cart_key"),
+    pytest.param("cliente0", "GET", "/client/checkout", {"setup": CART}, 200, 4, id="client.checkout"),
+    pytest.param("cliente0", "POST", "/client/place_order", {"setup": CART, "data": {
+        "payment_method": "pix", "delivery_type": "retirada", "coupon_code": "{coupon_code}",
+        "idempotency_key": "chave-do-teste"}}, "/client/order_tracking/", 14, id="client.place_order"),
+    pytest.param("cliente0", "GET", "/client/order_tracking/{order_id}", {}, 200, 4, id="client.order_tracking"),
+    pytest.param("cliente0", "GET", "/client/order_history", {}, 200, 4, id="client.order_history"),
+    pytest.param("cliente0", "GET", "/client/repeat_order/{order_id}", {}, "/client/cart", 4,
+                 id="client.repeat_order"),
+    pytest.param("cliente0", "POST", "/client/validate_coupon", {"json": {"coupon_code": "{coupon_code}",
+                                                                          "total": 100}}, 200, 2,
+                 id="client.validate_coupon"),
+
+    pytest.param("admin", "GET", "/admin/dashboard", {}, 200, 12, id="admin.dashboard"),
+    pytest.param("admin", "GET", "/admin/products", {}, 200, 4, id="admin.products"),
+    pytest.param("admin", "POST", "/admin/products/add", {"data": {
+        "name": "Novo prato", "description": "", "price": "30", "cost": "", "category_id": "{category_id}"}},
+                 "/admin/products", 7, id="admin.add_product"),
+    pytest.param("admin", "GET", EDIT_PRODUCT, {}, 200, 5, id="admin.edit_product"),
+    pytest.param("admin", "POST", EDIT_PRODUCT, {"data": {
+        "name": "Prato 0-0", "description": "Arroz e feijão", "price": "21", "cost": "8",
+        "category_id": "{category_id}"}}, "/admin/products", 9, id="admin.edit_product-post"),
+    pytest.param("admin", "POST", "/admin/products/{product_id}/toggle", {}, "/admin/products", 9,
+                 id="admin.toggle_product"),
+    pytest.param("admin", "GET", "/admin/products/export", {}, 200, 5, id="admin.export_products"),
+    pytest.param("admin", "POST", "/admin/products/import", {"data": {"payload": IMPORT_PAYLOAD, "dry_run": "1"}},
+                 200, 5, id="admin.import_products-dry_run"),
+    pytest.param("admin", "POST", "/admin/products/import", {"data": {"payload": IMPORT_PAYLOAD}},
+                 "/admin/products", 11, id="admin.import_products"),
+    pytest.param("admin", "POST", "/admin/products/bulk", {"data": {
+        "product_ids": ["{product_id}"], "action": "reprice", "value": "0"}}, "/admin/products", 3,
+                 id="admin.bulk_update_products"),
+    pytest.param("admin", "GET", "/admin/categories", {}, 200, 2, id="admin.categories"),
+    pytest.param("admin", "POST", "/admin/categories/add", {"data": {"name": "Sobremesas"}}, "/admin/categories", 4,
+                 id="admin.add_category"),
+    pytest.param("admin", "POST", "/admin/categories/edit/{category_id}", {"data": {"name": "Pratos"}},
+                 "/admin/categories", 5, id="admin.edit_category"),
+    pytest.param("admin", "GET", "/admin/orders", {}, 200, 4, id="admin.orders"),
+    pytest.param("admin", "GET", "/admin/orders?status=recebido&period=month", {}, 200, 4, id="admin.orders-filtro"),
+    pytest.param("admin", "POST", "/admin/orders/{order_id}/update_status", {"data": {"status": "em_preparo"}},
+                 "/admin/orders", 7, id="admin.update_order_status"),
+    pytest.param("admin", "POST", "/admin/orders/bulk_status", {"json": {
+        "order_ids": ["{order_id}", "{order_id}"], "status": "pronto"}}, 200, 8, id="admin.bulk_update_order_status"),
+    pytest.param("admin", "GET", "/admin/employees", {}, 200, 2, id="admin.employees"),
+    pytest.param("admin", "POST", "/admin/employees/add", {"data": {
+        "name": "Nova", "email": "nova@teste.com", "phone": "", "role": "caixa"}}, "/admin/employees", 2,
+                 id="admin.add_employee"),
+    pytest.param("admin", "GET", "/admin/employees/edit/{employee_id}", {}, 200, 2, id="admin.edit_employee"),
+    pytest.param("admin", "POST", "/admin/employees/edit/{employee_id}", {"data": {
+        "name": "Funcionário 0", "email": "func0@teste.com", "phone": "", "role": "caixa", "is_active": "on"}},
+                 "/admin/employees", 3, id="admin.edit_employee-post"),
+    pytest.param("admin", "GET", "/admin/promotions", {}, 200, 3, id="admin.promotions"),
+    pytest.param("admin", "POST", "/admin/promotions/add", {"data": {
+        "name": "Festival", "description": "", "discount_type": "percentage", "discount_value": "10",
+        "start_date": "2026-01-01", "end_date": "2026-12-31"}}, "/admin/promotions", 2, id="admin.add_promotion"),
+    pytest.param("admin", "GET", "/admin/promotions/edit/{promotion_id}", {}, 200, 2, id="admin.edit_promotion"),
+    pytest.param("admin", "POST", "/admin/promotions/edit/{promotion_id}", {"data": {
+        "name": "Promoção 0", "description": "", "discount_type": "percentage", "discount_value": "15",
+        "start_date": "2026-01-01", "end_date": "2030-01-01", "is_active": "on"}}, "/admin/promotions", 3,
+                 id="admin.edit_promotion-post"),
+    pytest.param("admin", "POST", "/admin/coupons/add", {"data": {
+        "code": "NOVO10", "discount_type": "fixed", "discount_value": "10", "min_order_value": "0",
+        "usage_limit": "5", "start_date": "2026-01-01", "end_date": "2026-12-31"}}, "/admin/promotions", 2,
+                 id="admin.add_coupon"),
+    pytest.param("admin", "GET", "/admin/coupons/edit/{coupon_id}", {}, 200, 2, id="admin.edit_coupon"),
+    pytest.param("admin", "POST", "/admin/coupons/edit/{coupon_id}", {"data": {
+        "code": "{coupon_code}", "discount_type": "fixed", "discount_value": "5", "min_order_value": "0",
+        "usage_limit": "1000", "start_date": "2026-01-01", "end_date": "2030-01-01", "is_active": "on"}},
+                 "/admin/promotions", 3, id="admin.edit_coupon-post"),
+    pytest.param("admin", "GET", "/admin/clients", {}, 200, 2, id="admin.clients"),
+    pytest.param("admin", "GET", "/admin/locations", {}, 200, 2, id="admin.locations_page"),
+    pytest.param("admin", "POST", "/admin/locations/add", {"data": {"name": "Centro", "address": "Rua A, 1"}},
+                 "/admin/locations", 3, id="admin.add_location"),
+    pytest.param("admin", "POST", "/admin/locations/1/select", {}, "/admin/dashboard", 2,
+                 id="admin.select_location"),
+    pytest.param("admin", "GET", "/admin/clients?sort=valor&q=cliente1", {}, 200, 2, id="admin.clients-search"),
+    pytest.param("admin", "GET", "/admin/api/customers/lookup?q=(11) 9876", {}, 200, 2, id="admin.customer_lookup"),
+    pytest.param("admin", "GET", "/admin/expenses", {}, 200, 2, id="admin.expenses"),
+    pytest.param("admin", "GET", "/admin/expenses?type=rent", {}, 200, 2, id="admin.expenses-filtro"),
+    pytest.param("admin", "GET", "/admin/api/expenses/summary?months=12", {}, 200, 3, id="admin.expenses_summary"),
+    pytest.param("admin", "POST", "/admin/expenses/add", {"data": {
+        "description": "Gás", "amount": "120", "expense_type": "fixa", "date": "2026-01-10"}}, "/admin/expenses", 3,
+                 id="admin.add_expense"),
+    pytest.param("admin", "GET", "/admin/expenses/edit/{expense_id}", {}, 200, 2, id="admin.edit_expense"),
+    pytest.param("admin", "POST", "/admin/expenses/edit/{expense_id}", {"data": {
+        "description": "Despesa 0", "amount": "110", "expense_type": "fixa", "date": "2026-01-10"}},
+                 "/admin/expenses", 4, id="admin.edit_expense-post"),
+    pytest.param("admin", "POST", "/admin/products/{product_id}/availability/add", {"data": {
+        "day_of_week": "Sábado", "time_of_day": "Jantar", "price_adjustment": "5"}}, EDIT_PRODUCT, 5,
+                 id="admin.add_product_availability"),
+    pytest.param("admin", "POST", "/admin/products/{product_id}/ingredient/add", {"data": {
+        "name": "Bacon", "price_adjustment": "4"}}, EDIT_PRODUCT, 8, id="admin.add_ingredient_option"),
+    pytest.param("admin", "GET", "/admin/api/products/{product_id}/availability", {}, 200, 2,
+                 id="admin.get_product_availability"),
+    pytest.param("admin", "GET", "/admin/api/order_events?after=0&limit=5", {}, 200, 2, id="admin.order_events_feed"),
+    pytest.param("admin", "GET", "/admin/reports", {}, 200, 2, id="admin.reports_page"),
+    pytest.param("admin", "POST", "/admin/reports", {"data": {
+        "kind": "revenue", "start": "2025-01-01", "end": "2026-01-01", "granularity": "month"}}, "/admin/reports/", 4,
+                 id="admin.reports_page-post"),
+    pytest.param("admin", "GET", "/admin/reports/{report_id}", {}, 200, 2, id="admin.report_detail"),
+    pytest.param("admin", "GET", "/admin/reports/{report_id}/status", {}, 200, 2, id="admin.report_status"),
+    pytest.param("admin", "GET", "/admin/reports/{report_id}/download", {}, 200, 2, id="admin.download_report"),
+
+    # Exclusões por último: apagam registros usados pelas rotas acima
+    pytest.param("admin", "POST", "/admin/products/availability/{availability_id}/delete", {}, EDIT_PRODUCT, 4,
+                 id="admin.delete_product_availability"),
+    pytest.param("admin", "POST", "/admin/products/ingredient/{ingredient_id}/delete", {}, EDIT_PRODUCT, 8,
+                 id="admin.delete_ingredient_option"),
+    pytest.param("admin", "POST", "/admin/products/delete/{spare_product_id}", {}, "/admin/products", 11,
+                 id="admin.delete_product"),
+    pytest.param("admin", "POST", "/admin/categories/delete/{spare_category_id}", {}, "/admin/categories", 5,
+                 id="admin.delete_category"),
+    pytest.param("admin", "POST", "/admin/employees/delete/{employee_id}", {}, "/admin/employees", 4,
+                 id="admin.delete_employee"),
+    pytest.param("admin", "POST", "/admin/promotions/delete/{promotion_id}", {}, "/admin/promotions", 3,
+                 id="admin.delete_promotion"),
+    pytest.param("admin", "POST", "/admin/coupons/delete/{coupon_id}", {}, "/admin/promotions", 3,
+                 id="admin.delete_coupon"),
+    pytest.param("admin", "POST", "/admin/expenses/delete/{expense_id}", {}, "/admin/expenses", 4,
+                 id="admin.delete_expense"),
+]
+
+
+@pytest.mark.parametrize("user, method, url, kwargs, expected, budget", ROUTES)
+def test_query_budget(seeded_apps, user, method, url, kwargs, expected, budget):
+    counts = {}
+    for size, seeded in seeded_apps.items():
+        response, statements = measure(seeded, user, method, url, **kwargs)
+        if isinstance(expected, str):
+            assert response.status_code == 302 and response.location.startswith(seeded.fill(expected)), (
+                f"{method} {url} respondeu {response.status_code} {response.location} na base {size}"
+                f" (esperado: redirecionar para {seeded.fill(expected)})")
+        else:
+            assert response.status_code == expected, (
+                f"{method} {url} respondeu {response.status_code} na base {size} (esperado: {expected})")
+        counts[size] = len(statements)
+        assert len(statements) <= budget, (
+            f"{method} {url} fez {len(statements)} consultas na base {size} (orçamento: {budget}):\n"
+            + "\n".join(statements))
+    assert len(set(counts.values())) == 1, f"{method} {url}: consultas crescem com os dados {counts}"
+
+
+def test_sizes_are_distinct():
+    # Sem tamanhos diferentes o teste acima não detecta N+1
+    assert len(set(SIZES.values())) > 1
@@ -0,0 +1,58 @@
+from datetime import date, datetime, timedelta
+import pytest
+import pytz
+from src.database import db
+from src.models.report_job import ReportJob
+from src.services import reports
+
+PARAMS = {"start": date(2026, 1, 1), "end": date(2026, 3, 1), "granularity": "month"}
+
+
+class FakePool:
+    """Registra os jobs entregues ao pool em vez de executá-los."""
+
+    def __init__(self, max_workers, thread_name_prefix):
+        self.job_ids = []
+
+    def submit(self, function, app, job_id):
+        self.job_ids.append(job_id)
+
+
+@pytest.fixture
+def pool(fresh_app, monkeypatch):
+    monkeypatch.setattr(reports, "ThreadPoolExecutor", FakePool)
+    monkeypatch.setattr(reports, "_executor", None)
+    return lambda: reports._executor
+
+
+def _orphan(job, minutes):
+    job.status = "executando"
+    job.started_at = datetime.now(pytz.utc) - timedelta(minutes=minutes)
+    db.session.commit()
+
+
+def test_submit_skips_jobs_orphaned_while_running(fresh_app):
+    job, reused = reports.submit("revenue", PARAMS)
+    assert not reused and job.status == "pendente"
+
+    _orphan(job, 5)
+    assert reports.submit("revenue", PARAMS) == (job, True)
+
+    _orphan(job, reports.STALE_AFTER.total_seconds() / 60 + 5)
+    fresh, reused = reports.submit("revenue", PARAMS)
+    assert not reused and fresh.id != job.id
+
+
+def test_pool_start_resumes_pending_and_stale_jobs(fresh_app, pool):
+    waiting, _ = reports.submit("revenue", PARAMS)
+    stale, _ = reports.submit("expenses", PARAMS)
+    _orphan(stale, 120)
+
+    fresh_app.app.config["REPORT_WORKERS"] = 1
+    job, _ = reports.submit("product_profit", PARAMS)
+    assert pool().job_ids == [waiting.id, stale.id, job.id]
+    assert db.session.get(ReportJob, stale.id).status == "pendente"
+
+    # Pedido idêntico a um job ainda na fila: é entregue de novo (claim impede execução dupla)
+    assert reports.submit("revenue", PARAMS) == (waiting, True)
+    assert pool().job_ids[-1] == waiting.id
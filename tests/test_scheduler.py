@@ -0,0 +1,19 @@
+from src.services.scheduler import MaintenanceLock, Scheduler
+
+
+class _App:
+    config = {}
+
+
+def test_only_one_process_holds_the_maintenance_lock(tmp_path):
+    path = str(tmp_path / "agendador.lock")
+    first, second = MaintenanceLock(path), MaintenanceLock(path)
+    assert first() and first()
+    assert not second()
+    # Quem segurava morreu (arquivo fechado): o próximo assume
+    first._handle.close()
+    assert second()
+
+    assert Scheduler(_App(), maintenance=second)._maintains()
+    assert not Scheduler(_App(), maintenance=MaintenanceLock(path))._maintains()
+    assert not Scheduler(_App(), maintenance=False)._maintains()
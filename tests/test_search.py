@@ -0,0 +1,21 @@
+from sqlalchemy import text
+from src.database import db
+from src.models.product import Product
+from src.services import search
+
+
+def test_index_created_with_tables_and_kept_in_sync(fresh_app):
+    assert len(search.search_product_ids("prato")) == 4
+    db.session.add(Product(name="Açaí na tigela", price=15, category_id=fresh_app.ids["category_id"]))
+    db.session.commit()
+    assert len(search.search_product_ids("acai", limit=0)) == 1
+
+    assert fresh_app.client("cliente0").get("/client/menu?q=prato").status_code == 200
+
+
+def test_search_falls_back_to_like_without_index(fresh_app):
+    with db.engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE {search.INDEX_TABLE}"))
+    search._ready.clear()
+    assert search.search_product_ids("nunca vend") == [fresh_app.ids["spare_product_id"]]
+    assert len(search.search_product_ids("prato", limit=2)) == 2